@@ -13,6 +13,7 @@ echo ""
 echo "📦 Creating database migrations..."
 python manage.py makemigrations miniGame
 python manage.py migrate
+python manage.py createcachetable
 
 # Create demo user
 echo ""
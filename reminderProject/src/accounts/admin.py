@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib import messages
-from .models import User
+from .models import LeaderboardEntry, User
+from myproject.routers import ReadReplicaAdminMixin
+from .bulk import BulkActionAdminMixin
+from .tokens import credit_tokens_bulk, set_tokens_bulk
 
 # Register your models here.
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ReadReplicaAdminMixin, BulkActionAdminMixin, UserAdmin):
     list_display = ['username', 'email', 'first_name', 'last_name', 'get_age', 'tokens', 'is_staff', 'is_active']
     list_filter = ['is_staff', 'is_superuser', 'is_active', 'groups']
     search_fields = ['username', 'first_name', 'last_name', 'email']
@@ -40,40 +43,35 @@ class CustomUserAdmin(UserAdmin):
     
     def add_100_tokens(self, request, queryset):
         """Add 100 tokens to selected users"""
-        count = 0
-        for user in queryset:
-            user.tokens += 100
-            user.save()
-            count += 1
-        self.message_user(request, f'Added 100 tokens to {count} user(s).', messages.SUCCESS)
+        self.run_bulk_action(request, queryset, lambda qs: credit_tokens_bulk(qs, 100),
+                             'Adding 100 tokens', 'Added 100 tokens to {count} user(s).')
     add_100_tokens.short_description = '🎃 Add 100 tokens to selected users'
     
     def add_500_tokens(self, request, queryset):
         """Add 500 tokens to selected users"""
-        count = 0
-        for user in queryset:
-            user.tokens += 500
-            user.save()
-            count += 1
-        self.message_user(request, f'Added 500 tokens to {count} user(s).', messages.SUCCESS)
+        self.run_bulk_action(request, queryset, lambda qs: credit_tokens_bulk(qs, 500),
+                             'Adding 500 tokens', 'Added 500 tokens to {count} user(s).')
     add_500_tokens.short_description = '🎃 Add 500 tokens to selected users'
     
     def add_1000_tokens(self, request, queryset):
         """Add 1000 tokens to selected users"""
-        count = 0
-        for user in queryset:
-            user.tokens += 1000
-            user.save()
-            count += 1
-        self.message_user(request, f'Added 1000 tokens to {count} user(s).', messages.SUCCESS)
+        self.run_bulk_action(request, queryset, lambda qs: credit_tokens_bulk(qs, 1000),
+                             'Adding 1000 tokens', 'Added 1000 tokens to {count} user(s).')
     add_1000_tokens.short_description = '🎃 Add 1000 tokens to selected users'
     
     def reset_tokens(self, request, queryset):
         """Reset tokens to 0 for selected users"""
-        count = 0
-        for user in queryset:
-            user.tokens = 0
-            user.save()
-            count += 1
-        self.message_user(request, f'Reset tokens for {count} user(s).', messages.WARNING)
+        self.run_bulk_action(request, queryset, lambda qs: set_tokens_bulk(qs, 0),
+                             'Resetting tokens', 'Reset tokens for {count} user(s).', messages.WARNING)
     reset_tokens.short_description = '🔄 Reset tokens to 0 for selected users'
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'tokens', 'plant_stage', 'plant_drops', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('user', 'tokens', 'plant_stage', 'plant_drops', 'updated_at')
+    
+    # Entries are copies kept in step by accounts.leaderboard; edit the user or plant instead
+    def has_add_permission(self, request):
+        return False
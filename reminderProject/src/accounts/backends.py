@@ -0,0 +1,54 @@
+"""
+Authentication backend that caches the logged-in user.
+
+AuthenticationMiddleware loads request.user through the backend's get_user()
+on every request. CachedModelBackend keeps the user object in Django's cache
+under its id. Together with the cached_db session engine, a typical page
+needs no session or users-table query.
+
+Cached users are dropped whenever the row changes: User post_save/post_delete
+(accounts.signals) and the token helpers in accounts.tokens, whose UPDATEs
+skip signals. Any other code that changes users with queryset.update() must
+call invalidate_cached_users() itself. With several worker processes use a
+shared cache backend, or a change made in one process stays invisible to
+the others for up to AUTH_USER_CACHE_TIMEOUT seconds.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+AUTH_USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60 * 15)
+
+
+def _cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user() is served from the cache"""
+
+    def get_user(self, user_id):
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        key = _cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, user, AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
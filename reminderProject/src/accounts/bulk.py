@@ -0,0 +1,150 @@
+"""
+Set-based admin actions with an optional chunked background mode.
+
+Small selections are updated with a single statement inside the admin
+request. Selections larger than BULK_ACTION_BACKGROUND_THRESHOLD are split
+into primary-key chunks and processed on a background thread, one short
+transaction per chunk, with progress kept in the cache so the admin can
+watch it at <admin changelist>/bulk-jobs/<job id>/.
+
+Progress lives in the BULK_ACTION_CACHE cache alias. The progress page may
+be served by another worker than the one running the job, so that alias
+must be shared between processes (the project uses a database cache); with
+a per-process LocMemCache the page 404s whenever a different worker answers.
+A job runs on a daemon thread of the worker that received the action and
+dies with it if that worker is restarted or recycled. Every saved step
+stamps the job with updated_at; a running job that hasn't moved for
+BULK_ACTION_STALE_SECONDS is reported as failed, so a lost job doesn't sit
+at 'running' until its cache entry expires.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+BULK_ACTION_BACKGROUND_THRESHOLD = getattr(settings, 'BULK_ACTION_BACKGROUND_THRESHOLD', 5000)
+BULK_ACTION_CHUNK_SIZE = getattr(settings, 'BULK_ACTION_CHUNK_SIZE', 1000)
+BULK_ACTION_CACHE = getattr(settings, 'BULK_ACTION_CACHE', 'default')
+BULK_ACTION_STALE_SECONDS = getattr(settings, 'BULK_ACTION_STALE_SECONDS', 10 * 60)
+JOB_TIMEOUT = 60 * 60 * 24
+
+
+def _job_key(job_id):
+    return f'bulk-job:{job_id}'
+
+
+def get_job(job_id):
+    """The stored job, with a running one that stopped saving progress shown as failed"""
+    job = caches[BULK_ACTION_CACHE].get(_job_key(job_id))
+    if job and job['status'] == 'running' and time.time() - job['updated_at'] > BULK_ACTION_STALE_SECONDS:
+        job = {
+            **job,
+            'status': 'failed',
+            'error': f'No progress for {BULK_ACTION_STALE_SECONDS // 60} minutes: the server process running '
+                     f'the job was probably restarted. The {job["done"]} rows processed so far were saved.',
+        }
+    return job
+
+
+def _save_job(job):
+    job['updated_at'] = time.time()
+    caches[BULK_ACTION_CACHE].set(_job_key(job['id']), job, JOB_TIMEOUT)
+
+
+def _run_in_chunks(model, pks, operation, job):
+    """Background thread body: apply `operation` to each chunk of primary keys"""
+    try:
+        for start in range(0, len(pks), BULK_ACTION_CHUNK_SIZE):
+            chunk = pks[start:start + BULK_ACTION_CHUNK_SIZE]
+            with transaction.atomic():
+                operation(model._default_manager.filter(pk__in=chunk))
+            job['done'] += len(chunk)
+            _save_job(job)
+        job['status'] = 'finished'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        _save_job(job)
+        close_old_connections()
+
+
+class BulkActionAdminMixin:
+    """ModelAdmin mixin: run set-based actions inline, or chunked in the background for big selections"""
+
+    def get_urls(self):
+        opts = self.model._meta
+        urls = [
+            path(
+                'bulk-jobs/<str:job_id>/',
+                self.admin_site.admin_view(self.bulk_job_view),
+                name=f'{opts.app_label}_{opts.model_name}_bulk_job',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def bulk_job_view(self, request, job_id):
+        """Progress of a background bulk action (HTML page, or JSON with ?format=json)"""
+        job = get_job(job_id)
+        if job is None:
+            raise Http404('Unknown or expired bulk job')
+        if request.GET.get('format') == 'json':
+            return JsonResponse(job)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': job['description'],
+            'job': job,
+            'percent': int(job['done'] * 100 / job['total']) if job['total'] else 100,
+        }
+        return render(request, 'admin/bulk_job_progress.html', context)
+
+    def run_bulk_action(self, request, queryset, operation, description, done_message, level=messages.SUCCESS):
+        """
+        Apply `operation(queryset)` (a single set-based UPDATE) to the selection.
+
+        `done_message` is formatted with {count}. Large selections are queued
+        as a background job and the admin gets a link to its progress page.
+        """
+        total = queryset.count()
+        if total <= BULK_ACTION_BACKGROUND_THRESHOLD:
+            operation(queryset)
+            self.message_user(request, done_message.format(count=total), level)
+            return
+
+        # Materialise the selection once so chunks don't shift while rows change
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        job = {
+            'id': uuid.uuid4().hex,
+            'description': description,
+            'total': len(pks),
+            'done': 0,
+            'status': 'running',
+        }
+        _save_job(job)
+        threading.Thread(
+            target=_run_in_chunks,
+            args=(self.model, pks, operation, job),
+            daemon=True,
+        ).start()
+
+        opts = self.model._meta
+        progress_url = reverse(
+            f'{self.admin_site.name}:{opts.app_label}_{opts.model_name}_bulk_job',
+            args=[job['id']],
+        )
+        self.message_user(
+            request,
+            format_html('{} ({} rows) is running in the background in this server process; '
+                        'restarting the server stops it. <a href="{}">View progress</a>',
+                        description, len(pks), progress_url),
+            messages.INFO,
+        )
@@ -0,0 +1,313 @@
+"""
+Global leaderboards: token balance and plant growth.
+
+Scores are copied into a snapshot table, LeaderboardEntry (one row per
+user), in the same transaction as the change that moves them: the token
+helpers in accounts.tokens, User and Plant saves (signals) and the plant
+bulk updates in PlantQuerySet. `manage.py rebuild_leaderboard` recomputes
+the table from scratch, e.g. after seeding.
+
+Each process ranks users with one in-memory RankIndex per board: a sorted
+array of 64-bit keys (score in the high bits, user id in the low bits)
+plus a score per user id, about 16 MB per board at a million users. A
+rank is one bisection (O(log n)); moving a user removes one key and
+inserts another (two memmoves of the array, ~0.2 ms at a million users). The index loads the whole table once, then applies only
+the entries whose updated_at moved since the last sync, at most every
+LEADERBOARD_SYNC_SECONDS (as the reminder worker does with tasks). Both
+read the primary, also when the leaderboard page reads from a replica: a
+sync that missed entries on a lagging replica would never see them again.
+Request threads read the index without a lock, so a published RankIndex
+is never changed: a load builds a new one, a sync changes a copy (two
+array copies, only when a score moved), and either is then swapped in.
+Deleted users drop out at the next full reload
+(LEADERBOARD_RELOAD_SECONDS).
+
+Users with the same score share a rank (1, 2, 2, 4); within a score the
+oldest account is listed first. Pages of the top list, with usernames,
+are cached for LEADERBOARD_PAGE_CACHE_SECONDS.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import LeaderboardEntry, User
+
+LEADERBOARD_PAGE_SIZE = getattr(settings, 'LEADERBOARD_PAGE_SIZE', 25)
+LEADERBOARD_PAGE_CACHE_SECONDS = getattr(settings, 'LEADERBOARD_PAGE_CACHE_SECONDS', 30)
+LEADERBOARD_SYNC_SECONDS = getattr(settings, 'LEADERBOARD_SYNC_SECONDS', 5)
+LEADERBOARD_RELOAD_SECONDS = getattr(settings, 'LEADERBOARD_RELOAD_SECONDS', 60 * 60)
+
+# Re-read a little before the last sync so entries committed late are not missed; re-applying is idempotent
+SYNC_OVERLAP = timedelta(seconds=30)
+
+USER_BITS = 32
+USER_MASK = (1 << USER_BITS) - 1
+MAX_SCORE = (1 << 31) - 1
+DROP_BITS = 24
+
+ENTRY_FIELDS = ['tokens', 'plant_stage', 'plant_drops', 'updated_at']
+# Where each entry column is copied from, relative to the user
+SOURCES = {'tokens': 'tokens', 'plant_stage': 'plant__growth_stage', 'plant_drops': 'plant__water_drops'}
+
+
+# ---- boards -----------------------------------------------------------------
+
+def plant_score(stage, drops):
+    """Growth stage first, then drops used on the plant"""
+    return (stage << DROP_BITS) + min(drops, (1 << DROP_BITS) - 1)
+
+
+@dataclass(frozen=True)
+class Board:
+    name: str
+    title: str
+    fields: tuple             # LeaderboardEntry columns the score is computed from
+    score: Callable
+    describe: Callable        # score -> display text
+
+    def score_of(self, entry):
+        return self.score(*(getattr(entry, field) for field in self.fields))
+
+
+BOARDS = {
+    'tokens': Board('tokens', 'Tokens', ('tokens',), lambda tokens: tokens,
+                    lambda score: f'{score} 🪙'),
+    'plant': Board('plant', 'Plant Growth', ('plant_stage', 'plant_drops'), plant_score,
+                   lambda score: f'Stage {score >> DROP_BITS} · {score & ((1 << DROP_BITS) - 1)} 💧'),
+}
+
+
+# ---- rank index -------------------------------------------------------------
+
+def _clamp(score):
+    return min(max(score, 0), MAX_SCORE)
+
+
+def _key(user_id, score):
+    # Higher scores sort last; within a score, lower user ids sort last (and are listed first)
+    return (score << USER_BITS) | (USER_MASK - user_id)
+
+
+class RankIndex:
+    """Users ordered by score in a sorted array of keys; change only a copy nobody reads yet (see Leaderboard.sync)"""
+
+    def __init__(self, scores=()):
+        self.load(scores)
+
+    def load(self, scores):
+        """Replace the contents with (user_id, score) pairs"""
+        pairs = [(user_id, _clamp(score)) for user_id, score in scores]
+        by_user = array('q', [-1]) * (max((user_id for user_id, _ in pairs), default=-1) + 1)
+        for user_id, score in pairs:
+            by_user[user_id] = score
+        self._scores = by_user
+        self._keys = array('q', sorted(_key(user_id, score) for user_id, score in pairs))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def copy(self):
+        index = RankIndex.__new__(RankIndex)
+        index._scores = array('q', self._scores)
+        index._keys = array('q', self._keys)
+        return index
+
+    def score_of(self, user_id):
+        if user_id < len(self._scores) and self._scores[user_id] >= 0:
+            return self._scores[user_id]
+        return None
+
+    def set(self, user_id, score):
+        score = _clamp(score)
+        old = self.score_of(user_id)
+        if old == score:
+            return
+        if old is None:
+            if user_id >= len(self._scores):
+                self._scores.extend(array('q', [-1]) * (user_id + 1 - len(self._scores)))
+        else:
+            del self._keys[bisect_left(self._keys, _key(user_id, old))]
+        insort(self._keys, _key(user_id, score))
+        self._scores[user_id] = score
+
+    def remove(self, user_id):
+        old = self.score_of(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, _key(user_id, old))]
+            self._scores[user_id] = -1
+
+    def rank_of_score(self, score):
+        """Rank of a user with this score: one more than the number of higher scores"""
+        # _key(0, score) is the largest key a score can have
+        return len(self._keys) - bisect_right(self._keys, _key(0, _clamp(score))) + 1
+
+    def rank(self, user_id):
+        score = self.score_of(user_id)
+        return None if score is None else self.rank_of_score(score)
+
+    def top(self, offset, limit):
+        """(rank, user_id, score) for the list positions offset .. offset + limit - 1, best first"""
+        keys = self._keys
+        rows = []
+        for position in range(offset, min(offset + limit, len(keys))):
+            key = keys[len(keys) - 1 - position]
+            score = key >> USER_BITS
+            if rows and rows[-1][2] == score:
+                rank = rows[-1][0]
+            elif rows:
+                rank = position + 1
+            else:
+                rank = self.rank_of_score(score)
+            rows.append((rank, USER_MASK - (key & USER_MASK), score))
+        return rows
+
+
+class Leaderboard:
+    """A board's RankIndex, kept in step with LeaderboardEntry for this process"""
+
+    def __init__(self, board):
+        self.board = board
+        self.index = RankIndex()
+        self._lock = threading.Lock()
+        self._synced_at = None      # database clock, for the updated_at range
+        self._loaded = None         # time.monotonic() of the last full load
+        self._checked = None
+
+    def _scores(self, entries):
+        for user_id, *values in entries.values_list('user_id', *self.board.fields).iterator(chunk_size=10000):
+            yield user_id, self.board.score(*values)
+
+    def load(self):
+        """Rebuild the index from the whole table"""
+        synced_at = timezone.now()
+        # Built aside and swapped in, so readers keep using the old index meanwhile
+        self.index = RankIndex(self._scores(LeaderboardEntry.objects.using(DEFAULT_DB_ALIAS)))
+        self._synced_at = synced_at
+        self._loaded = time.monotonic()
+
+    def sync(self):
+        """Apply the entries changed since the last load or sync"""
+        synced_at = timezone.now()
+        changed = LeaderboardEntry.objects.using(DEFAULT_DB_ALIAS).filter(updated_at__gt=self._synced_at - SYNC_OVERLAP)
+        # The overlap re-reads entries already applied; copy only for real moves
+        scores = [(user_id, score) for user_id, score in self._scores(changed)
+                  if self.index.score_of(user_id) != _clamp(score)]
+        if scores:
+            # Changed aside and swapped in like load(): readers may be inside the current index
+            index = self.index.copy()
+            for user_id, score in scores:
+                index.set(user_id, score)
+            self.index = index
+        self._synced_at = synced_at
+
+    def refresh(self):
+        """Load or sync, at most every LEADERBOARD_SYNC_SECONDS"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is not None and now - self._checked < LEADERBOARD_SYNC_SECONDS:
+                return
+            if self._loaded is None or now - self._loaded >= LEADERBOARD_RELOAD_SECONDS:
+                self.load()
+            else:
+                self.sync()
+            self._checked = now
+
+
+_leaderboards = {name: Leaderboard(board) for name, board in BOARDS.items()}
+
+
+def get_leaderboard(name):
+    leaderboard = _leaderboards[name]
+    leaderboard.refresh()
+    return leaderboard
+
+
+def _page_key(name, page):
+    return f'leaderboard:{name}:{page}'
+
+
+def top_page(name, page, page_size=LEADERBOARD_PAGE_SIZE):
+    """One page of the board as {'rows': [...], 'total': users ranked}; cached briefly"""
+    cached = cache.get(_page_key(name, page))
+    if cached is not None:
+        return cached
+    leaderboard = get_leaderboard(name)
+    # One index for the whole page; a sync may swap in a new one meanwhile
+    index = leaderboard.index
+    ranked = index.top((page - 1) * page_size, page_size)
+    usernames = dict(User.objects.filter(pk__in=[user_id for _, user_id, _ in ranked]).values_list('pk', 'username'))
+    result = {
+        'rows': [
+            {'rank': rank, 'user_id': user_id, 'username': usernames[user_id],
+             'score': leaderboard.board.describe(score)}
+            # Users deleted since the last full load are skipped
+            for rank, user_id, score in ranked if user_id in usernames
+        ],
+        'total': len(index),
+    }
+    if result['rows']:
+        cache.set(_page_key(name, page), result, LEADERBOARD_PAGE_CACHE_SECONDS)
+    return result
+
+
+def user_rank(name, user):
+    """(rank, score text) of the user from their current entry, even before this process has synced it"""
+    entry = LeaderboardEntry.objects.filter(user_id=user.pk).first()
+    if entry is None:
+        return None, None
+    leaderboard = get_leaderboard(name)
+    score = leaderboard.board.score_of(entry)
+    return leaderboard.index.rank_of_score(score), leaderboard.board.describe(score)
+
+
+# ---- keeping the snapshot up to date ---------------------------------------
+
+def _record(user_id, *fields):
+    # Copy the current values in the UPDATE itself, so a concurrent change can't be overwritten by an older read
+    source = User.objects.filter(pk=OuterRef('user_id'))
+    values = {field: Subquery(source.values(SOURCES[field])) for field in fields}
+    if not LeaderboardEntry.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **values):
+        refresh_entries([user_id])
+
+
+def record_tokens(user_id):
+    """Copy a user's token balance into their entry (call in the transaction that changed it)"""
+    _record(user_id, 'tokens')
+
+
+def record_plant(user_id):
+    """Copy a user's plant growth into their entry (call in the transaction that changed it)"""
+    _record(user_id, 'plant_stage', 'plant_drops')
+
+
+def refresh_entries(user_ids):
+    """Recompute these users' entries from User.tokens and their Plant; returns the number written"""
+    now = timezone.now()
+    rows = User.objects.filter(pk__in=user_ids).values_list('pk', 'tokens', 'plant__growth_stage', 'plant__water_drops')
+    return len(LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(user_id=user_id, tokens=tokens, plant_stage=stage or 1, plant_drops=drops or 0, updated_at=now)
+            for user_id, tokens, stage, drops in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=ENTRY_FIELDS,
+    ))
+
+
+def rebuild_entries(batch_size=1000, users=None):
+    """Recompute the entries of `users` (default: everyone) in batches; yields the number written per batch"""
+    users = User.objects.all() if users is None else users
+    user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        yield refresh_entries(user_ids[start:start + batch_size])
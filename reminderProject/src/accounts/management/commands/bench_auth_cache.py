@@ -0,0 +1,70 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from tasks.models import Task
+
+MODES = {
+    'Uncached (db sessions, ModelBackend)': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    },
+    'Cached (cached_db sessions, CachedModelBackend)': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['accounts.backends.CachedModelBackend'],
+    },
+}
+
+AUTH_TABLES = ('django_session', 'accounts_user')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks /tasks/ queries and latency with and without the session and user caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=50, help='Tasks for the benchmark user (default 50)')
+        parser.add_argument('--runs', type=int, default=200, help='Timed requests per mode (default 200)')
+
+    def handle(self, *args, **options):
+        # Build throwaway data and roll it back when done
+        with transaction.atomic():
+            user = User.objects.create(username=f'bench-auth-{time.time_ns()}')
+            now = timezone.now()
+            Task.objects.bulk_create([
+                Task(user=user, name=f'Benchmark task {i}', deadline=now + timedelta(minutes=i))
+                for i in range(options['tasks'])
+            ])
+            for label, overrides in MODES.items():
+                cache.clear()
+                with override_settings(ALLOWED_HOSTS=['testserver'], **overrides):
+                    self._report(label, *self._measure(user, options['runs']))
+            transaction.set_rollback(True)
+
+    def _measure(self, user, runs):
+        client = Client()
+        client.force_login(user)
+        client.get('/tasks/')  # warm the caches
+        # Not CaptureQueriesContext: request_started resets connection.queries mid-capture
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            client.get('/tasks/')
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            client.get('/tasks/')
+            timings.append((time.perf_counter() - start) * 1000)
+        auth_queries = [sql for sql in queries if any(f'"{table}"' in sql for table in AUTH_TABLES)]
+        return len(queries), len(auth_queries), timings
+
+    def _report(self, label, total, auth, timings):
+        self.stdout.write(
+            f'{label:48} {total:3d} queries/request ({auth} session/user)   '
+            f'median {statistics.median(timings):.2f}ms'
+        )
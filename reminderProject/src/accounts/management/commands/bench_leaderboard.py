@@ -0,0 +1,80 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.leaderboard import LEADERBOARD_PAGE_SIZE, RankIndex, plant_score
+from accounts.management.latency import percentile
+from accounts.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the in-memory rank index with synthetic users (load, rank, update, top pages), '
+        'and against COUNT(*) rank queries on the real leaderboard table when it has entries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help='Synthetic users (default 1,000,000)')
+        parser.add_argument('--runs', type=int, default=10000, help='Timed operations per measurement (default 10000)')
+        parser.add_argument('--sql-runs', type=int, default=20, help='Timed COUNT(*) rank queries (default 20)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['runs'] < 1:
+            raise CommandError('--users and --runs must be at least 1')
+        rng = random.Random(options['seed'])
+        users = options['users']
+
+        # Skewed like real balances: most players have a few tokens, a few have many
+        started = time.perf_counter()
+        index = RankIndex((user_id, int(rng.paretovariate(1.2) * 5)) for user_id in range(1, users + 1))
+        self.stdout.write(f'Loaded {len(index):,} users in {time.perf_counter() - started:.2f}s '
+                          f'(~{len(index) * 16 / 1e6:.0f} MB of arrays)')
+
+        ids = [rng.randint(1, users) for _ in range(options['runs'])]
+        self._report('rank(user)', self._time(index.rank, ids))
+        self._report('set(user, score)', self._time(lambda user_id: index.set(user_id, rng.randint(0, 500)), ids))
+        pages = [rng.randint(0, 40) * LEADERBOARD_PAGE_SIZE for _ in range(min(options['runs'], 1000))]
+        self._report(f'top page ({LEADERBOARD_PAGE_SIZE} rows)',
+                     self._time(lambda offset: index.top(offset, LEADERBOARD_PAGE_SIZE), pages))
+        started = time.perf_counter()
+        plant = RankIndex((user_id, plant_score(rng.randint(1, 4), rng.randint(0, 60))) for user_id in range(1, users + 1))
+        self.stdout.write(f'Plant board load (ties on few distinct scores): {time.perf_counter() - started:.2f}s')
+        self._report('plant rank(user)', self._time(plant.rank, ids))
+
+        self._compare_sql(options['sql_runs'], rng)
+
+    def _compare_sql(self, runs, rng):
+        """Rank by COUNT(*) of higher balances, the query the index replaces"""
+        entries = LeaderboardEntry.objects.count()
+        if not entries or runs < 1:
+            self.stdout.write('No leaderboard entries in the database; skipping the SQL comparison '
+                              '(seed_scale or rebuild_leaderboard fill them)')
+            return
+        scores = list(LeaderboardEntry.objects.order_by('?').values_list('tokens', flat=True)[:runs])
+        index = RankIndex(LeaderboardEntry.objects.values_list('user_id', 'tokens').iterator(chunk_size=10000))
+        sql = self._time(lambda score: LeaderboardEntry.objects.filter(tokens__gt=score).count(), scores)
+        memory = self._time(index.rank_of_score, scores)
+        self._report(f'SQL COUNT(*) rank, {entries:,} entries', sql)
+        self._report('index rank, same entries', memory)
+        self.stdout.write(self.style.SUCCESS(
+            f'Index rank is {statistics.median(sql) / statistics.median(memory):,.0f}x faster than COUNT(*)'
+        ))
+
+    @staticmethod
+    def _time(operation, arguments):
+        timings = []
+        for argument in arguments:
+            start = time.perf_counter()
+            operation(argument)
+            timings.append((time.perf_counter() - start) * 1e6)
+        return timings
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label:40} median {statistics.median(timings):9.1f}µs   '
+            f'p99 {percentile(timings, 99):9.1f}µs'
+        )
@@ -0,0 +1,213 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from accounts.management.latency import percentile
+from accounts.models import User
+from miniGame.ledger import rebuild_summaries
+from miniGame.models import Plant, WaterTransaction
+from tasks.models import Task
+
+PAGES = ('/tasks/', '/tokens/', '/game/', '/game/stats/')
+
+# (label, server, DJANGO_ASYNC_VIEWS)
+SCENARIOS = (
+    ('WSGI, sync views', 'wsgi', '0'),
+    ('ASGI, sync views', 'asgi', '0'),
+    ('ASGI, async views', 'asgi', '1'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the read-only pages under the WSGI and ASGI handlers at high concurrency. '
+        'Each scenario runs in a fresh process so the URLconf matches settings.ASYNC_VIEWS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario (default 2000)')
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients (default 200)')
+        parser.add_argument('--threads', type=int, default=16,
+                            help='WSGI worker threads, like a threaded server (default 16)')
+        parser.add_argument('--tasks', type=int, default=60, help='Tasks for the benchmark user (default 60)')
+        # Internal: run one scenario in this process and print its JSON result
+        parser.add_argument('--run-server', choices=['wsgi', 'asgi'], help='(internal)')
+        parser.add_argument('--session', help='(internal)')
+
+    def handle(self, *args, **options):
+        if options['run_server']:
+            result = asyncio.run(self._drive(options))
+            self.stdout.write(json.dumps(result))
+            return
+
+        user, session_key = self._create_data(options['tasks'])
+        try:
+            results = [(label, self._run_scenario(server, async_views, session_key, options))
+                       for label, server, async_views in SCENARIOS]
+        finally:
+            # Cascades to tasks, plant and transactions
+            user.delete()
+
+        self.stdout.write(
+            f'{options["requests"]} requests over {", ".join(PAGES)} with {options["concurrency"]} '
+            f'concurrent clients ({options["threads"]} WSGI threads)'
+        )
+        for label, result in results:
+            self.stdout.write(
+                f'  {label:<18} {result["throughput"]:8.1f} req/s   p50 {result["p50"]:8.1f} ms   '
+                f'p99 {result["p99"]:8.1f} ms   errors {result["errors"]}'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _create_data(self, tasks):
+        # The scenarios run in other processes, so the data has to be committed
+        user = User.objects.create(username=f'bench-servers-{time.time_ns()}', tokens=500)
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(user=user, name=f'Benchmark task {i}', deadline=now + timedelta(hours=i - tasks // 2),
+                 status='Completed' if i < tasks // 2 else 'Pending')
+            for i in range(tasks)
+        ])
+        Plant.objects.create(user=user, drops_purchased=20)
+        WaterTransaction.objects.bulk_create([
+            WaterTransaction(user=user, tokens_spent=5, water_drops_received=1) for _ in range(20)
+        ])
+        rebuild_summaries(WaterTransaction.objects.filter(user=user))
+        client = Client()
+        client.force_login(user)
+        return user, client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def _run_scenario(self, server, async_views, session_key, options):
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_servers',
+            '--run-server', server, '--session', session_key,
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+            '--threads', str(options['threads']),
+        ]
+        env = {**os.environ, 'DJANGO_ASYNC_VIEWS': async_views}
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f'{server} scenario failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # ---- scenario process -------------------------------------------------
+
+    async def _drive(self, options):
+        """Closed loop: `concurrency` clients each send requests until the total is reached"""
+        cookie = f'{settings.SESSION_COOKIE_NAME}={options["session"]}'
+        if options['run_server'] == 'wsgi':
+            handler = WSGIHandler()
+            pool = ThreadPoolExecutor(max_workers=options['threads'])
+            loop = asyncio.get_running_loop()
+
+            async def fetch(path):
+                return await loop.run_in_executor(pool, _wsgi_get, handler, path, cookie)
+        else:
+            handler = ASGIHandler()
+
+            async def fetch(path):
+                return await _asgi_get(handler, path, cookie)
+
+        # One warm-up pass so imports and template loading are not timed
+        for path in PAGES:
+            await fetch(path)
+
+        latencies = []
+        errors = 0
+        remaining = iter(range(options['requests']))
+
+        async def client():
+            nonlocal errors
+            for i in remaining:
+                start = time.perf_counter()
+                status = await fetch(PAGES[i % len(PAGES)])
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': percentile(latencies, 99),
+            'errors': errors,
+        }
+
+
+def _wsgi_get(handler, path, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+    }
+    status = []
+    response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+    for _ in response:
+        pass
+    response.close()
+    return int(status[0].split()[0])
+
+
+async def _asgi_get(handler, path, cookie):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    body_sent = False
+    finished = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the response is complete
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    await handler(scope, receive, send)
+    return status[0]
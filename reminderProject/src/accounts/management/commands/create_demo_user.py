@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import User
+from accounts.tokens import set_tokens
 from tasks.models import Task
 
 
@@ -22,8 +23,7 @@ class Command(BaseCommand):
         
         if not created:
             # Update existing demo user
-            demo_user.tokens = 1000
-            demo_user.save()
+            set_tokens(demo_user, 1000)
             self.stdout.write(self.style.WARNING('Demo user already exists. Updated tokens to 1000.'))
         else:
             # Set password for new user
@@ -126,13 +126,9 @@ class Command(BaseCommand):
             },
         ]
         
-        # Create all tasks
+        # Create all tasks in one INSERT (seed_scale builds large datasets the same way)
         all_tasks = completed_tasks + pending_tasks
-        for task_data in all_tasks:
-            Task.objects.create(
-                user=demo_user,
-                **task_data
-            )
+        Task.objects.bulk_create([Task(user=demo_user, **task_data) for task_data in all_tasks])
         
         self.stdout.write(self.style.SUCCESS(f'Created {len(completed_tasks)} completed tasks'))
         self.stdout.write(self.style.SUCCESS(f'Created {len(pending_tasks)} pending tasks'))
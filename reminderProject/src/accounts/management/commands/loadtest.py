@@ -0,0 +1,287 @@
+import json
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.http import parse_cookie
+from django.shortcuts import resolve_url
+from django.utils import timezone
+
+from accounts.management.latency import percentile
+from accounts.models import User
+from miniGame.models import Plant
+from tasks.models import Task
+
+# Route name -> default weight in the mix
+DEFAULT_MIX = {
+    'task_list': 5,
+    'task_create': 1,
+    'task_complete': 2,
+    'game_home': 3,
+    'buy_water': 1,
+    'water_plant': 1,
+    'game_stats': 2,
+    'tokens': 1,
+}
+
+PENDING_TASKS_PER_USER = 200
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Time each request on its own: redirects come back as responses instead of being followed"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualUser:
+    """One logged-in browser session (own cookie jar) driven by one thread"""
+
+    def __init__(self, base_url, username, password, task_ids, rng):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.task_ids = task_ids
+        self.rng = rng
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        return next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), '')
+
+    def clear_messages(self):
+        """Drop the messages cookie, so last_message_level() only sees what the next response adds"""
+        for cookie in [c for c in self.cookies if c.name == CookieStorage.cookie_name]:
+            self.cookies.clear(cookie.domain, cookie.path, cookie.name)
+
+    def last_message_level(self):
+        """
+        Level of the newest flash message in the messages cookie, or None. Both
+        a created task and a quota refusal redirect to the task list; only the
+        message tells them apart. Needs the server's SECRET_KEY to verify it.
+        """
+        value = next((c.value for c in self.cookies if c.name == CookieStorage.cookie_name), None)
+        if value is None:
+            return None
+        # parse_cookie undoes the quoting the server may have applied
+        raw = parse_cookie(f'{CookieStorage.cookie_name}={value}').get(CookieStorage.cookie_name)
+        messages = CookieStorage(None)._decode(raw) or []
+        return messages[-1].level if messages else None
+
+    def request(self, method, path, data=None):
+        """Send one request; returns (status, Location header)"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if method == 'POST':
+            req.add_header('X-CSRFToken', self._csrf_token())
+            req.add_header('Referer', self.base_url + path)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status, response.headers.get('Location', '')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get('Location', '')
+
+    def login(self):
+        self.request('GET', '/login/')  # sets the csrftoken cookie
+        status, location = self.request('POST', '/login/', {'username': self.username, 'password': self.password})
+        if status != 302:
+            raise CommandError(f'Login failed for {self.username} (HTTP {status})')
+
+    # Each route returns (method, path, data)
+    def task_list(self):
+        return 'GET', '/tasks/', None
+
+    def task_create(self):
+        self.clear_messages()
+        deadline = timezone.localtime() + timedelta(minutes=5)
+        return 'POST', '/tasks/create/', {
+            'name': f'Load test task {self.rng.randrange(10**6)}',
+            'deadline': deadline.strftime('%Y-%m-%dT%H:%M'),
+            'priority': self.rng.choice(['High', 'Medium', 'Low']),
+        }
+
+    def task_complete(self):
+        task_id = self.task_ids.pop() if self.task_ids else 0
+        return 'GET', f'/tasks/{task_id}/complete/', None
+
+    def game_home(self):
+        return 'GET', '/game/', None
+
+    def buy_water(self):
+        return 'POST', '/game/buy-water/', {'drops': 1}
+
+    def water_plant(self):
+        return 'POST', '/game/water-plant/', {'drops': 1}
+
+    def game_stats(self):
+        return 'GET', '/game/stats/', None
+
+    def tokens(self):
+        return 'GET', '/tokens/', None
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests a running server: logs in synthetic users and runs a weighted mix of routes '
+        'from concurrent threads, then reports throughput, p50/p95/p99 and error rate per route as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users, one thread each')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run (after login)')
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help='Route weights, e.g. "task_list=5,game_home=3" (routes: %s)' % ', '.join(DEFAULT_MIX))
+        parser.add_argument('--think-time', type=float, default=0, help='Milliseconds each user waits between requests')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the route choice')
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix of the synthetic users')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--keep-users', action='store_true', help='Keep the synthetic users afterwards')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        users = self._create_users(options)
+        try:
+            report = self._run(users, mix, options)
+        finally:
+            if not options['keep_users']:
+                User.objects.filter(username__startswith=f'{options["prefix"]}-').delete()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def _parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            name = name.strip()
+            if name not in DEFAULT_MIX:
+                raise CommandError(f'Unknown route "{name}"; choose from {", ".join(DEFAULT_MIX)}')
+            mix[name] = float(weight or 1)
+        return mix
+
+    def _create_users(self, options):
+        """Synthetic users with tokens, a plant and pending tasks to complete (written straight to the DB)"""
+        prefix = options['prefix']
+        User.objects.filter(username__startswith=f'{prefix}-').delete()
+        # Hash once; every synthetic user shares the password
+        password_hash = make_password(options['password'])
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', password=password_hash, tokens=100000)
+            for i in range(options['users'])
+        ])
+        Plant.objects.bulk_create([Plant(user=user) for user in users])
+        deadline = timezone.now() + timedelta(hours=1)
+        Task.objects.bulk_create([
+            Task(user=user, name=f'Load test pending {n}', deadline=deadline)
+            for user in users for n in range(PENDING_TASKS_PER_USER)
+        ])
+        task_ids = defaultdict(list)
+        for user_id, task_id in Task.objects.filter(user__in=users).values_list('user_id', 'id'):
+            task_ids[user_id].append(task_id)
+        return [(user, task_ids[user.id]) for user in users]
+
+    def _run(self, users, mix, options):
+        routes, weights = list(mix), list(mix.values())
+        virtual_users = [
+            VirtualUser(options['url'], user.username, options['password'], task_ids,
+                        random.Random(options['seed'] + i))
+            for i, (user, task_ids) in enumerate(users)
+        ]
+        for vu in virtual_users:
+            vu.login()
+
+        samples = defaultdict(list)  # route -> [(latency ms, ok, status, refused)]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        think = options['think_time'] / 1000
+        login_path = resolve_url(settings.LOGIN_URL)
+
+        def worker(vu):
+            while time.perf_counter() < deadline:
+                route = vu.rng.choices(routes, weights)[0]
+                method, path, data = getattr(vu, route)()
+                start = time.perf_counter()
+                try:
+                    status, location = vu.request(method, path, data)
+                except OSError:
+                    status, location = 0, ''
+                latency = (time.perf_counter() - start) * 1000
+                # A bounce to the login page means the session was lost
+                ok = 0 < status < 400 and not location.startswith(login_path)
+                # A task refused by the quota redirects like a created one; only a success message counts
+                refused = route == 'task_create' and ok and vu.last_message_level() != message_constants.SUCCESS
+                with lock:
+                    samples[route].append((latency, ok and not refused, status, refused))
+                if think:
+                    time.sleep(think)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(vu,)) for vu in virtual_users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'url': options['url'],
+            'commit': self._commit(),
+            'users': len(virtual_users),
+            'duration_s': round(elapsed, 2),
+            'mix': mix,
+            'total': self._summarise([s for route_samples in samples.values() for s in route_samples], elapsed),
+            'routes': {route: self._summarise(samples[route], elapsed) for route in routes if samples[route]},
+        }
+
+    def _summarise(self, samples, elapsed):
+        """Counts and latencies of some samples; the latencies are None when there are none (e.g. --duration 0)"""
+        latencies = sorted(s[0] for s in samples)
+        errors = sum(1 for s in samples if not s[1])
+        statuses = defaultdict(int)
+        for s in samples:
+            statuses[str(s[2])] += 1
+
+        def ms(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+            # Refusals (task quota reached) are errors too, counted apart to tell them from server failures
+            'error_rate': round(errors / len(samples), 4) if samples else 0,
+            'refused': sum(1 for s in samples if s[3]),
+            'p50_ms': ms(percentile(latencies, 50)),
+            'p95_ms': ms(percentile(latencies, 95)),
+            'p99_ms': ms(percentile(latencies, 99)),
+            'max_ms': ms(latencies[-1] if latencies else None),
+            'status_counts': dict(statuses),
+        }
+
+    def _commit(self):
+        """Current git commit, so reports from different builds can be told apart"""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                cwd=settings.BASE_DIR, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.leaderboard import rebuild_entries
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every leaderboard entry from the token balances and plants (see accounts/leaderboard.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per upsert (default 1000)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        started = time.perf_counter()
+        total = 0
+        for written in rebuild_entries(options['batch_size']):
+            total += written
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {total} entries')
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} leaderboard entries in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,292 @@
+import csv
+import io
+import random
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.leaderboard import rebuild_entries
+from accounts.models import User
+from miniGame.ledger import rebuild_summaries
+from miniGame.models import Plant, WaterDailySummary, WaterTransaction
+from miniGame.views import TOKENS_PER_DROP
+from tasks.models import Task
+
+TASK_NAMES = [
+    '🎃 Carve pumpkin', '👻 Plan costume', '🦇 Clean the attic', '🕷️ Dust cobwebs', '🍬 Buy candy',
+    '📚 Study session', '🏋️ Workout', '🛒 Grocery run', '💻 Code review', '📧 Reply to emails',
+    '🧹 Tidy room', '📞 Call family', '🎬 Movie night', '📝 Write report', '🚗 Car service',
+]
+CATEGORIES = ['Work', 'School', 'Home', 'Personal', 'Shopping', 'Health', 'Social', None]
+PRIORITIES = ['High', 'Medium', 'Low']
+
+TASK_COLUMNS = ('user_id', 'name', 'deadline', 'priority', 'category', 'status', 'created_at', 'updated_at')
+TRANSACTION_COLUMNS = ('user_id', 'tokens_spent', 'water_drops_received', 'timestamp')
+
+# Pareto shape for tasks per user: ~1.16 gives the classic 80/20 split
+PARETO_ALPHA = 1.16
+
+
+@dataclass
+class UserPlan:
+    """Everything decided up front for one synthetic user"""
+    index: int
+    tasks: int
+    pending: int
+    drops_bought: int
+    drops_used: int
+    tokens: int
+    has_plant: bool
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the generated created_at/updated_at values instead of stamping now()"""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a large, deterministic synthetic dataset: users with skewed task counts and long '
+        'completed histories, plants and water purchases paid for with earned tokens. '
+        'Uses batched bulk_create, or COPY on PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=100000, help='Total tasks across all users')
+        parser.add_argument('--days', type=int, default=365, help='How far back completed histories go')
+        parser.add_argument('--seed', type=int, default=42, help='Same seed and anchor give the same data')
+        parser.add_argument('--anchor', help='Reference date YYYY-MM-DD for all timestamps (default: today)')
+        parser.add_argument('--prefix', default='seed', help='Users are named <prefix>0000000...; an earlier run is replaced')
+        parser.add_argument('--password', default='seed123', help='Password of every synthetic user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['tasks'] < 0:
+            raise CommandError('--users must be at least 1 and --tasks must not be negative')
+        self.options = options
+        self.prefix = options['prefix']
+        anchor_date = datetime.strptime(options['anchor'], '%Y-%m-%d').date() if options['anchor'] else timezone.localdate()
+        self.anchor = timezone.make_aware(datetime.combine(anchor_date, datetime.min.time()))
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        started = time.perf_counter()
+        self._clear()
+        plans = self._plan()
+        with transaction.atomic():
+            user_ids = self._create_users(plans)
+            self._timed('tasks', Task, TASK_COLUMNS, self._task_rows(plans, user_ids))
+            self._timed('water transactions', WaterTransaction, TRANSACTION_COLUMNS,
+                        self._transaction_rows(plans, user_ids))
+            self._summarise_purchases()
+            self._create_plants(plans, user_ids)
+            self._rank_users()
+        # Fresh planner statistics for the new data
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(plans)} users and {sum(p.tasks for p in plans)} tasks in '
+            f'{time.perf_counter() - started:.1f}s ({"COPY" if self.use_copy else "bulk_create"}). '
+            f'Log in as {self.prefix}0000000 / {options["password"]}.'
+        ))
+
+    # ---- planning ---------------------------------------------------------
+
+    def _rng(self, *parts):
+        # String seeds are hashed deterministically, so every stream is reproducible on its own
+        return random.Random('-'.join(str(p) for p in (self.options['seed'], *parts)))
+
+    def _plan(self):
+        """Per-user task counts (Pareto-skewed) and a token economy consistent with them"""
+        rng = self._rng('plan')
+        n, total = self.options['users'], self.options['tasks']
+        weights = [rng.paretovariate(PARETO_ALPHA) for _ in range(n)]
+        scale = total / sum(weights)
+        counts = [int(w * scale) for w in weights]
+        # Hand out the rounding remainder to the heaviest users
+        for i in sorted(range(n), key=lambda i: -weights[i])[:total - sum(counts)]:
+            counts[i] += 1
+
+        plans = []
+        for i, count in enumerate(counts):
+            pending = min(count, rng.randint(0, 8))
+            completed = count - pending
+            # Each completed task earned a token; some of it was spent on water
+            drops_bought = int(completed * rng.uniform(0.2, 0.9)) // TOKENS_PER_DROP
+            plans.append(UserPlan(
+                index=i,
+                tasks=count,
+                pending=pending,
+                drops_bought=drops_bought,
+                drops_used=rng.randint(0, drops_bought),
+                tokens=completed - drops_bought * TOKENS_PER_DROP,
+                has_plant=drops_bought > 0 or rng.random() < 0.5,
+            ))
+        return plans
+
+    def _username(self, index):
+        return f'{self.prefix}{index:07d}'
+
+    # ---- rows ---------------------------------------------------------------
+
+    def _task_rows(self, plans, user_ids):
+        days = self.options['days']
+        for plan in plans:
+            rng = self._rng('tasks', plan.index)
+            user_id = user_ids[plan.index]
+            for n in range(plan.tasks):
+                if n < plan.pending:
+                    deadline = self.anchor + timedelta(hours=rng.uniform(0, 72))
+                    status = 'In Progress' if rng.random() < 0.2 else 'Pending'
+                    created_at = self.anchor - timedelta(hours=rng.uniform(0, 48))
+                    updated_at = created_at
+                else:
+                    deadline = self.anchor - timedelta(days=rng.uniform(0, days))
+                    status = 'Completed'
+                    created_at = deadline - timedelta(hours=rng.uniform(1, 168))
+                    updated_at = min(deadline + timedelta(hours=rng.uniform(-12, 2)), self.anchor)
+                yield (
+                    user_id,
+                    f'{rng.choice(TASK_NAMES)} #{n + 1}',
+                    deadline,
+                    rng.choices(PRIORITIES, weights=(2, 5, 3))[0],
+                    rng.choice(CATEGORIES),
+                    status,
+                    created_at,
+                    updated_at,
+                )
+
+    def _transaction_rows(self, plans, user_ids):
+        days = self.options['days']
+        for plan in plans:
+            rng = self._rng('water', plan.index)
+            remaining = plan.drops_bought
+            while remaining:
+                drops = min(remaining, rng.randint(1, 10))
+                remaining -= drops
+                timestamp = self.anchor - timedelta(days=rng.uniform(0, days))
+                yield (user_ids[plan.index], drops * TOKENS_PER_DROP, drops, timestamp)
+
+    # ---- writing ------------------------------------------------------------
+
+    def _clear(self):
+        """Remove an earlier run with the same prefix, children first with plain DELETEs"""
+        users = self._seed_users().values('pk')
+        # _raw_delete skips loading every row for signals/cascades, which matters at millions of rows
+        for model in (Task, WaterTransaction, WaterDailySummary, Plant):
+            model.objects.filter(user__in=users)._raw_delete(model.objects.db)
+        self._seed_users().delete()
+
+    def _seed_users(self):
+        return User.objects.filter(username__regex=rf'^{re.escape(self.prefix)}[0-9]{{7}}$')
+
+    def _create_users(self, plans):
+        password = make_password(self.options['password'])
+        for batch in batched(plans, self.options['batch_size']):
+            User.objects.bulk_create([
+                User(
+                    username=self._username(plan.index),
+                    email=f'{self._username(plan.index)}@example.com',
+                    password=password,
+                    tokens=plan.tokens,
+                    date_joined=self.anchor - timedelta(days=self.options['days']),
+                )
+                for plan in batch
+            ])
+        ids = dict(self._seed_users().values_list('username', 'pk'))
+        return [ids[self._username(plan.index)] for plan in plans]
+
+    def _create_plants(self, plans, user_ids):
+        plants = []
+        for plan in plans:
+            if not plan.has_plant:
+                continue
+            stage, progress = Plant.grow(1, 0, plan.drops_used)
+            plants.append(Plant(
+                user_id=user_ids[plan.index],
+                growth_stage=stage,
+                water_progress=progress,
+                water_drops=plan.drops_used,
+                drops_purchased=plan.drops_bought,
+            ))
+        Plant.objects.bulk_create(plants, batch_size=self.options['batch_size'])
+
+    def _summarise_purchases(self):
+        """Daily purchase summaries, aggregated in the database from the rows just written"""
+        started = time.perf_counter()
+        count = rebuild_summaries(WaterTransaction.objects.filter(user__in=self._seed_users().values('pk')),
+                                  batch_size=self.options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  daily purchase summaries: {count} rows in {elapsed:.1f}s')
+
+    def _rank_users(self):
+        """Leaderboard entries for the new users (bulk_create sent no signals)"""
+        started = time.perf_counter()
+        count = sum(rebuild_entries(self.options['batch_size'], self._seed_users()))
+        self.stdout.write(f'  leaderboard entries: {count} rows in {time.perf_counter() - started:.1f}s')
+
+    def _timed(self, label, model, columns, rows):
+        started = time.perf_counter()
+        if self.use_copy:
+            count = self._copy(model, columns, rows)
+        else:
+            count = self._bulk_create(model, columns, rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  {label}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)')
+
+    def _bulk_create(self, model, columns, rows):
+        count = 0
+        timestamp_fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+        with explicit_timestamps(*timestamp_fields):
+            for batch in batched(rows, self.options['batch_size']):
+                model.objects.bulk_create([model(**dict(zip(columns, row))) for row in batch])
+                count += len(batch)
+        return count
+
+    def _copy(self, model, columns, rows):
+        """COPY ... FROM STDIN, with psycopg 3's row writer or psycopg2's copy_expert"""
+        qn = connection.ops.quote_name
+        sql = f'COPY {qn(model._meta.db_table)} ({", ".join(qn(model._meta.get_field(c).column) for c in columns)}) FROM STDIN'
+        count = 0
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):
+                with raw.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        count += 1
+                return count
+            for batch in batched(rows, self.options['batch_size']):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in batch:
+                    # An unquoted empty field is NULL in CSV COPY
+                    writer.writerow(['' if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row])
+                buffer.seek(0)
+                raw.copy_expert(f'{sql} WITH (FORMAT csv)', buffer)
+                count += len(batch)
+        return count
@@ -0,0 +1,12 @@
+"""Latency statistics shared by the benchmark and load-test commands"""
+import math
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list: the smallest value
+    with at least pct% of the values at or below it. None when empty.
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(pct / 100 * len(sorted_values)), 1) - 1]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_entries(apps, schema_editor):
+    """Copy every user's token balance and plant growth into the leaderboard snapshot"""
+    User = apps.get_model('accounts', 'User')
+    LeaderboardEntry = apps.get_model('accounts', 'LeaderboardEntry')
+
+    rows = User.objects.values_list('pk', 'tokens', 'plant__growth_stage', 'plant__water_drops')
+    LeaderboardEntry.objects.bulk_create(
+        (
+            LeaderboardEntry(user_id=user_id, tokens=tokens, plant_stage=stage or 1, plant_drops=drops or 0)
+            for user_id, tokens, stage, drops in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        # The backfill reads Plant through the user's reverse relation
+        ('miniGame', '0005_waterdailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('tokens', models.IntegerField(default=0)),
+                ('plant_stage', models.IntegerField(default=1)),
+                ('plant_drops', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Leaderboard entries',
+                'indexes': [models.Index(fields=['updated_at'], name='leaderboard_updated_at_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from datetime import date
 
 # Create your models here.
@@ -23,3 +24,22 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.username
+
+
+class LeaderboardEntry(models.Model):
+    """A user's leaderboard scores, copied from User.tokens and their Plant (see accounts.leaderboard)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='leaderboard_entry')
+    tokens = models.IntegerField(default=0)
+    plant_stage = models.IntegerField(default=1)
+    plant_drops = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name_plural = 'Leaderboard entries'
+        indexes = [
+            # Processes pick up changed entries with a range scan (incremental rank index sync)
+            models.Index(fields=['updated_at'], name='leaderboard_updated_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.tokens} tokens, plant stage {self.plant_stage}"
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate_cached_user
+from .leaderboard import record_tokens
+from .models import User
+from .tokens import publish_tokens
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Drop the cached request.user on any save (profile edits, password changes, last_login)"""
+    # Now and again once committed, so a request that read the old row mid-transaction can't cache it
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """New users join the leaderboard; full saves (admin edits) may have changed the balance"""
+    if created or update_fields is None or 'tokens' in update_fields:
+        record_tokens(instance.pk)
+        if not created:
+            publish_tokens([instance.pk])
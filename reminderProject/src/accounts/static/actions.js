@@ -0,0 +1,58 @@
+// Async request mode (myproject/partials.py) for links and forms marked data-async.
+// The request carries X-Requested-With; each top-level element of the HTML fragment that comes
+// back replaces the page element with the same id, or removes it when marked data-remove.
+// Anything but a fragment (a login redirect, a server error) falls back to a normal page load.
+(function () {
+    function swap(html) {
+        const fragment = document.createElement('template');
+        fragment.innerHTML = html;
+        for (const element of Array.from(fragment.content.children)) {
+            const current = element.id && document.getElementById(element.id);
+            if (!current) continue;
+            if (element.hasAttribute('data-remove')) {
+                current.remove();
+            } else {
+                current.replaceWith(element);
+            }
+        }
+        document.dispatchEvent(new CustomEvent('fragment:swapped'));
+    }
+
+    async function send(url, options, fallback) {
+        let response;
+        try {
+            response = await fetch(url, { ...options, headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+        } catch (error) {
+            fallback();
+            return;
+        }
+        if (response.redirected) {
+            window.location = response.url;
+        } else if (response.ok || response.status === 400) {
+            // 400: the action was refused; the fragment carries the message
+            swap(await response.text());
+        } else {
+            fallback();
+        }
+    }
+
+    document.addEventListener('click', (e) => {
+        const link = e.target.closest('a[data-async]');
+        // defaultPrevented: an onclick confirm() was cancelled
+        if (!link || e.defaultPrevented || e.button !== 0 || e.metaKey || e.ctrlKey || e.shiftKey) return;
+        e.preventDefault();
+        send(link.href, {}, () => { window.location = link.href; });
+    });
+
+    document.addEventListener('submit', (e) => {
+        const form = e.target.closest('form[data-async]');
+        if (!form || e.defaultPrevented) return;
+        e.preventDefault();
+        // No double submits while waiting; a swapped-in form brings its own button
+        const button = form.querySelector('button[type="submit"]');
+        if (button) button.disabled = true;
+        send(form.action, { method: 'POST', body: new FormData(form) }, () => form.submit()).finally(() => {
+            if (button && button.isConnected) button.disabled = false;
+        });
+    });
+})();
@@ -0,0 +1,24 @@
+// Live updates (myproject/events.py): one EventSource per page instead of reloading or polling.
+// Every field of an event is written into the elements marked data-live="<event>.<field>", e.g.
+// data-live="tokens.tokens"; pages handle anything else by listening for "live:<event>" on document.
+// Without EventSource, or under WSGI where /events/ answers 204, the page just stays as rendered.
+(function () {
+    const script = document.currentScript;
+    if (!window.EventSource || !script) return;
+    const source = new EventSource(script.dataset.eventsUrl);
+
+    ['task', 'tokens', 'plant'].forEach((type) => {
+        source.addEventListener(type, (e) => {
+            const data = JSON.parse(e.data);
+            for (const [field, value] of Object.entries(data)) {
+                document.querySelectorAll(`[data-live="${type}.${field}"]`).forEach((element) => {
+                    element.textContent = value;
+                });
+            }
+            document.dispatchEvent(new CustomEvent(`live:${type}`, { detail: data }));
+        });
+    });
+
+    // Leaving the page closes the stream straight away rather than at the next keepalive
+    window.addEventListener('pagehide', () => source.close());
+})();
@@ -1,3 +1,254 @@
-from django.test import TestCase
+import random
+import re
+import time
+from unittest import mock
+from http.cookiejar import Cookie
 
-# Create your tests here.
+from django.contrib.messages import constants as message_constants
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from miniGame.models import Plant
+from .management.commands.loadtest import Command as LoadtestCommand, VirtualUser
+from .management.latency import percentile
+from . import bulk
+from .backends import CachedModelBackend, _cache_key
+from .leaderboard import BOARDS, Leaderboard, RankIndex, get_leaderboard, plant_score
+from .models import LeaderboardEntry, User
+from .tokens import credit_tokens, credit_tokens_bulk, debit_tokens, set_tokens, set_tokens_bulk
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='pw', tokens=3)
+        self.client.force_login(self.user)
+        self.client.get('/tokens/')  # warm the session and user caches
+
+    def _auth_queries(self, path):
+        queries = []
+
+        def record(execute, sql, *args):
+            queries.append(sql)
+            return execute(sql, *args)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [sql for sql in queries if '"django_session"' in sql or '"accounts_user"' in sql]
+
+    def test_page_view_makes_no_auth_queries(self):
+        self.assertEqual(self._auth_queries('/tasks/'), [])
+
+    def test_token_changes_invalidate_cached_user(self):
+        credit_tokens(self.user, 2)
+        self.assertContains(self.client.get('/tokens/'), '<div class="token-count" data-live="tokens.tokens">5</div>', html=True)
+        set_tokens_bulk(User.objects.filter(pk=self.user.pk), 42)
+        self.assertContains(self.client.get('/tokens/'), '<div class="token-count" data-live="tokens.tokens">42</div>', html=True)
+
+    def test_changes_invalidate_cached_user_again_on_commit(self):
+        backend = CachedModelBackend()
+        for change in (lambda: credit_tokens(self.user, 1), lambda: debit_tokens(self.user, 1),
+                       lambda: set_tokens(self.user, 9), lambda: self.user.save()):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+                # A request that ran mid-transaction caches the row as it was
+                cache.set(_cache_key(self.user.pk), 'stale')
+            self.assertNotEqual(backend.get_user(self.user.pk), 'stale')
+
+    def test_save_invalidates_cached_user(self):
+        self.user.first_name = 'Casper'
+        self.user.save()
+        self.assertEqual(len(self._auth_queries('/tokens/')), 1)  # reloaded once, then cached again
+        self.assertEqual(self._auth_queries('/tokens/'), [])
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'player{i}', password='pw', tokens=tokens)
+                      for i, tokens in enumerate((10, 30, 30, 5))]
+
+    def test_rank_index_ranks_ties_together(self):
+        index = RankIndex([(1, 10), (2, 30), (3, 30), (4, 5)])
+        self.assertEqual([index.rank(user_id) for user_id in (1, 2, 3, 4)], [3, 1, 1, 4])
+        # Within a score the lower id is listed first
+        self.assertEqual(index.top(0, 4), [(1, 2, 30), (1, 3, 30), (3, 1, 10), (4, 4, 5)])
+        self.assertEqual(index.top(1, 2), [(1, 3, 30), (3, 1, 10)])
+
+        index.set(4, 50)
+        index.set(7, 0)
+        index.remove(3)
+        self.assertEqual(len(index), 4)
+        self.assertEqual([index.rank(user_id) for user_id in (4, 2, 1, 7, 3)], [1, 2, 3, 4, None])
+        self.assertEqual(index.rank_of_score(20), 3)
+
+    def test_token_and_plant_changes_update_entries(self):
+        first, second = self.users[:2]
+        self.assertEqual(LeaderboardEntry.objects.get(user=first).tokens, 10)
+        credit_tokens(first, 5)
+        debit_tokens(second, 4)
+        plant = Plant.objects.create(user=first)
+        plant.apply_drops(5)
+        Plant.objects.filter(user=second).add_water_drops(1)  # no plant: nothing to update
+        Plant.objects.create(user=second)
+        Plant.objects.filter(user=second).add_water_drops(9)
+
+        entries = {entry.user_id: entry for entry in LeaderboardEntry.objects.all()}
+        self.assertEqual((entries[first.pk].tokens, entries[first.pk].plant_stage, entries[first.pk].plant_drops), (15, 2, 5))
+        self.assertEqual((entries[second.pk].tokens, entries[second.pk].plant_stage, entries[second.pk].plant_drops), (26, 3, 9))
+
+    def test_sync_applies_changed_entries(self):
+        leaderboard = Leaderboard(BOARDS['tokens'])
+        leaderboard.load()
+        self.assertEqual(leaderboard.index.rank(self.users[3].pk), 4)
+        credit_tokens(self.users[3], 100)
+        before = leaderboard.index
+        leaderboard.sync()
+        self.assertEqual(leaderboard.index.rank(self.users[3].pk), 1)
+        self.assertEqual(leaderboard.index.rank(self.users[1].pk), 2)
+        # A reader still holding the previous index sees it unchanged, never half-applied
+        self.assertIsNot(leaderboard.index, before)
+        self.assertEqual(before.rank(self.users[3].pk), 4)
+        self.assertEqual(before.top(0, 4), [(1, self.users[1].pk, 30), (1, self.users[2].pk, 30),
+                                            (3, self.users[0].pk, 10), (4, self.users[3].pk, 5)])
+        # Nothing changed: no copy
+        current = leaderboard.index
+        leaderboard.sync()
+        self.assertIs(leaderboard.index, current)
+
+    def test_leaderboard_page(self):
+        Plant.objects.create(user=self.users[3], growth_stage=4)
+        for name in BOARDS:
+            get_leaderboard(name).load()
+        self.client.force_login(self.users[0])
+
+        response = self.client.get('/leaderboard/')
+        self.assertEqual([row['username'] for row in response.context['rows']], ['player1', 'player2', 'player0', 'player3'])
+        self.assertEqual(response.context['my_rank'], 3)
+
+        response = self.client.get('/leaderboard/?board=plant')
+        self.assertEqual(response.context['rows'][0]['username'], 'player3')
+        self.assertEqual(response.context['rows'][0]['score'], BOARDS['plant'].describe(plant_score(4, 0)))
+        self.assertEqual(response.context['my_rank'], 2)  # everyone else is a seed with no drops
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 21))  # 1..20
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile(values, 99), 20)
+        self.assertEqual(percentile(values, 100), 20)
+        self.assertEqual(percentile(values, 0), 1)
+        # Halfway ranks must not be rounded to even: 2.5 -> 3rd value
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+@override_settings(TASK_QUOTAS={'DEFAULT': {'LIMIT': 1, 'WINDOW_HOURS': 24}})
+class LoadtestTests(TestCase):
+    def test_summary_without_samples(self):
+        summary = LoadtestCommand()._summarise([], 0)
+        self.assertEqual((summary['requests'], summary['error_rate'], summary['refused']), (0, 0, 0))
+        self.assertIsNone(summary['p99_ms'])
+        self.assertIsNone(summary['max_ms'])
+
+    def test_quota_refusal_is_told_from_creation_by_the_message(self):
+        self.client.force_login(User.objects.create_user(username='loader', password='pw'))
+        vu = VirtualUser('http://testserver', 'loader', 'pw', [], random.Random(1))
+        levels = []
+        for _ in range(2):  # the second create is over the limit
+            _, path, data = vu.task_create()
+            response = self.client.post(path, data)
+            self.assertRedirects(response, '/tasks/', fetch_redirect_response=False)
+            vu.cookies.set_cookie(Cookie(
+                0, 'messages', response.cookies['messages'].value, None, False, 'testserver', False, False,
+                '/', True, False, None, False, None, None, {},
+            ))
+            levels.append(vu.last_message_level())
+        self.assertEqual(levels, [message_constants.SUCCESS, message_constants.ERROR])
+        vu.clear_messages()
+        self.assertIsNone(vu.last_message_level())
+
+
+
+class _InlineThread:
+    """Stands in for threading.Thread: runs the job when started, inside the test's transaction"""
+
+    def __init__(self, target, args, daemon):
+        self.target, self.args = target, args
+
+    def start(self):
+        # Closing the connection would break the test transaction
+        with mock.patch('accounts.bulk.close_old_connections'):
+            self.target(*self.args)
+
+
+@mock.patch.multiple('accounts.bulk', BULK_ACTION_BACKGROUND_THRESHOLD=3, BULK_ACTION_CHUNK_SIZE=2)
+class BulkActionTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='pw'))
+
+    def _run_action(self, count, action='add_100_tokens'):
+        self.users = [User.objects.create_user(username=f'bulk{i}', password='pw', tokens=1) for i in range(count)]
+        return self.client.post('/admin/accounts/user/', {
+            'action': action, '_selected_action': [user.pk for user in self.users],
+        }, follow=True)
+
+    def _balances(self):
+        return set(User.objects.filter(pk__in=[user.pk for user in self.users]).values_list('tokens', flat=True))
+
+    def test_small_selection_runs_inline(self):
+        with mock.patch('accounts.bulk.threading.Thread') as thread:
+            response = self._run_action(3)
+        thread.assert_not_called()
+        self.assertContains(response, 'Added 100 tokens to 3 user(s).')
+        self.assertEqual(self._balances(), {101})
+
+    def test_large_selection_runs_in_chunks_and_reports_progress(self):
+        saved = []
+        save_job = bulk._save_job
+        with mock.patch('accounts.bulk.threading.Thread', _InlineThread), \
+                mock.patch('accounts.bulk._save_job', side_effect=lambda job: (saved.append(dict(job)), save_job(job))), \
+                mock.patch('accounts.admin.credit_tokens_bulk', wraps=credit_tokens_bulk) as credit:
+            response = self._run_action(5)
+        self.assertEqual([call.args[0].count() for call in credit.call_args_list], [2, 2, 1])
+        self.assertEqual([(job['done'], job['status']) for job in saved],
+                         [(0, 'running'), (2, 'running'), (4, 'running'), (5, 'running'), (5, 'finished')])
+        self.assertEqual(self._balances(), {101})
+
+        # The admin is pointed at the progress page, which serves the stored job
+        self.assertContains(response, 'Adding 100 tokens (5 rows) is running in the background in this server process')
+        url = re.search(r'href="([^"]+/bulk-jobs/\w+/)"', response.content.decode())[1]
+        job = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual({key: job[key] for key in ('id', 'description', 'total', 'done', 'status')}, {
+            'id': saved[0]['id'], 'description': 'Adding 100 tokens', 'total': 5, 'done': 5, 'status': 'finished',
+        })
+        self.assertContains(self.client.get(url), 'Adding 100 tokens')
+        self.assertEqual(self.client.get('/admin/accounts/user/bulk-jobs/unknown/').status_code, 404)
+
+    def test_failing_chunk_fails_the_job(self):
+        with mock.patch('accounts.bulk.threading.Thread', _InlineThread), \
+                mock.patch('accounts.admin.set_tokens_bulk', side_effect=ValueError('database went away')):
+            response = self._run_action(5, action='reset_tokens')
+        job_id = re.search(r'/bulk-jobs/(\w+)/', response.content.decode())[1]
+        job = bulk.get_job(job_id)
+        self.assertEqual((job['status'], job['done'], job['error']), ('failed', 0, 'database went away'))
+
+    def test_job_lost_with_its_worker_shows_as_failed(self):
+        # The worker went away before the thread got anywhere: the job stays 'running' in the cache
+        with mock.patch('accounts.bulk.threading.Thread'):
+            response = self._run_action(5)
+        job_id = re.search(r'/bulk-jobs/(\w+)/', response.content.decode())[1]
+        self.assertEqual(bulk.get_job(job_id)['status'], 'running')
+        later = time.time() + bulk.BULK_ACTION_STALE_SECONDS + 1
+        with mock.patch('accounts.bulk.time.time', return_value=later):
+            job = bulk.get_job(job_id)
+            page = self.client.get(f'/admin/accounts/user/bulk-jobs/{job_id}/')
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('probably restarted', job['error'])
+        self.assertContains(page, 'probably restarted')
+        self.assertNotContains(page, 'http-equiv="refresh"')
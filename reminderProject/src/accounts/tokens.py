@@ -0,0 +1,101 @@
+"""
+Token balance operations.
+
+Every change is a single UPDATE of the tokens column using F() expressions,
+so concurrent credits/debits can't overwrite each other and the rest of the
+user row (password hash, last_login, ...) is never rewritten. Views, admin
+actions and commands should change balances only through these helpers.
+
+UPDATEs don't send post_save, so each helper drops the cached request.user
+(accounts.backends) of the users it touched, now and again once the change
+is committed (like the task stats in tasks.signals), updates their leaderboard
+entries (accounts.leaderboard) and pushes the new balance to their open
+pages (myproject.events) itself.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from myproject.events import publish
+from .backends import invalidate_cached_users
+from .leaderboard import record_tokens, refresh_entries
+from .models import User
+
+
+def publish_tokens(user_ids):
+    """Send each user's balance, as committed, to their open pages"""
+    for user_id in user_ids:
+        publish(user_id, 'tokens', lambda user_id=user_id: {
+            'tokens': User.objects.values_list('tokens', flat=True).get(pk=user_id),
+        })
+
+
+def _invalidate_users(user_ids):
+    # The second delete stops a request that read the old row mid-transaction from caching it again
+    invalidate_cached_users(user_ids)
+    transaction.on_commit(lambda: invalidate_cached_users(user_ids))
+
+
+def _check_amount(amount):
+    if amount < 0:
+        raise ValueError(f'Token amount must not be negative (got {amount}).')
+
+
+def credit_tokens(user, amount):
+    """Add tokens to the user's balance and return the new balance"""
+    _check_amount(amount)
+    User.objects.filter(pk=user.pk).update(tokens=F('tokens') + amount)
+    _invalidate_users([user.pk])
+    user.refresh_from_db(fields=['tokens'])
+    record_tokens(user.pk)
+    publish_tokens([user.pk])
+    return user.tokens
+
+
+def debit_tokens(user, amount):
+    """
+    Take tokens from the user's balance if it covers the amount.
+
+    The balance check is part of the UPDATE's WHERE clause, so two concurrent
+    purchases can never drive the balance negative. Returns True on success.
+    """
+    _check_amount(amount)
+    debited = User.objects.filter(pk=user.pk, tokens__gte=amount).update(tokens=F('tokens') - amount)
+    user.refresh_from_db(fields=['tokens'])
+    if debited:
+        _invalidate_users([user.pk])
+        record_tokens(user.pk)
+        publish_tokens([user.pk])
+    return bool(debited)
+
+
+def set_tokens(user, amount):
+    """Overwrite the user's balance (admin resets, demo setup)"""
+    _check_amount(amount)
+    User.objects.filter(pk=user.pk).update(tokens=amount)
+    _invalidate_users([user.pk])
+    record_tokens(user.pk)
+    publish_tokens([user.pk])
+    user.tokens = amount
+    return amount
+
+
+def _update_and_invalidate(queryset, **values):
+    # Admin bulk actions pass chunks of at most BULK_ACTION_CHUNK_SIZE users, so the id list stays small
+    user_ids = list(queryset.values_list('pk', flat=True))
+    count = User.objects.filter(pk__in=user_ids).update(**values)
+    _invalidate_users(user_ids)
+    refresh_entries(user_ids)
+    publish_tokens(user_ids)
+    return count
+
+
+def credit_tokens_bulk(queryset, amount):
+    """Add tokens to every user in the queryset with one UPDATE; returns the row count"""
+    _check_amount(amount)
+    return _update_and_invalidate(queryset, tokens=F('tokens') + amount)
+
+
+def set_tokens_bulk(queryset, amount):
+    """Overwrite the balance of every user in the queryset with one UPDATE"""
+    _check_amount(amount)
+    return _update_and_invalidate(queryset, tokens=amount)
@@ -3,7 +3,9 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import User
+from .leaderboard import BOARDS, LEADERBOARD_PAGE_SIZE, top_page, user_rank
 from datetime import datetime
+from myproject.routers import read_replica
 
 # Create your views here.
 
@@ -103,15 +105,18 @@ def profile_edit(request):
         
         # Update password if provided
         new_password = request.POST.get('new_password', '')
+        # Only write the edited columns so a stale in-memory token balance is never saved back
+        profile_fields = ['first_name', 'date_of_birth', 'email']
+        
         if new_password:
             user.set_password(new_password)
             messages.info(request, 'Password changed! Please login again.')
-            user.save()
+            user.save(update_fields=profile_fields + ['password'])
             logout(request)
             return redirect('login')
         
         try:
-            user.save()
+            user.save(update_fields=profile_fields)
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
         except Exception as e:
@@ -121,17 +126,59 @@ def profile_edit(request):
 
 
 @login_required
+@read_replica
 def tokens_view(request):
     """View tokens and stats"""
-    from tasks.models import Task
+    from tasks.stats import get_task_stats
     
-    total_tasks = Task.objects.filter(user=request.user).count()
-    completed_tasks = Task.objects.filter(user=request.user, status='Completed').count()
-    pending_tasks = Task.objects.filter(user=request.user).exclude(status='Completed').count()
+    stats = get_task_stats(request.user)
     
     context = {
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
+        'total_tasks': stats['total'],
+        'completed_tasks': stats['completed'],
+        'pending_tasks': stats['pending'],
     }
     return render(request, 'accounts/tokens.html', context)
+
+
+@login_required
+@read_replica
+async def atokens_view(request):
+    """tokens_view for ASGI (async cache/ORM calls)"""
+    from tasks.stats import aget_task_stats
+    
+    # Templates read request.user, so hand them the already loaded user
+    request.user = user = await request.auser()
+    stats = await aget_task_stats(user)
+    
+    context = {
+        'total_tasks': stats['total'],
+        'completed_tasks': stats['completed'],
+        'pending_tasks': stats['pending'],
+    }
+    return render(request, 'accounts/tokens.html', context)
+
+
+@login_required
+@read_replica
+def leaderboard_view(request):
+    """Global leaderboard by tokens or plant growth (?board=tokens|plant&page=N), with the user's own rank"""
+    board = BOARDS.get(request.GET.get('board'), BOARDS['tokens'])
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    
+    result = top_page(board.name, page)
+    my_rank, my_score = user_rank(board.name, request.user)
+    context = {
+        'board': board,
+        'boards': BOARDS.values(),
+        'rows': result['rows'],
+        'total': result['total'],
+        'page': page,
+        'has_next': page * LEADERBOARD_PAGE_SIZE < result['total'],
+        'my_rank': my_rank,
+        'my_score': my_score,
+    }
+    return render(request, 'accounts/leaderboard.html', context)
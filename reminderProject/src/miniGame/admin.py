@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib import messages
-from .models import Plant, WaterTransaction
+from accounts.bulk import BulkActionAdminMixin
+from myproject.routers import ReadReplicaAdminMixin
+from .models import Plant, WaterDailySummary, WaterTransaction
 
 
 @admin.register(Plant)
-class PlantAdmin(admin.ModelAdmin):
+class PlantAdmin(ReadReplicaAdminMixin, BulkActionAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'growth_stage', 'water_drops', 'water_progress', 'updated_at')
     list_filter = ('growth_stage', 'created_at')
     search_fields = ('user__username', 'user__email')
@@ -26,51 +28,57 @@ class PlantAdmin(admin.ModelAdmin):
     
     def water_plant_once(self, request, queryset):
         """Add 1 water drop to selected plants"""
-        count = 0
-        for plant in queryset:
-            plant.add_water_drop()
-            count += 1
-        self.message_user(request, f'Watered {count} plant(s).', messages.SUCCESS)
+        self.run_bulk_action(request, queryset, lambda qs: qs.add_water_drops(1),
+                             'Watering plants', 'Watered {count} plant(s).')
     water_plant_once.short_description = '💧 Water plant once'
     
     def water_plant_5x(self, request, queryset):
         """Add 5 water drops to selected plants"""
-        count = 0
-        for plant in queryset:
-            for _ in range(5):
-                plant.add_water_drop()
-            count += 1
-        self.message_user(request, f'Watered {count} plant(s) 5 times.', messages.SUCCESS)
+        self.run_bulk_action(request, queryset, lambda qs: qs.add_water_drops(5),
+                             'Watering plants 5 times', 'Watered {count} plant(s) 5 times.')
     water_plant_5x.short_description = '💧💧💧💧💧 Water plant 5 times'
     
     def reset_plant_to_seed(self, request, queryset):
         """Reset plants to stage 1"""
-        count = 0
-        for plant in queryset:
-            plant.growth_stage = 1
-            plant.water_drops = 0
-            plant.water_progress = 0
-            plant.save()
-            count += 1
-        self.message_user(request, f'Reset {count} plant(s) to seed stage.', messages.WARNING)
+        self.run_bulk_action(request, queryset,
+                             lambda qs: qs.update_growth(growth_stage=1, water_drops=0, water_progress=0),
+                             'Resetting plants', 'Reset {count} plant(s) to seed stage.', messages.WARNING)
     reset_plant_to_seed.short_description = '🌰 Reset plant to seed stage'
     
     def max_out_plant(self, request, queryset):
         """Max out plants to stage 4 with 100% progress"""
-        count = 0
-        for plant in queryset:
-            plant.growth_stage = 4
-            plant.water_progress = 100
-            plant.save()
-            count += 1
-        self.message_user(request, f'Maxed out {count} plant(s).', messages.SUCCESS)
+        self.run_bulk_action(request, queryset,
+                             lambda qs: qs.update_growth(growth_stage=4, water_progress=100),
+                             'Maxing out plants', 'Maxed out {count} plant(s).')
     max_out_plant.short_description = '🌳 Max out plant to stage 4'
 
 
 @admin.register(WaterTransaction)
-class WaterTransactionAdmin(admin.ModelAdmin):
+class WaterTransactionAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'tokens_spent', 'water_drops_received', 'timestamp')
     list_filter = ('timestamp',)
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('timestamp',)
     date_hierarchy = 'timestamp'
+    
+    # Raw rows cover only the recent window (older ones are compacted into the daily summaries).
+    # Purchases are recorded by buy_water together with their summary, so the admin only reads them.
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WaterDailySummary)
+class WaterDailySummaryAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'day', 'purchases', 'tokens_spent', 'drops_received')
+    search_fields = ('user__username', 'user__email')
+    date_hierarchy = 'day'
+    readonly_fields = ('user', 'day', 'purchases', 'tokens_spent', 'drops_received')
+    
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MinigameConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'miniGame'
+
+    def ready(self):
+        # Register cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,102 @@
+"""
+Responsive variants of the app's images.
+
+`manage.py build_images` (needs Pillow with AVIF support, 11.3+) resizes
+each image in IMAGES to the listed widths as AVIF and WebP, and packs the
+four plant stages into one sprite sheet (AVIF, WebP and a PNG fallback).
+Everything is written next to the sources under variants/, so
+collectstatic fingerprints and serves it like any other asset, and what
+was built is recorded in VARIANTS_FILE. Rebuild and commit both after
+changing an image.
+
+The template tags in miniGame.templatetags.pictures read that record:
+{% picture %} emits <picture> with AVIF/WebP srcsets and the original as
+the <img> fallback, and {% plant_sprite %} shows one cell of the sprite
+sheet, so a plant moving to its next stage downloads nothing new. Images
+without variants fall back to a plain <img>.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+
+VARIANTS_FILE = Path(__file__).resolve().parent / 'image_variants.json'
+
+# Static name -> widths to build (never wider than the source). Shown at 50-220px and 200px.
+IMAGES = {
+    'ghost.png': (64, 128, 256),
+    'miniGame/plant2/1.png': (200, 400),
+    'miniGame/plant2/2.png': (200, 400),
+    'miniGame/plant2/3.png': (200, 400),
+    'miniGame/plant2/4.png': (200, 400),
+}
+
+PLANT_STAGES = tuple(f'miniGame/plant2/{stage}.png' for stage in range(1, 5))
+SPRITE_NAME = 'miniGame/plant2/variants/stages'
+# Square cells, twice the 200px plant box for high-density screens
+SPRITE_CELL = 400
+
+# <source> order: the browser takes the first type it supports
+FORMATS = ('avif', 'webp')
+SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 55},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+def variant_name(name, width, fmt):
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / f'{path.stem}-{width}w.{fmt}')
+
+
+@lru_cache(maxsize=None)
+def image_variants():
+    """The record written by build_images ({'images': {}, 'sprite': None} before the first build)"""
+    try:
+        return json.loads(VARIANTS_FILE.read_text())
+    except FileNotFoundError:
+        return {'images': {}, 'sprite': None}
+
+
+# ---- build (Pillow is only imported here) -----------------------------------
+
+def _save(image, path, fmt):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image.save(path, **SAVE_OPTIONS[fmt])
+    return path.stat().st_size
+
+
+def build_image(source, static_root, name, widths):
+    """Write the AVIF/WebP variants of one image; returns its record and the bytes written"""
+    from PIL import Image
+
+    with Image.open(source) as original:
+        original.load()
+    record = {'width': original.width, 'height': original.height, 'sources': {fmt: [] for fmt in FORMATS}}
+    written = 0
+    for width in widths:
+        width = min(width, original.width)
+        resized = original.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+        for fmt in FORMATS:
+            variant = variant_name(name, width, fmt)
+            written += _save(resized, static_root / variant, fmt)
+            record['sources'][fmt].append([width, variant])
+    return record, written
+
+
+def build_sprite(sources, static_root):
+    """Pack the stage images left to right into square cells; returns the sprite record and bytes written"""
+    from PIL import Image
+
+    sheet = Image.new('RGBA', (SPRITE_CELL * len(sources), SPRITE_CELL), (0, 0, 0, 0))
+    for position, source in enumerate(sources):
+        with Image.open(source) as stage:
+            stage = stage.convert('RGBA')
+            stage.thumbnail((SPRITE_CELL, SPRITE_CELL), Image.LANCZOS)
+            # Centred horizontally, standing on the bottom edge like the originals
+            sheet.paste(stage, (position * SPRITE_CELL + (SPRITE_CELL - stage.width) // 2, SPRITE_CELL - stage.height))
+    files, written = {}, 0
+    for fmt in (*FORMATS, 'png'):
+        files[fmt] = f'{SPRITE_NAME}.{fmt}'
+        written += _save(sheet, static_root / files[fmt], fmt)
+    return {'cell': SPRITE_CELL, 'stages': len(sources), 'files': files}, written
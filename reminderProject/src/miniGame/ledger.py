@@ -0,0 +1,104 @@
+"""
+The water purchase ledger: raw WaterTransaction rows plus per-day summaries.
+
+Every purchase goes through record_purchase(), which inserts the raw row and
+adds it to the user's WaterDailySummary for that local day in the same
+transaction. Totals (stats, drop balances) are read from the summaries, so
+they cost one row per active day instead of one per purchase.
+
+Raw rows are only needed for the recent window (the last purchases on the
+stats page, the admin). `manage.py compact_water_history` deletes raw rows
+older than WATER_RAW_RETENTION_DAYS. It first rebuilds those days'
+summaries from the raw rows, so the totals stay exact even if a summary
+had drifted (e.g. rows bulk-inserted by a seeding command).
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import WaterDailySummary, WaterTransaction
+from .stats import invalidate_water_stats
+
+WATER_RAW_RETENTION_DAYS = getattr(settings, 'WATER_RAW_RETENTION_DAYS', 90)
+
+# Users whose old rows are compacted per transaction
+COMPACTION_USERS_PER_BATCH = 500
+
+
+def record_purchase(user, tokens_spent, drops):
+    """Insert the raw purchase and count it in the day's summary (call inside the purchase transaction)"""
+    purchase = WaterTransaction.objects.create(user=user, tokens_spent=tokens_spent, water_drops_received=drops)
+    day = timezone.localdate(purchase.timestamp)
+    summaries = WaterDailySummary.objects.filter(user=user, day=day)
+    increments = {
+        'purchases': F('purchases') + 1,
+        'tokens_spent': F('tokens_spent') + tokens_spent,
+        'drops_received': F('drops_received') + drops,
+    }
+    if not summaries.update(**increments):
+        try:
+            # First purchase of the day; the unique constraint settles any race
+            with transaction.atomic():
+                WaterDailySummary.objects.create(
+                    user=user, day=day, purchases=1, tokens_spent=tokens_spent, drops_received=drops,
+                )
+        except IntegrityError:
+            summaries.update(**increments)
+    return purchase
+
+
+def daily_totals(transactions):
+    """Per (user, local day) purchase count and sums of the given raw rows"""
+    return (
+        transactions.order_by()
+        .annotate(day=TruncDate('timestamp'))
+        .values('user_id', 'day')
+        .annotate(purchases=Count('id'), tokens=Sum('tokens_spent'), drops=Sum('water_drops_received'))
+    )
+
+
+def rebuild_summaries(transactions, batch_size=1000):
+    """
+    Overwrite the summary of every (user, day) present in `transactions` from those rows.
+
+    Only correct when `transactions` holds all raw rows of those days, e.g.
+    everything before a local midnight, or all of some users' rows.
+    """
+    summaries = (
+        WaterDailySummary(user_id=row['user_id'], day=row['day'], purchases=row['purchases'],
+                          tokens_spent=row['tokens'], drops_received=row['drops'])
+        for row in daily_totals(transactions).iterator()
+    )
+    return len(WaterDailySummary.objects.bulk_create(
+        summaries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'day'],
+        update_fields=['purchases', 'tokens_spent', 'drops_received'],
+    ))
+
+
+def compaction_cutoff(days=None):
+    """Local midnight `days` ago; compaction always takes whole days"""
+    day = timezone.localdate() - timedelta(days=WATER_RAW_RETENTION_DAYS if days is None else days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compact_transactions(cutoff, users_per_batch=COMPACTION_USERS_PER_BATCH):
+    """Fold raw rows before the cutoff into the summaries and delete them; yields (users, rows) per batch"""
+    old = WaterTransaction.objects.filter(timestamp__lt=cutoff)
+    user_ids = list(old.order_by().values_list('user_id', flat=True).distinct())
+    for start in range(0, len(user_ids), users_per_batch):
+        chunk = user_ids[start:start + users_per_batch]
+        rows = old.filter(user_id__in=chunk)
+        with transaction.atomic():
+            rebuild_summaries(rows)
+            # No per-row signals needed: the totals, now read from the summaries, are unchanged
+            deleted = rows._raw_delete(rows.db)
+        for user_id in chunk:
+            invalidate_water_stats(user_id)
+        yield len(chunk), deleted
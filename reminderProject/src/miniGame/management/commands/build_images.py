@@ -0,0 +1,49 @@
+import json
+import time
+from pathlib import Path, PurePosixPath
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from miniGame.images import IMAGES, PLANT_STAGES, VARIANTS_FILE, build_image, build_sprite, image_variants
+
+
+def _find(name):
+    """(source file, the static directory it lives in) for a static name"""
+    source = finders.find(name)
+    if source is None:
+        raise CommandError(f'Static file {name!r} not found')
+    source = Path(source)
+    return source, source.parents[len(PurePosixPath(name).parts) - 1]
+
+
+class Command(BaseCommand):
+    help = 'Builds AVIF/WebP variants of the app images and the plant stage sprite sheet (see miniGame/images.py)'
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import features
+        except ImportError:
+            raise CommandError('build_images needs Pillow: pip install "Pillow>=11.3"')
+        if not features.check('avif') or not features.check('webp'):
+            raise CommandError('This Pillow build cannot write AVIF and WebP; install Pillow 11.3 or newer')
+
+        started = time.perf_counter()
+        record = {'images': {}, 'sprite': None}
+        for name, widths in IMAGES.items():
+            source, static_root = _find(name)
+            record['images'][name], written = build_image(source, static_root, name, widths)
+            self.stdout.write(f'  {name}: {source.stat().st_size / 1024:.0f} KB -> '
+                              f'{written / 1024:.0f} KB in {len(widths) * 2} variants')
+
+        stages = [_find(name) for name in PLANT_STAGES]
+        record['sprite'], written = build_sprite([source for source, _ in stages], stages[0][1])
+        self.stdout.write(f'  plant sprite: {sum(s.stat().st_size for s, _ in stages) / 1024:.0f} KB in '
+                          f'{len(stages)} PNGs -> {written / 1024:.0f} KB in 3 formats')
+
+        VARIANTS_FILE.write_text(json.dumps(record, indent=2) + '\n')
+        image_variants.cache_clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built image variants in {time.perf_counter() - started:.1f}s; '
+            f'commit them with {VARIANTS_FILE.name} and run collectstatic'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from miniGame.ledger import WATER_RAW_RETENTION_DAYS, compact_transactions, compaction_cutoff
+from miniGame.models import WaterTransaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Folds WaterTransaction rows older than --days into the per-day summaries and deletes them; '
+        'totals are unchanged (see miniGame/ledger.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=WATER_RAW_RETENTION_DAYS,
+                            help=f'Keep raw rows for this many days (default {WATER_RAW_RETENTION_DAYS})')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be compacted')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        cutoff = compaction_cutoff(options['days'])
+        if options['dry_run']:
+            count = WaterTransaction.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f'{count} transaction(s) before {cutoff:%Y-%m-%d} would be compacted')
+            return
+
+        started = time.perf_counter()
+        users = rows = 0
+        for batch_users, batch_rows in compact_transactions(cutoff):
+            users += batch_users
+            rows += batch_rows
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {users} users, {rows} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {rows} transaction(s) of {users} user(s) before {cutoff:%Y-%m-%d} '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
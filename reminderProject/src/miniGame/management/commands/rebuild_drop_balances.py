@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from miniGame.models import Plant, WaterDailySummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds (or with --check, verifies) each plant\'s purchased-drops balance from the purchase ledger (daily summaries)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report mismatched balances and exit with an error if any are found',
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+
+        # One grouped query over the daily summaries, which count every purchase (see miniGame.ledger)
+        ledger_totals = {
+            row['user_id']: row['total'] or 0
+            for row in WaterDailySummary.objects.order_by().values('user_id').annotate(total=Sum('drops_received'))
+        }
+
+        mismatches = []
+        with transaction.atomic():
+            plants = Plant.objects.select_for_update().only('id', 'user_id', 'drops_purchased')
+            seen_users = set()
+            for plant in plants.iterator():
+                seen_users.add(plant.user_id)
+                expected = ledger_totals.get(plant.user_id, 0)
+                if plant.drops_purchased != expected:
+                    mismatches.append((plant.user_id, plant.drops_purchased, expected))
+                    if not check_only:
+                        plant.drops_purchased = expected
+                        plant.save(update_fields=['drops_purchased'])
+
+            # Users with purchases but no plant row yet
+            for user_id, expected in ledger_totals.items():
+                if user_id not in seen_users and expected:
+                    mismatches.append((user_id, None, expected))
+                    if not check_only:
+                        Plant.objects.create(user_id=user_id, drops_purchased=expected)
+
+        for user_id, stored, expected in mismatches:
+            stored_display = 'no plant' if stored is None else stored
+            self.stdout.write(self.style.WARNING(f'User {user_id}: stored {stored_display}, ledger {expected}'))
+
+        if check_only:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} plant balance(s) do not match the ledger.')
+            self.stdout.write(self.style.SUCCESS('All plant balances match the ledger.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(mismatches)} plant balance(s) from the ledger.'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2025-11-02 18:05
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_drops_purchased(apps, schema_editor):
+    """Seed the stored balance from the existing WaterTransaction ledger"""
+    Plant = apps.get_model('miniGame', 'Plant')
+    WaterTransaction = apps.get_model('miniGame', 'WaterTransaction')
+
+    totals = (
+        WaterTransaction.objects
+        .order_by()
+        .values('user_id')
+        .annotate(total=Sum('water_drops_received'))
+    )
+    for row in totals:
+        # Users who bought drops before ever opening the game have no plant yet
+        plant, _ = Plant.objects.get_or_create(user_id=row['user_id'])
+        plant.drops_purchased = row['total'] or 0
+        plant.save(update_fields=['drops_purchased'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('miniGame', '0002_alter_plant_growth_stage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='drops_purchased',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_drops_purchased, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('miniGame', '0003_plant_drops_purchased'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watertransaction',
+            index=models.Index(fields=['user', '-timestamp'], name='watertx_user_timestamp_idx'),
+        ),
+    ]
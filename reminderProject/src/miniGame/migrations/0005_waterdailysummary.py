@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    """Summarise the existing WaterTransaction rows per user and local day"""
+    WaterTransaction = apps.get_model('miniGame', 'WaterTransaction')
+    WaterDailySummary = apps.get_model('miniGame', 'WaterDailySummary')
+
+    groups = (
+        WaterTransaction.objects
+        .order_by()
+        .annotate(day=TruncDate('timestamp'))
+        .values('user_id', 'day')
+        .annotate(purchases=Count('id'), tokens=Sum('tokens_spent'), drops=Sum('water_drops_received'))
+    )
+    WaterDailySummary.objects.bulk_create(
+        (
+            WaterDailySummary(user_id=row['user_id'], day=row['day'], purchases=row['purchases'],
+                              tokens_spent=row['tokens'], drops_received=row['drops'])
+            for row in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('miniGame', '0004_watertransaction_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.IntegerField(default=0)),
+                ('tokens_spent', models.IntegerField(default=0)),
+                ('drops_received', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='water_daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Water Daily Summary',
+                'verbose_name_plural': 'Water Daily Summaries',
+                'db_table': 'minigame_water_daily_summary',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_water_summary_user_day')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,63 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Least
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from accounts.leaderboard import refresh_entries
+from myproject.events import publish
+
+MAX_STAGE = 4
+PROGRESS_PER_DROP = 25  # 4 drops per stage
+
+
+class PlantQuerySet(models.QuerySet):
+    def update_growth(self, **values):
+        """
+        update() for the growth columns: also stamps updated_at and refreshes
+        the owners' leaderboard entries and open pages (UPDATEs send no post_save).
+        """
+        # Admin bulk actions pass chunks of at most BULK_ACTION_CHUNK_SIZE plants, so the id lists stay small
+        rows = list(self.values_list('pk', 'user_id'))
+        count = self.model._default_manager.filter(pk__in=[pk for pk, _ in rows]).update(updated_at=timezone.now(), **values)
+        refresh_entries([user_id for _, user_id in rows])
+        publish_growth([user_id for _, user_id in rows])
+        return count
+    
+    def add_water_drops(self, drops):
+        """
+        Apply `drops` water drops to every plant in one UPDATE.
+        
+        Closed form of calling add_water_drop() `drops` times: the first stage-up
+        takes however many drops finish the current progress bar, each further
+        stage takes 4 drops, and once a plant reaches stage 4 every remaining
+        drop only adds progress. Relies on the database evaluating every SET
+        expression against the old row (PostgreSQL, SQLite).
+        """
+        if drops < 1:
+            return 0
+        stage, progress = F('growth_stage'), F('water_progress')
+        per_stage = 100 // PROGRESS_PER_DROP
+        
+        # Drops that finish the current stage (at least one, even if progress is already >= 100)
+        first = Case(
+            When(water_progress__gte=100, then=Value(1)),
+            default=(Value(100 + PROGRESS_PER_DROP - 1) - progress) / Value(PROGRESS_PER_DROP),
+        )
+        leftover = Value(drops) - first
+        extra_stages = Least(leftover / Value(per_stage), Value(MAX_STAGE - 1) - stage)
+        grows = Q(growth_stage__lt=MAX_STAGE, water_progress__gte=100 - PROGRESS_PER_DROP * drops)
+        
+        return self.update_growth(
+            water_drops=F('water_drops') + drops,
+            growth_stage=Case(When(grows, then=stage + Value(1) + extra_stages), default=stage),
+            water_progress=Case(
+                When(grows, then=(leftover - extra_stages * Value(per_stage)) * Value(PROGRESS_PER_DROP)),
+                default=progress + Value(PROGRESS_PER_DROP * drops),
+            ),
+        )
+
 
 class Plant(models.Model):
     """Model representing a user's plant in the mini-game"""
@@ -18,10 +75,13 @@ class Plant(models.Model):
         choices=STAGE_CHOICES
     )
     water_drops = models.IntegerField(default=0)  # Total water drops given to plant
+    drops_purchased = models.IntegerField(default=0)  # Running total of drops bought (the purchase ledger)
     water_progress = models.IntegerField(default=0)  # Progress towards next stage (0-100)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PlantQuerySet.as_manager()
+    
     class Meta:
         db_table = 'minigame_plant'
         verbose_name = 'Plant'
@@ -30,21 +90,53 @@ class Plant(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Plant - Stage {self.growth_stage}"
     
-    def add_water_drop(self):
-        """Add one water drop and update growth"""
-        self.water_drops += 1
+    @staticmethod
+    def grow(growth_stage, water_progress, drops):
+        """
+        Return (growth_stage, water_progress) after `drops` water drops.
         
-        # Each water drop adds 25% progress (4 drops per stage)
-        self.water_progress += 25
+        Closed form of applying single drops one by one (see
+        PlantQuerySet.add_water_drops for the SQL version of the same rule).
+        """
+        if drops < 1 or growth_stage >= MAX_STAGE:
+            return growth_stage, water_progress + PROGRESS_PER_DROP * max(drops, 0)
         
-        # Check if plant should grow to next stage
-        if self.water_progress >= 100 and self.growth_stage < 4:
-            self.growth_stage += 1
-            self.water_progress = 0  # Reset progress for next stage
+        # Drops that finish the current stage (at least one, even if progress is already >= 100)
+        first = 1 if water_progress >= 100 else -(-(100 - water_progress) // PROGRESS_PER_DROP)
+        if drops < first:
+            return growth_stage, water_progress + PROGRESS_PER_DROP * drops
         
-        self.save()
+        per_stage = 100 // PROGRESS_PER_DROP
+        leftover = drops - first
+        extra_stages = min(leftover // per_stage, MAX_STAGE - 1 - growth_stage)
+        return growth_stage + 1 + extra_stages, (leftover - extra_stages * per_stage) * PROGRESS_PER_DROP
+    
+    def apply_drops(self, drops):
+        """Use `drops` water drops at once and persist the result in one UPDATE"""
+        if drops < 1:
+            raise ValueError('Number of water drops must be at least 1.')
+        self.growth_stage, self.water_progress = self.grow(self.growth_stage, self.water_progress, drops)
+        self.water_drops += drops
+        self.save(update_fields=['growth_stage', 'water_progress', 'water_drops', 'updated_at'])
         return self.growth_stage
     
+    def add_water_drop(self):
+        """Add one water drop and update growth"""
+        # Each water drop adds 25% progress (4 drops per stage)
+        return self.apply_drops(1)
+    
+    def add_purchased_drops(self, drops):
+        """Credit bought drops to the stored balance (call inside the purchase transaction)"""
+        Plant.objects.filter(pk=self.pk).update(drops_purchased=F('drops_purchased') + drops)
+        self.refresh_from_db(fields=['drops_purchased'])
+        publish_growth([self.user_id])
+        return self.drops_purchased
+    
+    @property
+    def available_drops(self):
+        """Drops bought but not yet used on the plant"""
+        return self.drops_purchased - self.water_drops
+    
     def get_stage_name(self):
         """Get the display name of current growth stage"""
         return dict(self.STAGE_CHOICES).get(self.growth_stage, 'Unknown')
@@ -55,10 +147,27 @@ class Plant(models.Model):
             return 0  # Already at max stage
         remaining_progress = 100 - self.water_progress
         return (remaining_progress + 24) // 25  # Round up
+    
+    def live_state(self):
+        """What the game page shows of the plant, as sent in 'plant' events (myproject.events)"""
+        return {
+            'stage': self.growth_stage,
+            'stage_name': self.get_stage_name(),
+            'progress': self.water_progress,
+            'drops_used': self.water_drops,
+            'available': self.available_drops,
+            'drops_needed': self.drops_needed_for_next_stage(),
+        }
+
+
+def publish_growth(user_ids):
+    """Send each user's plant, as committed, to their open pages"""
+    for user_id in user_ids:
+        publish(user_id, 'plant', lambda user_id=user_id: Plant.objects.get(user_id=user_id).live_state())
 
 
 class WaterTransaction(models.Model):
-    """Model to track water drop exchanges"""
+    """Model to track water drop exchanges (raw rows; old ones are compacted into WaterDailySummary)"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='water_transactions')
     tokens_spent = models.IntegerField()
     water_drops_received = models.IntegerField()
@@ -69,6 +178,32 @@ class WaterTransaction(models.Model):
         verbose_name = 'Water Transaction'
         verbose_name_plural = 'Water Transactions'
         ordering = ['-timestamp']
+        indexes = [
+            # Per-user history, newest first (game_stats)
+            models.Index(fields=['user', '-timestamp'], name='watertx_user_timestamp_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.tokens_spent} tokens → {self.water_drops_received} drops"
+
+
+class WaterDailySummary(models.Model):
+    """One user's purchases on one local day; every WaterTransaction is counted here (see miniGame.ledger)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='water_daily_summaries')
+    day = models.DateField()
+    purchases = models.IntegerField(default=0)
+    tokens_spent = models.IntegerField(default=0)
+    drops_received = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'minigame_water_daily_summary'
+        verbose_name = 'Water Daily Summary'
+        verbose_name_plural = 'Water Daily Summaries'
+        ordering = ['-day']
+        constraints = [
+            # Also the index for per-user totals and history, newest day first
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_water_summary_user_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} on {self.day}: {self.purchases} purchase(s), {self.drops_received} drops"
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.leaderboard import record_plant, refresh_entries
+from .models import Plant, WaterTransaction, publish_growth
+from .stats import invalidate_water_stats
+
+
+@receiver(post_save, sender=WaterTransaction)
+@receiver(post_delete, sender=WaterTransaction)
+def water_transaction_changed(sender, instance, **kwargs):
+    """Drop the owner's cached stats now and again once the change is committed"""
+    # The second delete stops a reader that ran mid-transaction from caching stale totals
+    invalidate_water_stats(instance.user_id)
+    transaction.on_commit(lambda: invalidate_water_stats(instance.user_id))
+
+
+@receiver(post_save, sender=Plant)
+def plant_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Copy the growth into the owner's leaderboard entry and open pages (a new plant matches the defaults)"""
+    if created and instance.growth_stage == 1 and instance.water_drops == 0:
+        return
+    if update_fields is None or {'growth_stage', 'water_drops'} & set(update_fields):
+        record_plant(instance.user_id)
+        publish_growth([instance.user_id])
+
+
+@receiver(post_delete, sender=Plant)
+def plant_deleted(sender, instance, **kwargs):
+    """Back to a seed once committed; if the whole user was deleted there is nothing left to refresh"""
+    transaction.on_commit(lambda: refresh_entries([instance.user_id]))
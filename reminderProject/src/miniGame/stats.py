@@ -0,0 +1,69 @@
+"""
+Per-user game statistics cached with Django's cache framework.
+
+Totals are aggregated over the user's WaterDailySummary rows (one per day
+with purchases, see miniGame.ledger) in one query on a miss, and dropped
+whenever one of the user's WaterTransaction rows is saved or deleted (see
+miniGame.signals) or compacted. Like the task stats, misses are computed on
+the primary even inside @read_replica views, so a lagging replica can't
+put stale totals in the shared cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Sum
+
+from .models import WaterDailySummary
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 60 * 60)
+
+
+def _cache_key(user_id):
+    # v2: computed from the daily summaries
+    return f'stats:water:v2:{user_id}'
+
+
+def _totals():
+    return {
+        'total_tokens_spent': Sum('tokens_spent'),
+        'total_drops_bought': Sum('drops_received'),
+        'total_transactions': Sum('purchases'),
+    }
+
+
+def _clean(totals):
+    # Sum() is None for users without purchases
+    return {
+        'total_tokens_spent': totals['total_tokens_spent'] or 0,
+        'total_drops_bought': totals['total_drops_bought'] or 0,
+        'total_transactions': totals['total_transactions'] or 0,
+    }
+
+
+def compute_water_stats(user_id):
+    """Tokens spent, drops bought and number of purchases in a single query"""
+    return _clean(WaterDailySummary.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).aggregate(**_totals()))
+
+
+def get_water_stats(user):
+    """Cached purchase totals: {'total_tokens_spent', 'total_drops_bought', 'total_transactions'}"""
+    key = _cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_water_stats(user.pk)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+async def aget_water_stats(user):
+    """get_water_stats() for async views (async cache and ORM calls)"""
+    key = _cache_key(user.pk)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = _clean(await WaterDailySummary.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).aaggregate(**_totals()))
+        await cache.aset(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_water_stats(user_id):
+    cache.delete(_cache_key(user_id))
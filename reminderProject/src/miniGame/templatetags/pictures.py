@@ -0,0 +1,39 @@
+"""
+Responsive image tags backed by `manage.py build_images` (see miniGame/images.py).
+
+    {% load pictures %}
+    {% picture 'ghost.png' alt='Ghost' sizes='50px' class='ghost-icon' %}
+    {% plant_sprite plant.growth_stage alt=stage_name class='plant-image bounce' %}
+"""
+from django import template
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from miniGame.images import image_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(name, alt='', sizes='100vw', **attrs):
+    """<picture> with AVIF/WebP srcsets of a built image; a plain <img> when it has no variants"""
+    info = image_variants()['images'].get(name)
+    if not info:
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, flatatt(attrs))
+    # No width/height attributes: pages size these images with CSS widths only
+    img = format_html('<img src="{}" alt="{}" decoding="async"{}>', static(name), alt, flatatt(attrs))
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}">', (
+        (fmt, ', '.join(f'{static(variant)} {width}w' for width, variant in variants), sizes)
+        for fmt, variants in info['sources'].items()
+    ))
+    return format_html('<picture>{}{}</picture>', sources, img)
+
+
+@register.simple_tag
+def plant_sprite(stage, alt='', **attrs):
+    """One stage of the plant sprite sheet (game.css picks the cell); the stage's own image when unbuilt"""
+    if not image_variants()['sprite']:
+        return picture(f'miniGame/plant2/{stage}.png', alt, sizes='200px', **attrs)
+    attrs['class'] = f'plant-sprite stage-{stage} {attrs.get("class", "")}'.strip()
+    return format_html('<span role="img" aria-label="{}" data-stage="{}"{}></span>', alt, stage, flatatt(attrs))
@@ -1,3 +1,174 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from tasks.tests import QueryPlanMixin
+from .ledger import compaction_cutoff, rebuild_summaries
+from .models import Plant, WaterDailySummary, WaterTransaction
+from .stats import compute_water_stats
+from .templatetags.pictures import picture, plant_sprite
+
+
+class GameQueryPlanTests(QueryPlanMixin, TestCase):
+    """Game pages must look up plants and transaction history through indexes"""
+
+    def setUp(self):
+        super().setUp()
+        for u in range(5):
+            user = User.objects.create(username=f'gardener{u}', tokens=500)
+            Plant.objects.create(user=user, drops_purchased=40)
+            WaterTransaction.objects.bulk_create([
+                WaterTransaction(user=user, tokens_spent=5, water_drops_received=1)
+                for _ in range(40)
+            ])
+        rebuild_summaries(WaterTransaction.objects.all())
+        self.user = User.objects.get(username='gardener0')
+        self.analyze()
+        self.client.force_login(self.user)
+
+    def test_game_home(self):
+        self.assertViewUsesIndexes('/game/')
+
+    def test_game_stats(self):
+        self.assertViewUsesIndexes('/game/stats/', indexes=['watertx_user_timestamp_idx'])
+
+    def test_water_plant(self):
+        self.assertViewUsesIndexes('/game/water-plant/', method='post')
+
+
+class GameActionFragmentTests(TestCase):
+    """Buying and watering answer async requests with the plant panel, shop and badge"""
+    FRAGMENT = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+    def setUp(self):
+        self.user = User.objects.create(username='fragment-gardener', tokens=10)
+        self.client.force_login(self.user)
+
+    def test_plain_requests_keep_the_redirect(self):
+        self.assertRedirects(self.client.post('/game/buy-water/', {'drops': 1}), '/game/')
+
+    def test_buy_then_water(self):
+        response = self.client.post('/game/buy-water/', {'drops': 2}, **self.FRAGMENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<span class="drops-count" data-live="plant.available">2</span>', html=True)
+        self.assertContains(response, '<span id="tokenBalance" data-live="tokens.tokens">0</span>', html=True)
+        self.assertContains(response, 'id="waterShop"')
+        self.assertContains(response, 'enough tokens to buy water drops')
+
+        response = self.client.post('/game/water-plant/', {'drops': 'all'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['plant'], {
+            'stage': 1, 'stage_name': 'Seed', 'progress': 50, 'drops_used': 2, 'available': 0, 'drops_needed': 2,
+        })
+
+    def test_refused_actions_return_400_with_the_message(self):
+        Plant.objects.create(user=self.user)
+        response = self.client.post('/game/water-plant/', **self.FRAGMENT)
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'Buy some first.', status_code=400)
+        self.assertContains(response, 'id="plantPanel"', status_code=400)
+
+
+def water_one_by_one(growth_stage, water_progress, drops):
+    """Reference rule: what repeated single drops do to a plant"""
+    for _ in range(drops):
+        water_progress += 25
+        if water_progress >= 100 and growth_stage < 4:
+            growth_stage += 1
+            water_progress = 0
+    return growth_stage, water_progress
+
+
+class PlantGrowthTests(TestCase):
+    """Multi-drop watering must match applying the drops one at a time"""
+    STARTS = [(stage, progress) for stage in range(1, 5) for progress in (0, 10, 25, 50, 75, 90, 100, 125)]
+
+    def test_grow_matches_single_drops(self):
+        for stage, progress in self.STARTS:
+            for drops in range(0, 20):
+                self.assertEqual(
+                    Plant.grow(stage, progress, drops),
+                    water_one_by_one(stage, progress, drops),
+                    f'stage={stage} progress={progress} drops={drops}',
+                )
+
+    def test_queryset_add_water_drops_matches_single_drops(self):
+        plants = [
+            Plant.objects.create(user=User.objects.create(username=f'grower{i}'), growth_stage=stage, water_progress=progress)
+            for i, (stage, progress) in enumerate(self.STARTS)
+        ]
+        Plant.objects.filter(pk__in=[p.pk for p in plants]).add_water_drops(9)
+        for plant in plants:
+            expected = water_one_by_one(plant.growth_stage, plant.water_progress, 9)
+            plant.refresh_from_db()
+            self.assertEqual((plant.growth_stage, plant.water_progress, plant.water_drops), expected + (9,))
+
+    def test_water_all_uses_every_available_drop(self):
+        user = User.objects.create(username='waterer')
+        Plant.objects.create(user=user, drops_purchased=10)
+        self.client.force_login(user)
+        self.client.post('/game/water-plant/', {'drops': 'all'})
+        plant = Plant.objects.get(user=user)
+        self.assertEqual((plant.growth_stage, plant.water_progress, plant.available_drops), (3, 50, 0))
+
+
+class WaterLedgerTests(TestCase):
+    """Purchases keep the daily summaries in step; compaction removes old raw rows without changing totals"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ledger', password='pw', tokens=1000)
+        self.client.force_login(self.user)
+
+    def test_purchases_update_daily_summary(self):
+        for drops in (1, 3):
+            self.client.post('/game/buy-water/', {'drops': drops})
+        summary = WaterDailySummary.objects.get(user=self.user)
+        self.assertEqual((summary.day, summary.purchases, summary.tokens_spent, summary.drops_received),
+                         (timezone.localdate(), 2, 20, 4))
+        response = self.client.get('/game/stats/')
+        self.assertEqual((response.context['total_drops_bought'], response.context['total_transactions']), (4, 2))
+        call_command('rebuild_drop_balances', check=True, stdout=io.StringIO())
+
+    def test_compaction_keeps_totals_exact(self):
+        now = timezone.now()
+        WaterTransaction.objects.bulk_create([
+            WaterTransaction(user=self.user, tokens_spent=5 * d, water_drops_received=d) for d in range(1, 31)
+        ])
+        # Spread them over the last 300 days (auto_now_add ignores explicit values on insert)
+        for i, pk in enumerate(WaterTransaction.objects.filter(user=self.user).values_list('pk', flat=True)):
+            WaterTransaction.objects.filter(pk=pk).update(timestamp=now - timedelta(days=10 * i, hours=1))
+        rebuild_summaries(WaterTransaction.objects.filter(user=self.user))
+        before = compute_water_stats(self.user.pk)
+
+        call_command('compact_water_history', days=90, stdout=io.StringIO())
+        self.assertFalse(WaterTransaction.objects.filter(timestamp__lt=compaction_cutoff(90)).exists())
+        self.assertTrue(WaterTransaction.objects.filter(user=self.user).exists())
+        self.assertEqual(compute_water_stats(self.user.pk), before)
+        self.assertEqual(before, {'total_tokens_spent': 5 * 465, 'total_drops_bought': 465, 'total_transactions': 30})
+
+
+
+class PictureTagTests(TestCase):
+    def test_picture_lists_built_variants(self):
+        html = picture('ghost.png', alt='Ghost', sizes='50px', **{'class': 'ghost-icon'})
+        self.assertRegex(html, r'^<picture><source type="image/avif" srcset="/static/variants/ghost-64w\.avif 64w, ')
+        self.assertIn('<source type="image/webp" srcset="/static/variants/ghost-64w.webp 64w, ', html)
+        self.assertIn('sizes="50px"', html)
+        self.assertTrue(html.endswith('<img src="/static/ghost.png" alt="Ghost" decoding="async" class="ghost-icon"></picture>'))
+
+    def test_game_page_uses_the_stage_sprite(self):
+        user = User.objects.create_user(username='sprite', password='pw')
+        Plant.objects.create(user=user, growth_stage=3)
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/game/'), '<span role="img" aria-label="Young Plant" data-stage="3" '
+                                                       'class="plant-sprite stage-3 plant-image bounce"></span>', html=True)
 
-# Create your tests here.
+    def test_unbuilt_images_fall_back_to_img(self):
+        with mock.patch('miniGame.templatetags.pictures.image_variants', return_value={'images': {}, 'sprite': None}):
+            self.assertEqual(plant_sprite(2, alt='Sprout'), '<img src="/static/miniGame/plant2/2.png" alt="Sprout">')
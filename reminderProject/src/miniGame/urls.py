@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Read-only pages have async versions for ASGI deployments (see settings.ASYNC_VIEWS)
+ASYNC = settings.ASYNC_VIEWS
+
 urlpatterns = [
-    path('', views.game_home, name='game_home'),
+    path('', views.agame_home if ASYNC else views.game_home, name='game_home'),
     path('buy-water/', views.buy_water, name='buy_water'),
     path('water-plant/', views.water_plant, name='water_plant'),
-    path('stats/', views.game_stats, name='game_stats'),
+    path('stats/', views.agame_stats if ASYNC else views.game_stats, name='game_stats'),
 ]
@@ -2,28 +2,28 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from .models import Plant, WaterTransaction
+from accounts.tokens import debit_tokens
+from myproject.partials import partial_response, response_mode
+from myproject.routers import read_replica
+from .ledger import record_purchase
+from .models import Plant, WaterDailySummary, WaterTransaction
+from .stats import aget_water_stats, get_water_stats
 
 # Configuration
 TOKENS_PER_DROP = 5  # 5 tokens = 1 water drop
+HISTORY_DAYS = 10  # days of purchase history on the stats page (from the daily summaries)
 
 
-@login_required
-def game_home(request):
-    """Main game view - display plant and game interface"""
-    # Get or create plant for user
-    plant, created = Plant.objects.get_or_create(user=request.user)
-    
+def _game_context(user, plant):
+    """Template context for the game page"""
     # Calculate how many water drops user can buy
-    user_tokens = request.user.tokens if hasattr(request.user, 'tokens') else 0
+    user_tokens = user.tokens if hasattr(user, 'tokens') else 0
     max_drops_can_buy = user_tokens // TOKENS_PER_DROP
     
-    # Calculate available drops (bought but not used)
-    total_drops_bought = sum(t.water_drops_received for t in WaterTransaction.objects.filter(user=request.user))
-    drops_used = plant.water_drops
-    available_drops = total_drops_bought - drops_used
+    # Available drops (bought but not used) come from the stored balance on the plant
+    available_drops = plant.available_drops
     
-    context = {
+    return {
         'plant': plant,
         'user_tokens': user_tokens,
         'tokens_per_drop': TOKENS_PER_DROP,
@@ -33,8 +33,39 @@ def game_home(request):
         'is_max_stage': plant.growth_stage >= 4,
         'available_drops': available_drops,
     }
+
+
+def _game_response(request, plant=None, status=200):
+    """
+    Back to the game page, or for async requests (myproject.partials) the
+    plant panel, shop, token badge and messages; status 400 when refused
+    """
+    mode = response_mode(request)
+    if mode is None:
+        return redirect('game_home')
+    if plant is None:
+        plant, created = Plant.objects.get_or_create(user=request.user)
+    patch = {'plant': plant.live_state(), 'tokens': {'tokens': request.user.tokens}}
+    return partial_response(request, mode, 'miniGame/_game_action.html', _game_context(request.user, plant), patch, status)
+
+
+@login_required
+def game_home(request):
+    """Main game view - display plant and game interface"""
+    # Get or create plant for user
+    plant, created = Plant.objects.get_or_create(user=request.user)
     
-    return render(request, 'miniGame/game.html', context)
+    return render(request, 'miniGame/game.html', _game_context(request.user, plant))
+
+
+@login_required
+async def agame_home(request):
+    """game_home for ASGI (async ORM calls)"""
+    # Templates read request.user, so hand them the already loaded user
+    request.user = user = await request.auser()
+    plant, created = await Plant.objects.aget_or_create(user=user)
+    
+    return render(request, 'miniGame/game.html', _game_context(user, plant))
 
 
 @login_required
@@ -46,7 +77,7 @@ def buy_water(request):
             
             if drops_to_buy < 1:
                 messages.error(request, 'Invalid number of water drops!')
-                return redirect('game_home')
+                return _game_response(request, status=400)
             
             tokens_needed = drops_to_buy * TOKENS_PER_DROP
             user_tokens = request.user.tokens if hasattr(request.user, 'tokens') else 0
@@ -54,87 +85,116 @@ def buy_water(request):
             # Check if user has enough tokens
             if user_tokens < tokens_needed:
                 messages.error(request, f'Not enough tokens! You need {tokens_needed} tokens but only have {user_tokens}.')
-                return redirect('game_home')
+                return _game_response(request, status=400)
             
             # Use transaction to ensure atomicity
             with transaction.atomic():
-                # Deduct tokens from user
-                request.user.tokens -= tokens_needed
-                request.user.save()
+                # Deduct tokens from user; the balance is re-checked in the UPDATE itself
+                if not debit_tokens(request.user, tokens_needed):
+                    messages.error(request, f'Not enough tokens! You need {tokens_needed} tokens but only have {request.user.tokens}.')
+                    return _game_response(request, status=400)
+                
+                # Record the transaction (raw row plus the day's summary)
+                record_purchase(request.user, tokens_needed, drops_to_buy)
                 
-                # Record the transaction
-                WaterTransaction.objects.create(
-                    user=request.user,
-                    tokens_spent=tokens_needed,
-                    water_drops_received=drops_to_buy
-                )
+                # Keep the plant's drop balance in step with the ledger
+                plant, created = Plant.objects.get_or_create(user=request.user)
+                plant.add_purchased_drops(drops_to_buy)
                 
                 messages.success(request, f'Successfully exchanged {tokens_needed} tokens for {drops_to_buy} water drop(s)! Click the plant to water it.')
             
-            return redirect('game_home')
+            return _game_response(request, plant)
             
         except (ValueError, TypeError):
             messages.error(request, 'Invalid request!')
-            return redirect('game_home')
+            return _game_response(request, status=400)
     
     return redirect('game_home')
 
 
 @login_required
 def water_plant(request):
-    """Water the plant with purchased drops"""
+    """Water the plant with purchased drops ("drops" is a number or "all"; defaults to one)"""
     if request.method == 'POST':
         try:
-            # Get user's plant
-            plant = Plant.objects.get(user=request.user)
-            
-            # Calculate available drops
-            total_drops_bought = sum(t.water_drops_received for t in WaterTransaction.objects.filter(user=request.user))
-            drops_used = plant.water_drops
-            available_drops = total_drops_bought - drops_used
+            requested = request.POST.get('drops', '1')
             
-            if available_drops < 1:
-                messages.error(request, 'You don\'t have any water drops! Buy some first.')
-                return redirect('game_home')
-            
-            # Use one drop
-            old_stage = plant.growth_stage
-            plant.add_water_drop()
-            new_stage = plant.growth_stage
+            with transaction.atomic():
+                # Lock the plant row so concurrent clicks can't spend the same drop twice
+                plant = Plant.objects.select_for_update().get(user=request.user)
+                available_drops = plant.available_drops
+                
+                if available_drops < 1:
+                    messages.error(request, 'You don\'t have any water drops! Buy some first.')
+                    return _game_response(request, plant, status=400)
+                
+                drops_to_use = available_drops if requested == 'all' else int(requested)
+                if drops_to_use < 1:
+                    messages.error(request, 'Invalid number of water drops!')
+                    return _game_response(request, plant, status=400)
+                if drops_to_use > available_drops:
+                    messages.error(request, f'You only have {available_drops} water drop(s)!')
+                    return _game_response(request, plant, status=400)
+                
+                # Use all requested drops in a single update
+                old_stage = plant.growth_stage
+                plant.apply_drops(drops_to_use)
+                new_stage = plant.growth_stage
             
             # Check if plant grew
             if new_stage > old_stage:
                 messages.success(request, f'🌱 Amazing! Your plant grew to {plant.get_stage_name()}!')
+            elif drops_to_use > 1:
+                messages.success(request, f'💧 You used {drops_to_use} water drops! Progress: {plant.water_progress}%')
             else:
                 messages.success(request, f'💧 You watered your plant! Progress: {plant.water_progress}%')
             
-            return redirect('game_home')
+            return _game_response(request, plant)
             
         except Plant.DoesNotExist:
             messages.error(request, 'Plant not found! Please try again.')
-            return redirect('game_home')
+            return _game_response(request, status=400)
         except (ValueError, TypeError):
             messages.error(request, 'Invalid request!')
-            return redirect('game_home')
+            return _game_response(request, status=400)
     
     return redirect('game_home')
 
 
 @login_required
+@read_replica
 def game_stats(request):
     """Display game statistics"""
     plant = Plant.objects.get_or_create(user=request.user)[0]
     transactions = WaterTransaction.objects.filter(user=request.user)
+    summaries = WaterDailySummary.objects.filter(user=request.user)
     
-    total_tokens_spent = sum(t.tokens_spent for t in transactions)
-    total_drops_bought = sum(t.water_drops_received for t in transactions)
-    
+    # Totals come from the per-user stats cache; only the last 10 rows and days are read
     context = {
         'plant': plant,
-        'total_tokens_spent': total_tokens_spent,
-        'total_drops_bought': total_drops_bought,
-        'total_transactions': transactions.count(),
+        **get_water_stats(request.user),
         'recent_transactions': transactions[:10],
+        'daily_history': summaries[:HISTORY_DAYS],
+    }
+    
+    return render(request, 'miniGame/stats.html', context)
+
+
+@login_required
+@read_replica
+async def agame_stats(request):
+    """game_stats for ASGI (async cache/ORM calls)"""
+    # Templates read request.user, so hand them the already loaded user
+    request.user = user = await request.auser()
+    plant = (await Plant.objects.aget_or_create(user=user))[0]
+    transactions = WaterTransaction.objects.filter(user=user)
+    summaries = WaterDailySummary.objects.filter(user=user)
+    
+    context = {
+        'plant': plant,
+        **await aget_water_stats(user),
+        'recent_transactions': [t async for t in transactions[:10]],
+        'daily_history': [s async for s in summaries[:HISTORY_DAYS]],
     }
     
     return render(request, 'miniGame/stats.html', context)
@@ -0,0 +1,51 @@
+"""
+Per-request query hooks on every database connection.
+
+Django's connections are per thread. Under ASGI the middleware runs on the
+event loop while views (async views' ORM calls, and sync views as a whole)
+run in sync_to_async threads with connections of their own, so an
+execute_wrapper() entered around the request in the middleware never sees
+the view's queries.
+
+Instead, one permanent execute wrapper is added to every connection when it
+is opened (the connection_created signal, plus connections this thread
+already has open when the module is first imported). It passes each query
+through the hooks registered here. A hook is an execute wrapper that finds
+the current request's state in a ContextVar, which sync_to_async copies into
+its worker threads, and just runs the query when there is none.
+"""
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_hooks = []
+
+
+def register(hook):
+    """Pass every query on every connection through `hook(execute, sql, params, many, context)`"""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def _run_hooks(execute, sql, params, many, context, index=0):
+    if index == len(_hooks):
+        return execute(sql, params, many, context)
+    hook = _hooks[index]
+
+    def call_next(sql, params, many, context):
+        return _run_hooks(execute, sql, params, many, context, index + 1)
+
+    return hook(call_next, sql, params, many, context)
+
+
+def install(connection):
+    if _run_hooks not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_run_hooks)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_connection_created, dispatch_uid='myproject.dbhooks')
+for _connection in connections.all(initialized_only=True):
+    install(_connection)
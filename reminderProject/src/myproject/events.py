@@ -0,0 +1,262 @@
+"""
+Live updates: per-user change events streamed to open pages (server-sent events).
+
+Code that changes a user's tasks, tokens or plant calls publish(), which
+sends a small event once the surrounding transaction commits (from the
+same places that already keep caches and the leaderboard current: the
+tasks/miniGame signals, accounts.tokens and PlantQuerySet). Each event is
+a snapshot of what changed (a task's status with the new counts, the new
+token balance, the plant's growth), never a delta, so applying one twice
+or missing one between reconnects leaves the page correct after the next.
+
+GET /events/ is an async view that keeps one text/event-stream response
+open per page. It holds a bounded asyncio.Queue subscribed to the user's
+events in this process' broker; keepalive comments are sent every
+EVENTS_KEEPALIVE_SECONDS and the stream is closed after
+EVENTS_STREAM_SECONDS, after which EventSource reconnects by itself.
+Streams need an event loop per connection, so they are only served under
+ASGI (settings.ASYNC_VIEWS). WSGI deployments answer 204, which tells
+EventSource not to reconnect, and the pages simply don't update live.
+
+Events reach the broker through a backend chosen by EVENTS_BACKEND, like
+the reminder backends:
+
+* LocalBackend (default): straight to this process' broker. Enough for a
+  single ASGI process.
+* PostgresBackend: pg_notify() on the primary database; every process
+  LISTENs on the channel in a background thread and hands the events to
+  its broker. Use it when several processes serve the site. Needs psycopg
+  (version 3) for the listener.
+
+An event's payload may be given as a callable; it is only evaluated (and
+its queries run) if the backend may have a subscriber for that user.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BACKEND = getattr(settings, 'EVENTS_BACKEND', 'myproject.events.LocalBackend')
+EVENTS_CHANNEL = getattr(settings, 'EVENTS_CHANNEL', 'spookaminder_events')
+EVENTS_STREAM_SECONDS = getattr(settings, 'EVENTS_STREAM_SECONDS', 5 * 60)
+EVENTS_KEEPALIVE_SECONDS = getattr(settings, 'EVENTS_KEEPALIVE_SECONDS', 20)
+EVENTS_QUEUE_SIZE = getattr(settings, 'EVENTS_QUEUE_SIZE', 100)
+
+# How long EventSource waits before reconnecting after a stream ends
+RETRY_MILLISECONDS = 3000
+# Pause before the PostgreSQL listener reconnects after losing its connection
+LISTEN_RECONNECT_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class Event:
+    user_id: int
+    type: str           # 'task', 'tokens' or 'plant'
+    data: dict
+
+    def encode(self):
+        """The event in text/event-stream framing"""
+        return f'event: {self.type}\ndata: {json.dumps(self.data, separators=(",", ":"))}\n\n'
+
+    def to_json(self):
+        return json.dumps({'user': self.user_id, 'type': self.type, 'data': self.data}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload):
+        message = json.loads(payload)
+        return cls(message['user'], message['type'], message['data'])
+
+
+# ---- in-process pub/sub -----------------------------------------------------
+
+class Subscription:
+    """One open stream: a bounded queue on the event loop that serves it"""
+
+    def __init__(self, user_id, maxsize=EVENTS_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def _put(self, event):
+        # A client that stopped reading loses its oldest events, not the newest state
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def put(self, event):
+        """Queue the event from any thread"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+
+class Broker:
+    """Subscriptions of this process by user id; deliver() may be called from any thread"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def add(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.user_id, set()).add(subscription)
+
+    def discard(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscriptions
+
+    def deliver(self, event):
+        """Queue the event for every stream of its user; returns how many got it"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.user_id, ()))
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.put(event)
+                delivered += 1
+            except RuntimeError:
+                # Its event loop has closed without unsubscribing
+                self.discard(subscription)
+        return delivered
+
+
+BROKER = Broker()
+
+
+# ---- backends ---------------------------------------------------------------
+
+class BaseEventBackend:
+    def start(self):
+        """Called before each subscription; starts whatever receives events from other processes"""
+
+    def may_deliver(self, user_id):
+        """False only when no process can have a stream open for the user"""
+        return True
+
+    def send(self, event):
+        raise NotImplementedError
+
+
+class LocalBackend(BaseEventBackend):
+    """Events go straight to this process' broker"""
+
+    def may_deliver(self, user_id):
+        return BROKER.has_subscribers(user_id)
+
+    def send(self, event):
+        BROKER.deliver(event)
+
+
+class PostgresBackend(BaseEventBackend):
+    """Events travel as NOTIFY payloads on EVENTS_CHANNEL; each process listens in a daemon thread"""
+
+    def __init__(self, channel=EVENTS_CHANNEL, using=DEFAULT_DB_ALIAS):
+        self.channel = channel
+        self.using = using
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def send(self, event):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, event.to_json()])
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+
+    def _connection_params(self):
+        database = connections[self.using].settings_dict
+        params = {'dbname': database['NAME'], 'user': database['USER'], 'password': database['PASSWORD'],
+                  'host': database['HOST'], 'port': database['PORT']}
+        return {key: value for key, value in params.items() if value}
+
+    def _listen(self):
+        import psycopg
+        from psycopg import sql
+
+        while True:
+            try:
+                with psycopg.connect(**self._connection_params(), autocommit=True) as connection:
+                    connection.execute(sql.SQL('LISTEN {}').format(sql.Identifier(self.channel)))
+                    for notify in connection.notifies():
+                        BROKER.deliver(Event.from_json(notify.payload))
+            except psycopg.Error:
+                logger.warning('Lost the %r event listener connection; reconnecting.', self.channel, exc_info=True)
+            time.sleep(LISTEN_RECONNECT_SECONDS)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """The configured backend, one instance per process"""
+    return import_string(EVENTS_BACKEND)()
+
+
+def publish(user_id, type, data):
+    """
+    Send an event to the user's open streams once the current transaction
+    commits (immediately outside one). `data` is a dict or a callable
+    returning one, evaluated at that point and only if it can be delivered.
+    """
+    def send():
+        backend = get_backend()
+        if backend.may_deliver(user_id):
+            backend.send(Event(user_id, type, data() if callable(data) else data))
+
+    # A failing event must never fail the change that caused it
+    transaction.on_commit(send, robust=True)
+
+
+# ---- stream view ------------------------------------------------------------
+
+async def _stream(user_id, seconds=EVENTS_STREAM_SECONDS, keepalive=EVENTS_KEEPALIVE_SECONDS):
+    get_backend().start()
+    subscription = Subscription(user_id)
+    BROKER.add(subscription)
+    # Unsubscribed when the stream ends, or when the server cancels it because the client went away
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + seconds
+        while (remaining := closes_at - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), min(keepalive, remaining))
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield event.encode()
+    finally:
+        BROKER.discard(subscription)
+
+
+async def event_stream(request):
+    """The signed-in user's events as text/event-stream (ASGI only)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx and similar proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def no_event_stream(request):
+    """/events/ under WSGI: 204 makes EventSource stop reconnecting"""
+    return HttpResponse(status=204)
@@ -0,0 +1,150 @@
+"""
+In-process request metrics exported in the Prometheus text format.
+
+RequestMetricsMiddleware (myproject/middleware.py) records one sample per
+request: latency, SQL time, query count and template render time, labelled
+by the resolved view name. Histograms use fixed buckets, so recording is a
+bisect and a few additions under one lock, and memory is bounded by the
+number of views.
+
+Every worker process keeps its own numbers; Prometheus should scrape each
+worker (or sum them), the same way it handles any multi-process exporter.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+# Seconds; the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Opt-in: behind a reverse proxy on the same host every request arrives from 127.0.0.1
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set; callers hold the registry lock"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (last is +Inf), sum]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f'{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._series.items()):
+            yield f'{self.name}{_labels(self.label_names, labels)} {value}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram(
+            'django_request_duration_seconds', 'Total request latency by view.', ('view',), LATENCY_BUCKETS)
+        self.sql_time = Histogram(
+            'django_request_sql_duration_seconds', 'Time spent in SQL per request by view.', ('view',), LATENCY_BUCKETS)
+        self.queries = Histogram(
+            'django_request_queries', 'SQL queries per request by view.', ('view',), QUERY_COUNT_BUCKETS)
+        self.template_time = Histogram(
+            'django_request_template_duration_seconds', 'Template render time per request by view.', ('view',),
+            LATENCY_BUCKETS)
+        self.responses = Counter(
+            'django_responses_total', 'Responses by view and status code.', ('view', 'status'))
+        self.metrics = (self.latency, self.sql_time, self.queries, self.template_time, self.responses)
+
+    def record(self, view, status, latency, sql_time, queries, template_time):
+        """One request's sample; the single lock acquisition is the whole per-request cost"""
+        labels = (view,)
+        with self._lock:
+            self.latency.observe(labels, latency)
+            self.sql_time.observe(labels, sql_time)
+            self.queries.observe(labels, queries)
+            self.template_time.observe(labels, template_time)
+            self.responses.inc((view, str(status)))
+
+    def reset(self):
+        with self._lock:
+            for metric in self.metrics:
+                metric._series.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _has_scrape_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(token, METRICS_TOKEN)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; only for staff users, METRICS_TOKEN bearers and METRICS_ALLOWED_IPS"""
+    allowed = (
+        (request.user.is_authenticated and request.user.is_staff)
+        or _has_scrape_token(request)
+        or request.META.get('REMOTE_ADDR') in METRICS_ALLOWED_IPS
+    )
+    if not allowed:
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,206 @@
+"""
+Project-wide middleware.
+
+RequestMetricsMiddleware: per-request SQL and timing instrumentation.
+
+SQL is timed by a query hook on every database connection (myproject.dbhooks),
+which adds to the RequestTimings of the request running in the current
+context, so queries from sync_to_async threads are counted under ASGI too. Template time is measured by wrapping
+Template.render once per process; only the outermost render of a request is
+timed, so {% include %}s aren't counted twice. Queries run lazily while a
+template renders count towards both numbers.
+
+Results go to the in-process registry behind /metrics (myproject.metrics)
+and, when METRICS_SERVER_TIMING is on, into a Server-Timing header that
+browser dev tools show next to each request.
+
+ReplicaPinMiddleware: read-your-writes pinning for the replica router
+(myproject.routers).
+
+StaticAssetMiddleware: serves collected static files, precompressed and
+with far-future cache headers (myproject.staticfiles).
+"""
+import functools
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.base import Template
+
+from . import dbhooks, routers
+from .metrics import REGISTRY
+from .staticfiles import asset_response, build_index
+
+METRICS_SERVER_TIMING = getattr(settings, 'METRICS_SERVER_TIMING', True)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'sql', 'template', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Query hook, see _time_query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+
+def _time_query(execute, sql, params, many, context):
+    """dbhooks hook: time the query for the request running in this context, if any"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+dbhooks.register(_time_query)
+
+
+def install_template_timer():
+    """Wrap Template.render (once) so the current request's render time is recorded"""
+    if getattr(Template.render, 'records_request_timing', False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context):
+        timings = _current.get()
+        if timings is None or timings.rendering:
+            return original(self, context)
+        timings.rendering = True
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            timings.template += time.perf_counter() - start
+            timings.rendering = False
+
+    render.records_request_timing = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    """Records query count, SQL time, template time and latency per view (sync and async)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_template_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start, timings = time.perf_counter(), RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        start, timings = time.perf_counter(), RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    def _finish(self, request, response, timings, start):
+        latency = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED_VIEW
+        REGISTRY.record(view, response.status_code, latency, timings.sql, timings.queries, timings.template)
+        if METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={timings.sql * 1000:.1f};desc="{timings.queries} queries", '
+                f'tpl;dur={timings.template * 1000:.1f}, '
+                f'total;dur={latency * 1000:.1f}'
+            )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Keeps a browser on the primary for REPLICA_PIN_SECONDS after a request that wrote (sync and async)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = routers.begin_request(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state, token = routers.begin_request(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self._finish(response, state)
+
+    @staticmethod
+    def _finish(response, state):
+        if state.wrote:
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+class StaticAssetMiddleware:
+    """Answers GET/HEAD requests for files under STATIC_ROOT before anything else runs (sync and async)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Built once per process; restart after collectstatic, as for any deploy
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.index = build_index()
+
+    def _response(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        asset = self.index.get(request.path_info[len(self.prefix):])
+        return asset_response(request, asset) if asset else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._response(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._response(request) or await self.get_response(request)
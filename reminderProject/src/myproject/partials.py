@@ -0,0 +1,44 @@
+"""
+Partial responses for actions that otherwise POST-redirect-GET.
+
+Completing or deleting a task and buying or using water drops normally end
+with a redirect and a full page render. Sent from a page script (actions.js
+adds `X-Requested-With: XMLHttpRequest`), they are answered instead with an
+HTML fragment of just what changed: the task card, the counters, the token
+badge, the plant panel and the messages. Every top-level element of the
+fragment carries the id of the element it replaces on the page; one marked
+`data-remove` is removed instead. A request whose Accept header prefers
+application/json gets a JSON patch with the same payloads as the live
+update events (myproject.events) plus the messages.
+
+Requests without either header, i.e. plain links and forms, keep the
+redirect, so the pages work the same without JavaScript.
+"""
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import render
+
+FRAGMENT = 'fragment'
+JSON = 'json'
+
+
+def response_mode(request):
+    """FRAGMENT, JSON, or None for a normal (redirecting) request"""
+    # Browsers navigating send */*, which must not count as asking for JSON
+    if request.get_preferred_type(['text/html', 'application/json']) == 'application/json':
+        return JSON
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return FRAGMENT
+    return None
+
+
+def _consume_messages(request):
+    # Iterating marks them as shown, so the next full page doesn't repeat them
+    return [{'level': message.tags, 'text': str(message)} for message in messages.get_messages(request)]
+
+
+def partial_response(request, mode, template, context, patch, status=200):
+    """The fragment (rendered with the messages) or the JSON patch for an action"""
+    if mode == JSON:
+        return JsonResponse({**patch, 'messages': _consume_messages(request)}, status=status)
+    return render(request, template, context, status=status)
@@ -0,0 +1,144 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ('default'). Reads go to a replica only
+inside views marked with @read_replica (or admin changelists using
+ReadReplicaAdminMixin), and only for GET/HEAD requests. One replica is
+picked per request, so a page never mixes two replicas' data. Everything
+else reads from the primary, including management commands and workers.
+
+Read-your-writes: ReplicaPinMiddleware watches the SQL sent to the primary
+(through a myproject.dbhooks hook, so queries from sync_to_async threads
+count under ASGI too) and sets a short-lived cookie after any request that
+wrote to it. Pinned
+browsers read from the primary until the cookie expires
+(REPLICA_PIN_SECONDS, which must exceed the replication lag). A view that writes mid-request also switches its remaining
+reads to the primary. Writes are recognised by their SQL, not by
+db_for_write(), which also routes get_or_create() and select_for_update()
+reads.
+
+Replicas are the aliases in settings.DATABASE_REPLICAS. Locally, SQLite
+aliases pointing at the same file (or at copies of it) stand in for them.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import dbhooks
+
+SAFE_METHODS = ('GET', 'HEAD')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class RoutingState:
+    """Per-request routing flags, shared with sync_to_async threads through the context"""
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Query hook for the primary connection (see _watch_writes)
+        if not self.wrote and sql.lstrip()[:6].upper() in WRITE_STATEMENTS:
+            self.wrote = True
+        return execute(sql, params, many, context)
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def _watch_writes(execute, sql, params, many, context):
+    """dbhooks hook: hand the primary's queries to the current request's routing state"""
+    state = _state.get()
+    if state is None or context['connection'].alias != DEFAULT_DB_ALIAS:
+        return execute(sql, params, many, context)
+    return state(execute, sql, params, many, context)
+
+
+dbhooks.register(_watch_writes)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def begin_request(pinned=False):
+    """Start routing state for a request; returns (state, token for end_request)"""
+    state = RoutingState(pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+@contextmanager
+def replica_reads(request):
+    """Send the block's reads to a replica, unless the request is unsafe or pinned to the primary"""
+    state = _state.get()
+    token = None
+    if state is None:
+        # Used without ReplicaPinMiddleware (e.g. RequestFactory tests): no pinning or write detection
+        state, token = begin_request()
+    previous = state.replica
+    replicas = get_replicas()
+    if request.method in SAFE_METHODS and not state.pinned and replicas:
+        state.replica = previous or random.choice(replicas)
+    try:
+        yield state
+    finally:
+        state.replica = previous
+        if token is not None:
+            end_request(token)
+
+
+def read_replica(view):
+    """View decorator (sync or async) for pages that only read"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads(request):
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads(request):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaAdminMixin:
+    """ModelAdmin mixin: changelist pages read from a replica (actions are POSTs and stay on the primary)"""
+
+    def changelist_view(self, request, extra_context=None):
+        with replica_reads(request):
+            return super().changelist_view(request, extra_context)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        # Explicit, or instances loaded from a replica would keep reading from it
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in get_replicas()
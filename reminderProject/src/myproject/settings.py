@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Collected static files are answered before any other middleware runs (see myproject/staticfiles.py)
+    'myproject.middleware.StaticAssetMiddleware',
+    # Outermost for views, so its latency covers the other middleware too (see myproject/middleware.py)
+    'myproject.middleware.RequestMetricsMiddleware',
+    # Before SessionMiddleware, so session writes also pin the browser to the primary
+    'myproject.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +79,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'myproject.wsgi.application'
 
+# Serve the async versions of the read-only pages (task list, tokens, game).
+# myproject.asgi turns this on; WSGI servers keep the sync views, which avoid
+# an event loop per request there.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -87,6 +99,56 @@ DATABASES = {
     }
 }
 
+# Read replicas (see myproject/routers.py): DJANGO_DB_REPLICA_HOSTS=host1,host2 adds one
+# alias per streaming replica of the primary. @read_replica views read from them.
+for _i, _host in enumerate(h.strip() for h in os.environ.get('DJANGO_DB_REPLICA_HOSTS', '').split(',') if h.strip()):
+    DATABASES[f'replica{_i + 1}'] = {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+DATABASE_ROUTERS = ['myproject.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10   # reads stay on the primary this long after a write; keep above the replication lag
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; with several workers use a shared backend such as
+# 'django.core.cache.backends.filebased.FileBasedCache' (LOCATION = a directory).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'spookaminder',
+        # The default of 300 entries is far too small once task cards are cached per task
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Progress of background admin bulk actions (accounts/bulk.py). Kept in the database so any
+    # worker can serve the progress page; create the table with `manage.py createcachetable`.
+    'bulk_jobs': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'bulk_job_cache',
+    },
+}
+
+# Seconds to keep per-user stats (tasks/stats.py, miniGame/stats.py) between invalidations
+STATS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds to keep rendered task cards (tasks/fragments.py); keys include the task's updated_at
+TASK_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Deadline reminders (manage.py run_reminders, see tasks/reminders.py)
+REMINDER_BACKEND = 'tasks.reminders.ConsoleBackend'  # or FileBackend / InMemoryBackend
+REMINDER_FILE_PATH = BASE_DIR / 'reminders.log'
+REMINDER_LEAD_MINUTES = 15     # remind this long before the deadline
+REMINDER_WINDOW_MINUTES = 60   # reminders due within this window are kept in memory
+REMINDER_SYNC_SECONDS = 30     # how often the worker picks up task changes
+
+# Request metrics (myproject/middleware.py). /metrics is served to staff users, to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>", and to METRICS_ALLOWED_IPS. The list is empty by default:
+# behind a local reverse proxy every request comes from 127.0.0.1, so only list addresses that can't be proxied.
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = True   # add a Server-Timing header (db, tpl, total) to every response
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +186,14 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# `manage.py collectstatic` writes content-hashed copies plus .gz/.br variants here;
+# StaticAssetMiddleware serves them with immutable cache headers
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'myproject.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -132,7 +202,54 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
+# request.user and the session come from the cache on most requests (see accounts/backends.py)
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+
 # Login/Logout redirect URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Task creation quota (see tasks/quota.py). GROUPS/USERS override DEFAULT by group name/username.
+TASK_QUOTAS = {
+    'DEFAULT': {'LIMIT': 5, 'WINDOW_HOURS': 24},
+    'GROUPS': {},
+    'USERS': {},
+}
+
+# Bulk imports (tasks/transfer.py) have their own quota; same shape as TASK_QUOTAS
+TASK_IMPORT_QUOTAS = {
+    'DEFAULT': {'LIMIT': 50000, 'WINDOW_HOURS': 24},
+    'GROUPS': {},
+    'USERS': {},
+}
+
+# Rows per database round trip for exports and per bulk insert/transaction for imports
+TASK_TRANSFER_CHUNK_SIZE = 2000
+
+# manage.py archive_tasks (tasks/archive.py): completed tasks older than this move to ArchivedTask
+TASK_ARCHIVE_AFTER_DAYS = 30
+TASK_ARCHIVE_BATCH_SIZE = 1000   # tasks per transaction
+
+# manage.py compact_water_history (miniGame/ledger.py): raw purchases older than this are folded into daily summaries
+WATER_RAW_RETENTION_DAYS = 90
+
+# Global leaderboard (accounts/leaderboard.py): per-process rank index, synced from LeaderboardEntry
+LEADERBOARD_PAGE_SIZE = 25
+LEADERBOARD_PAGE_CACHE_SECONDS = 30
+LEADERBOARD_SYNC_SECONDS = 5        # how often a process applies changed entries
+LEADERBOARD_RELOAD_SECONDS = 60 * 60   # full reload (drops deleted users)
+
+# Live updates (myproject/events.py): server-sent events at /events/, served under ASGI only.
+# With more than one process use 'myproject.events.PostgresBackend' (LISTEN/NOTIFY, needs psycopg 3).
+EVENTS_BACKEND = 'myproject.events.LocalBackend'
+EVENTS_STREAM_SECONDS = 5 * 60      # streams are closed and reopened by the browser after this
+EVENTS_KEEPALIVE_SECONDS = 20
+
+# Admin bulk actions (see accounts/bulk.py): selections above the threshold run in background chunks
+BULK_ACTION_BACKGROUND_THRESHOLD = 5000
+BULK_ACTION_CHUNK_SIZE = 1000
+BULK_ACTION_CACHE = 'bulk_jobs'     # cache alias for job progress; must be shared by all workers
+BULK_ACTION_STALE_SECONDS = 10 * 60  # a running job without progress this long is shown as failed (worker restarted)
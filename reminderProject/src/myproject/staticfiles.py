@@ -0,0 +1,203 @@
+"""
+Fingerprinted, precompressed static files.
+
+`manage.py collectstatic` copies the assets to STATIC_ROOT under content-
+hashed names (ManifestStaticFilesStorage: ghost.png -> ghost.3c5a6e5a1b2f.png,
+with url()s inside CSS rewritten to match). It then writes a .gz sibling,
+and a .br one when the optional `brotli` package is installed, for every
+text asset (CSS, JS, SVG, ...). PNG and JPEG are already compressed.
+
+StaticAssetMiddleware (myproject.middleware) serves STATIC_ROOT from the app
+using an index built once per process, so a request costs no filesystem
+lookups beyond opening the file. Hashed names can never change content, so
+they are sent with `Cache-Control: public, max-age=31536000, immutable` and
+browsers stop revalidating them. The unhashed copies collectstatic also
+keeps get a short max-age. The smallest variant the request's
+Accept-Encoding allows is sent, with `Vary: Accept-Encoding`.
+
+Files referenced but missing (the templates' spiderWeb.jpg) keep their
+plain name instead of failing the page or collectstatic; once collectstatic
+has run, a warning is logged once per name.
+"""
+import gzip
+import json
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico')
+# Files smaller than this gain nothing worth a second lookup
+COMPRESS_MIN_SIZE = 256
+# Variants that don't save at least this fraction are not written
+COMPRESS_MIN_SAVING = 0.05
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UNHASHED_CACHE_CONTROL = 'public, max-age=60'
+
+
+def _gzip(data):
+    # mtime=0 keeps the output identical between collectstatic runs
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def encoders():
+    """(Content-Encoding, file suffix, compress) in order of preference"""
+    if brotli is not None:
+        yield 'br', '.br', _brotli
+    yield 'gzip', '.gz', _gzip
+
+
+VARIANT_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes compressed variants and tolerates missing files"""
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._missing = set()
+
+    def hashed_name(self, name, content=None, filename=None):
+        if content is None and name in self._missing:
+            return name
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # Raised only for files that don't exist: link them unhashed rather than break the page
+            if content is not None:
+                raise
+            if name not in self._missing:
+                self._missing.add(name)
+                if self.hashed_files:
+                    logger.warning('Static file %r is referenced but missing; serving it unhashed.', name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                for suffix in self._compress(name):
+                    yield name, name + suffix, True
+
+    def _compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for _, suffix, compress in encoders():
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - COMPRESS_MIN_SAVING):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+                yield suffix
+
+
+# ---- serving -----------------------------------------------------------------
+
+@dataclass
+class Asset:
+    path: str
+    content_type: str
+    mtime: float
+    immutable: bool
+    variants: dict = field(default_factory=dict)   # Content-Encoding -> path
+
+    def negotiate(self, accept_encoding):
+        """(Content-Encoding or None, path) of the preferred variant the client accepts"""
+        if self.variants:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, _, _ in encoders():
+                if encoding in accepted and encoding in self.variants:
+                    return encoding, self.variants[encoding]
+        return None, self.path
+
+
+def accepted_encodings(header):
+    """Codings named in an Accept-Encoding header, minus those refused with q=0"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            refused = params and float(quality) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding.strip().lower())
+    if '*' in accepted:
+        accepted.update(VARIANT_SUFFIXES.values())
+    return accepted
+
+
+def _manifest_names():
+    """Hashed names listed in the manifest collectstatic wrote (empty without a manifest storage)"""
+    read_manifest = getattr(staticfiles_storage, 'read_manifest', None)
+    content = read_manifest() if read_manifest else None
+    return set(json.loads(content).get('paths', {}).values()) if content else set()
+
+
+def build_index(root=None, hashed_names=None):
+    """Map every file under STATIC_ROOT (relative, '/'-separated) to an Asset"""
+    root = root or settings.STATIC_ROOT
+    if not root or not os.path.isdir(root):
+        return {}
+    if hashed_names is None:
+        hashed_names = _manifest_names()
+    index, variants = {}, []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            base, suffix = os.path.splitext(name)
+            if suffix in VARIANT_SUFFIXES:
+                variants.append((base, VARIANT_SUFFIXES[suffix], path))
+                continue
+            content_type, _ = mimetypes.guess_type(filename)
+            index[name] = Asset(
+                path=path,
+                content_type=content_type or 'application/octet-stream',
+                mtime=os.stat(path).st_mtime,
+                immutable=name in hashed_names,
+            )
+    for base, encoding, path in variants:
+        if base in index:
+            index[base].variants[encoding] = path
+    return index
+
+
+def asset_response(request, asset):
+    if not asset.immutable and not was_modified_since(request.headers.get('If-Modified-Since'), asset.mtime):
+        return HttpResponseNotModified()
+    encoding, path = asset.negotiate(request.headers.get('Accept-Encoding', ''))
+    response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset.variants:
+        response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.immutable else UNHASHED_CACHE_CONTROL
+    response.headers['Last-Modified'] = http_date(asset.mtime)
+    return response
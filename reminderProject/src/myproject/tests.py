@@ -0,0 +1,292 @@
+import asyncio
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path
+from django.utils import timezone
+
+from accounts.leaderboard import get_leaderboard
+from accounts.models import User
+from miniGame.models import Plant
+from miniGame.stats import get_water_stats
+from tasks.models import Task
+from tasks.services import complete_task
+from tasks.stats import get_task_stats_for
+from . import events
+from .events import BROKER, Event, Subscription
+from .metrics import REGISTRY, Histogram
+from .middleware import REPLICA_PIN_COOKIE, REPLICA_PIN_SECONDS
+from .routers import PrimaryReplicaRouter, begin_request, end_request, read_replica, replica_reads
+from .staticfiles import IMMUTABLE_CACHE_CONTROL, UNHASHED_CACHE_CONTROL, accepted_encodings
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        REGISTRY.reset()
+        self.user = User.objects.create_user(username='metrics', password='pw')
+        Task.objects.create(user=self.user, name='Carve pumpkin', deadline=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.user)
+
+    def test_server_timing_header_and_metrics_endpoint(self):
+        response = self.client.get('/tasks/')
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+        with mock.patch('myproject.metrics.METRICS_TOKEN', 'scrape-secret'):
+            body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('django_request_duration_seconds_count{view="task_list"} 1', body)
+        self.assertIn('django_request_queries_bucket{view="task_list",le="+Inf"} 1', body)
+        self.assertIn('django_responses_total{view="task_list",status="200"} 1', body)
+        # Template time was measured for the rendered page
+        line = next(l for l in body.splitlines() if l.startswith('django_request_template_duration_seconds_sum{view="task_list"}'))
+        self.assertGreater(float(line.split()[-1]), 0)
+
+    async def test_asgi_requests_count_their_queries(self):
+        # Sync views run in a sync_to_async thread, async views' ORM calls too; both use other connections
+        await self.async_client.aforce_login(self.user)
+        for urlconf, view in (('myproject.urls', 'task_list'), ('tasks.tests', 'tasks.views.atask_list')):
+            with self.subTest(view=view), override_settings(ROOT_URLCONF=urlconf):
+                response = await self.async_client.get('/tasks/')
+                self.assertEqual(response.status_code, 200)
+                self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="[1-9]\d* queries"')
+                body = REGISTRY.render()
+                self.assertNotIn(f'django_request_queries_bucket{{view="{view}",le="0"}} 1', body)
+                self.assertIn(f'django_request_queries_count{{view="{view}"}} 1', body)
+
+    def test_metrics_endpoint_access(self):
+        # Not even to localhost by default: a local reverse proxy makes every request come from there
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 404)
+        with mock.patch('myproject.metrics.METRICS_TOKEN', 'scrape-secret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+        # No token configured: an empty bearer must not match it
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+        with mock.patch('myproject.metrics.METRICS_ALLOWED_IPS', ['10.0.0.9']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.9').status_code, 200)
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 404)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('h', 'test', ('view',), (1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(('v',), value)
+        self.assertEqual(list(histogram.samples()), [
+            'h_bucket{view="v",le="1"} 2',
+            'h_bucket{view="v",le="5"} 3',
+            'h_bucket{view="v",le="+Inf"} 4',
+            'h_sum{view="v"} 11.5',
+            'h_count{view="v"} 4',
+        ])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='replica', password='pw')
+        self.router = PrimaryReplicaRouter()
+
+    def _read_db(self, method='get', view=read_replica):
+        """Alias the router picks for reads inside a decorated view"""
+        request = getattr(RequestFactory(), method)('/tasks/')
+        request.user = self.user
+        return view(lambda request: self.router.db_for_read(Task))(request)
+
+    def test_reads_go_to_a_replica_only_in_decorated_safe_requests(self):
+        self.assertIn(self._read_db(), ('replica1', 'replica2'))
+        self.assertEqual(self._read_db(method='post'), 'default')
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+
+    def test_write_pins_browser_to_primary(self):
+        self.client.force_login(self.user)
+        # A read-only page doesn't pin (an undecorated one: 'replica1' isn't a configured database here)...
+        self.assertNotIn(REPLICA_PIN_COOKIE, self.client.get('/tasks/create/').cookies)
+        # ...a write does, and later reads in the window use the primary
+        response = self.client.post('/tasks/create/', {
+            'name': 'Carve pumpkin', 'deadline': (timezone.localtime() + timedelta(minutes=5)).strftime('%Y-%m-%dT%H:%M'),
+        })
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], REPLICA_PIN_SECONDS)
+
+        state, token = begin_request(pinned=True)
+        try:
+            self.assertEqual(self._read_db(), 'default')
+        finally:
+            end_request(token)
+
+    def test_shared_caches_are_filled_from_the_primary(self):
+        # 'replica1' and 'replica2' aren't configured databases here, so any query sent to one fails
+        cache.clear()
+        get_leaderboard('tokens')._checked = None
+        with replica_reads(RequestFactory().get('/')):
+            self.assertEqual(get_task_stats_for(self.user.pk)['total'], 0)
+            self.assertEqual(get_water_stats(self.user)['total_transactions'], 0)
+            get_leaderboard('tokens')
+
+    async def test_asgi_write_pins_browser_to_primary(self):
+        await Plant.objects.acreate(user=self.user)
+        await User.objects.filter(pk=self.user.pk).aupdate(tokens=50)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post('/game/buy-water/', {'drops': 1})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual((await User.objects.aget(pk=self.user.pk)).tokens, 45)
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], REPLICA_PIN_SECONDS)
+
+    def test_write_mid_request_moves_remaining_reads_to_primary(self):
+        state, token = begin_request()
+        try:
+            with replica_reads(RequestFactory().get('/')):
+                self.assertIn(self.router.db_for_read(Task), ('replica1', 'replica2'))
+                state(lambda *args: None, 'UPDATE "tasks_task" SET ...', (), False, {})
+                self.assertEqual(self.router.db_for_read(Task), 'default')
+        finally:
+            end_request(token)
+
+
+class StaticAssetTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def _get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_hashed_assets_are_immutable_and_precompressed(self):
+        url = static('tasks/css/task_list.css')
+        self.assertRegex(url, r'^/static/tasks/css/task_list\.[0-9a-f]{12}\.css$')
+        with open(finders.find('tasks/css/task_list.css'), 'rb') as source:
+            original = source.read()
+
+        response, body = self._get(url, accept_encoding='br;q=0, gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(body), original)
+
+        response, body = self._get(url, accept_encoding='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(body, original)
+
+    def test_unhashed_names_get_short_cache_and_conditional_requests(self):
+        response, _ = self._get('/static/ghost.png')
+        self.assertEqual(response['Cache-Control'], UNHASHED_CACHE_CONTROL)
+        response = self.client.get('/static/ghost.png', headers={'if_modified_since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_files_fall_back_to_plain_names(self):
+        with self.assertLogs('myproject.staticfiles', 'WARNING'):
+            self.assertEqual(staticfiles_storage.url('spiderWeb.jpg'), '/static/spiderWeb.jpg')
+        self.assertEqual(self.client.get('/static/spiderWeb.jpg').status_code, 404)
+
+    def test_accept_encoding_parsing(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, GZIP;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings('*'), {'*', 'br', 'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
+
+
+urlpatterns = [path('events/', events.event_stream)]
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live', password='pw', tokens=2)
+        self.task = Task.objects.create(user=self.user, name='Light candles', deadline=timezone.now() + timedelta(hours=1))
+
+    def subscribe(self, loop):
+        async def make():
+            return Subscription(self.user.pk)
+        subscription = loop.run_until_complete(make())
+        BROKER.add(subscription)
+        self.addCleanup(BROKER.discard, subscription)
+        return subscription
+
+    def received(self, loop, subscription):
+        # Deliveries are scheduled on the subscriber's loop; let it run them
+        loop.run_until_complete(asyncio.sleep(0))
+        return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+    def test_changes_are_published_once_committed(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        subscription = self.subscribe(loop)
+        with self.captureOnCommitCallbacks() as callbacks:
+            complete_task(self.user, self.task.pk)
+        self.assertEqual(self.received(loop, subscription), [])
+
+        for callback in callbacks:
+            callback()
+        received = {event.type: event.data for event in self.received(loop, subscription)}
+        self.assertEqual(received['task'], {'id': self.task.pk, 'status': 'Completed', 'total': 1,
+                                            'pending': 0, 'completed': 1, 'archived': 0})
+        self.assertEqual(received['tokens'], {'tokens': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.get(pk=self.task.pk).delete()
+        task_event = self.received(loop, subscription)[-1]
+        self.assertEqual((task_event.type, task_event.data['status'], task_event.data['total']), ('task', None, 0))
+
+    def test_payload_is_not_built_without_subscribers(self):
+        built = []
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish(self.user.pk, 'tokens', lambda: built.append(1) or {})
+        self.assertEqual(built, [])
+
+    def test_full_queue_drops_oldest_events(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def make():
+            return Subscription(self.user.pk, maxsize=2)
+        subscription = loop.run_until_complete(make())
+        for tokens in range(3):
+            subscription.put(Event(self.user.pk, 'tokens', {'tokens': tokens}))
+        loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual([subscription.queue.get_nowait().data['tokens'] for _ in range(2)], [1, 2])
+
+    def test_stream_requires_asgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/events/').status_code, 204)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_stream_sends_the_users_events(self):
+        response = await self.async_client.get('/events/')
+        self.assertEqual(response.status_code, 204)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), f'retry: {events.RETRY_MILLISECONDS}\n\n'.encode())
+
+        BROKER.deliver(Event(self.user.pk + 1, 'tokens', {'tokens': 9}))
+        BROKER.deliver(Event(self.user.pk, 'tokens', {'tokens': 4}))
+        self.assertEqual(await anext(stream), b'event: tokens\ndata: {"tokens":4}\n\n')
+
+    async def test_stream_keeps_alive_and_unsubscribes_when_closed(self):
+        stream = events._stream(self.user.pk, seconds=0.2, keepalive=0.05)
+        await anext(stream)
+        self.assertTrue(BROKER.has_subscribers(self.user.pk))
+        self.assertEqual(await anext(stream), ': keepalive\n\n')
+        # The stream ends by itself after `seconds`; EventSource then reconnects
+        self.assertEqual([chunk async for chunk in stream][-1], ': keepalive\n\n')
+        self.assertFalse(BROKER.has_subscribers(self.user.pk))
@@ -14,28 +14,48 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from accounts import views as account_views
 from tasks import views as task_views
+from tasks import api as task_api
+from myproject.metrics import metrics_view
+from myproject import events
+
+# Read-only pages have async versions for ASGI deployments (see settings.ASYNC_VIEWS)
+ASYNC = settings.ASYNC_VIEWS
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', account_views.home_view, name='home'),
     path('register/', account_views.register_view, name='register'),
     path('login/', account_views.login_view, name='login'),
     path('logout/', account_views.logout_view, name='logout'),
     path('profile/', account_views.profile_view, name='profile'),
     path('profile/edit/', account_views.profile_edit, name='profile_edit'),
-    path('tokens/', account_views.tokens_view, name='tokens'),
+    path('tokens/', account_views.atokens_view if ASYNC else account_views.tokens_view, name='tokens'),
+    path('leaderboard/', account_views.leaderboard_view, name='leaderboard'),
+    # Live updates for open pages; streams need ASGI (see myproject/events.py)
+    path('events/', events.event_stream if ASYNC else events.no_event_stream, name='events'),
     
     # Task URLs
-    path('tasks/', task_views.task_list, name='task_list'),
+    path('tasks/', task_views.atask_list if ASYNC else task_views.task_list, name='task_list'),
     path('tasks/create/', task_views.task_create, name='task_create'),
+    path('tasks/completed/', task_views.task_completed_more, name='task_completed_more'),
+    path('tasks/history/', task_views.task_history, name='task_history'),
+    path('tasks/export/', task_views.task_export, name='task_export'),
+    path('tasks/import/', task_views.task_import, name='task_import'),
     path('tasks/<int:task_id>/edit/', task_views.task_update, name='task_update'),
     path('tasks/<int:task_id>/delete/', task_views.task_delete, name='task_delete'),
     path('tasks/<int:task_id>/complete/', task_views.task_complete, name='task_complete'),
     
+    # Task JSON API
+    path('api/tasks/', task_api.task_collection, name='api_task_list'),
+    path('api/tasks/<int:task_id>/', task_api.task_detail, name='api_task_detail'),
+    path('api/tasks/<int:task_id>/complete/', task_api.task_complete, name='api_task_complete'),
+    
     # Mini Game URLs
     path('game/', include('miniGame.urls')),
 ]
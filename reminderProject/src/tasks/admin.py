@@ -1,10 +1,31 @@
 from django.contrib import admin
-from .models import Task
+from myproject.routers import ReadReplicaAdminMixin
+from .models import ArchivedTask, Task, TaskQuotaCounter
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'user', 'priority', 'deadline', 'status', 'created_at']
     list_filter = ['priority', 'status', 'deadline']
     search_fields = ['name', 'user__username']
     date_hierarchy = 'deadline'
     ordering = ['-deadline']
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['name', 'user', 'priority', 'deadline', 'completed_at', 'archived_at']
+    list_filter = ['priority']
+    search_fields = ['name', 'user__username']
+    date_hierarchy = 'deadline'
+    ordering = ['-deadline']
+    # Archived rows are a record of the past; they only leave with their user
+    readonly_fields = ['id', 'user', 'name', 'deadline', 'priority', 'category', 'created_at', 'completed_at', 'archived_at']
+
+
+@admin.register(TaskQuotaCounter)
+class TaskQuotaCounterAdmin(ReadReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'scope', 'window_start', 'count']
+    list_filter = ['scope']
+    search_fields = ['user__username']
+    date_hierarchy = 'window_start'
+    ordering = ['-window_start']
@@ -0,0 +1,200 @@
+"""
+JSON API for tasks (used by the mobile and widget clients).
+
+    GET    /api/tasks/                  list (conditional: ETag)
+    POST   /api/tasks/                  create (same deadline and quota rules as the site)
+    GET    /api/tasks/<id>/             detail
+    PATCH  /api/tasks/<id>/             update some fields
+    DELETE /api/tasks/<id>/             delete
+    POST   /api/tasks/<id>/complete/    complete and earn 1 token
+
+Authentication is the normal session cookie; unsafe methods need the CSRF
+token like any other form post (the list response sets the csrftoken cookie).
+The list validators come from one aggregate over the user's tasks (latest
+updated_at and row count), so an unchanged poll is answered with 304 before
+any task is loaded or serialised.
+
+Last-Modified is sent for information only; If-Modified-Since is not used
+to answer 304. HTTP dates have one-second resolution, so a change made
+later in the same second as the client's copy would be hidden, and
+deleting a task other than the latest doesn't move the date at all.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_http_methods, require_POST
+from django.views.decorators.vary import vary_on_cookie
+
+from .models import Task
+from .services import STATUSES, TaskLimitReached, clean_task_fields, complete_task, create_task
+
+# Columns sent to clients, read with values() so no model instances are built
+API_FIELDS = ('id', 'name', 'deadline', 'priority', 'category', 'status', 'updated_at')
+
+# Tasks per list response; the next page starts after the last id (?after=<id>)
+API_PAGE_SIZE = 100
+
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'separators': (',', ':')})
+
+
+def api_view(view):
+    """401 instead of a login redirect, and ApiError turned into a JSON error body"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'error': 'Authentication required'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return _json({'error': str(e)}, status=e.status)
+    return wrapper
+
+
+def _read_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Request body must be valid JSON')
+    if not isinstance(data, dict):
+        raise ApiError('Request body must be a JSON object')
+    return data
+
+
+def _clean_fields(data, allowed):
+    try:
+        return clean_task_fields(data, allowed)
+    except ValidationError as e:
+        raise ApiError(e.message)
+
+
+def _get_task_data(user, task_id):
+    data = Task.objects.filter(id=task_id, user=user).values(*API_FIELDS).first()
+    if data is None:
+        raise ApiError('Task not found', status=404)
+    return data
+
+
+# ---- conditional GET for the list -------------------------------------------
+
+def _list_fingerprint(request):
+    """Latest updated_at and row count of the user's tasks, computed once per request"""
+    if not hasattr(request, '_task_fingerprint'):
+        request._task_fingerprint = Task.objects.filter(user=request.user).aggregate(
+            latest=Max('updated_at'), count=Count('id'),
+        )
+    return request._task_fingerprint
+
+
+def _list_etag(request):
+    fingerprint = _list_fingerprint(request)
+    latest = fingerprint['latest'].timestamp() if fingerprint['latest'] else 0
+    # Different filters/pages are different representations of the same data
+    params = hashlib.md5(request.GET.urlencode().encode(), usedforsecurity=False).hexdigest()[:8]
+    return f'{fingerprint["count"]}-{latest:.6f}-{params}'
+
+
+@condition(etag_func=_list_etag)
+def _task_list(request):
+    tasks = Task.objects.filter(user=request.user).order_by('id')
+    status = request.GET.get('status')
+    if status:
+        if status not in STATUSES:
+            raise ApiError(f'status must be one of {", ".join(STATUSES)}')
+        tasks = tasks.filter(status=status)
+    after = request.GET.get('after')
+    if after:
+        try:
+            tasks = tasks.filter(id__gt=int(after))
+        except ValueError:
+            raise ApiError('after must be a task id')
+
+    # Fetch one extra row to know whether another page follows
+    rows = list(tasks.values(*API_FIELDS)[:API_PAGE_SIZE + 1])
+    has_next = len(rows) > API_PAGE_SIZE
+    rows = rows[:API_PAGE_SIZE]
+    response = _json({'tasks': rows, 'next': rows[-1]['id'] if has_next else None})
+    latest = _list_fingerprint(request)['latest']
+    if latest:
+        response['Last-Modified'] = http_date(latest.timestamp())
+    return response
+
+
+def _task_create(request):
+    fields = _clean_fields(_read_body(request), ('name', 'deadline', 'priority', 'category'))
+    if 'name' not in fields or 'deadline' not in fields:
+        raise ApiError('name and deadline are required')
+    try:
+        task, status = create_task(request.user, **fields)
+    except ValidationError as e:
+        raise ApiError(e.message)
+    except TaskLimitReached as e:
+        return _json({'error': str(e), 'resets_at': e.status.resets_at}, status=429)
+    response = _json(_get_task_data(request.user, task.id), status=201)
+    response['X-Tasks-Remaining'] = status.remaining
+    return response
+
+
+# ---- views ------------------------------------------------------------------
+
+@api_view
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@ensure_csrf_cookie
+def task_collection(request):
+    """List the user's tasks, or create one"""
+    if request.method == 'POST':
+        return _task_create(request)
+    return _task_list(request)
+
+
+@api_view
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+def task_detail(request, task_id):
+    """Read, update or delete one task"""
+    if request.method == 'DELETE':
+        deleted, _ = Task.objects.filter(id=task_id, user=request.user).delete()
+        if not deleted:
+            raise ApiError('Task not found', status=404)
+        return HttpResponse(status=204)
+
+    if request.method == 'PATCH':
+        fields = _clean_fields(_read_body(request), ('name', 'deadline', 'priority', 'category', 'status'))
+        try:
+            task = Task.objects.get(id=task_id, user=request.user)
+        except Task.DoesNotExist:
+            raise ApiError('Task not found', status=404)
+        for field, value in fields.items():
+            setattr(task, field, value)
+        task.save(update_fields=[*fields, 'updated_at'])
+
+    return _json(_get_task_data(request.user, task_id))
+
+
+@api_view
+@require_POST
+def task_complete(request, task_id):
+    """Complete a task; `awarded` says whether a token was earned"""
+    try:
+        task, awarded = complete_task(request.user, task_id)
+    except Task.DoesNotExist:
+        raise ApiError('Task not found', status=404)
+    return _json({'task': _get_task_data(request.user, task.id), 'awarded': awarded})
@@ -0,0 +1,63 @@
+"""
+Cached HTML fragments for task cards.
+
+Each card in tasks/_task_card.html is cached under (task id, updated_at,
+per-user card version), so a page only re-renders the cards that changed.
+Saving a task bumps updated_at, which is enough for single edits. Changes
+that skip save() or updated_at (bulk updates, imports, archiving) must call
+bump_card_version() for the owner so all of their cards are re-rendered.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+TASK_CARD_CACHE_TIMEOUT = getattr(settings, 'TASK_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Bump when the card markup changes so old fragments are never served
+CARD_TEMPLATE_VERSION = 2
+
+
+def _version_key(user_id):
+    return f'task-cards:version:{user_id}'
+
+
+def get_card_version(user_id):
+    """Cache-key component for the user's cards"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(user_id), version, None)
+    return f'{CARD_TEMPLATE_VERSION}.{version}'
+
+
+async def aget_card_version(user_id):
+    """get_card_version() for async views"""
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        version = 1
+        await cache.aadd(_version_key(user_id), version, None)
+    return f'{CARD_TEMPLATE_VERSION}.{version}'
+
+
+def bump_card_version(user_id):
+    """Invalidate every cached card of the user"""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version stored yet (or it was evicted): start past the default
+        cache.set(_version_key(user_id), 2, None)
+
+
+def card_context(user):
+    """Template context needed by tasks/_task_card.html"""
+    return {
+        'card_version': get_card_version(user.pk),
+        'card_cache_timeout': TASK_CARD_CACHE_TIMEOUT,
+    }
+
+
+async def acard_context(user):
+    """card_context() for async views"""
+    return {
+        'card_version': await aget_card_version(user.pk),
+        'card_cache_timeout': TASK_CARD_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archive import TASK_ARCHIVE_AFTER_DAYS, TASK_ARCHIVE_BATCH_SIZE, archivable_tasks, archive_completed_tasks, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Moves completed tasks older than --days into the archive table, in batches (see tasks/archive.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=TASK_ARCHIVE_AFTER_DAYS,
+                            help=f'Archive tasks completed more than this many days ago (default {TASK_ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=TASK_ARCHIVE_BATCH_SIZE,
+                            help=f'Tasks moved per transaction (default {TASK_ARCHIVE_BATCH_SIZE})')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must not be negative and --batch-size must be at least 1')
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'{archivable_tasks(cutoff).count()} task(s) completed before {cutoff:%Y-%m-%d %H:%M} would be archived')
+            return
+
+        started = time.perf_counter()
+        total = 0
+        for moved in archive_completed_tasks(cutoff, options['batch_size']):
+            total += moved
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {total} archived')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total} task(s) completed before {cutoff:%Y-%m-%d %H:%M} in {time.perf_counter() - started:.1f}s'
+        ))
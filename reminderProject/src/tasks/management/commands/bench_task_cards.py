@@ -0,0 +1,85 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from tasks.fragments import card_context
+from tasks.models import Task
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks task_list.html rendering with and without cached task card fragments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=300, help='Pending tasks to render (default 300)')
+        parser.add_argument('--runs', type=int, default=20, help='Timed renders per mode (default 20)')
+
+    def handle(self, *args, **options):
+        # Build throwaway data and roll it back when done
+        with transaction.atomic():
+            user = User.objects.create(username=f'bench-cards-{time.time_ns()}')
+            now = timezone.now()
+            Task.objects.bulk_create([
+                Task(user=user, name=f'Benchmark task {i}', deadline=now + timedelta(minutes=i),
+                     priority=('High', 'Medium', 'Low')[i % 3], category='Bench' if i % 2 else None)
+                for i in range(options['tasks'])
+            ])
+            tasks = list(Task.objects.filter(user=user).order_by('deadline'))
+
+            request = RequestFactory().get('/tasks/')
+            request.user = user
+
+            with override_settings(CACHES=NO_CACHE):
+                before = self._time_renders(request, user, tasks, options['runs'])
+
+            cache.clear()
+            self._render(request, user, tasks)  # warm the fragment cache
+            after = self._time_renders(request, user, tasks, options['runs'])
+
+            # One edited card: only that fragment is re-rendered
+            tasks[0].save()
+            one_changed = self._time_renders(request, user, tasks, 1)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Rendering task_list.html with {len(tasks)} cards, {options["runs"]} runs each')
+        self._report('Uncached cards', before)
+        self._report('Cached cards (warm)', after)
+        self._report('Cached, one card changed', one_changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Median speed-up: {statistics.median(before) / statistics.median(after):.1f}x'
+        ))
+
+    def _render(self, request, user, tasks):
+        context = {
+            'pending_tasks': tasks,
+            'completed_tasks': [],
+            'total_tasks': len(tasks),
+            'pending_count': len(tasks),
+            'completed_count': 0,
+            **card_context(user),
+        }
+        return render_to_string('tasks/task_list.html', context, request=request)
+
+    def _time_renders(self, request, user, tasks, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            self._render(request, user, tasks)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f'  {label:<26} median {statistics.median(timings):7.2f} ms   '
+            f'min {min(timings):7.2f} ms   max {max(timings):7.2f} ms'
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from tasks import transfer
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tasks to a CSV or NDJSON file (or stdout) without loading them all into memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username whose tasks are exported')
+        parser.add_argument('--format', choices=transfer.FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user named "{options["user"]}"')
+
+        chunks = transfer.stream_export(user, options['format'], options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Exported tasks of {user.username} to {options["output"]}'))
@@ -0,0 +1,45 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import User
+from tasks import transfer
+
+
+class Command(BaseCommand):
+    help = 'Import tasks for a user from a CSV or NDJSON file in batched, per-chunk transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file (format detected from the extension)')
+        parser.add_argument('--user', required=True, help='Username the tasks are imported for')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='Override format detection')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk insert / transaction')
+        parser.add_argument('--no-quota', action='store_true',
+                            help='Do not count against the import quota (admin restores)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user named "{options["user"]}"')
+
+        try:
+            fmt = transfer.detect_format(options['path'], options['format'])
+            with open(options['path'], 'rb') as f:
+                result = transfer.import_tasks(
+                    user, f, fmt, chunk_size=options['chunk_size'], use_quota=not options['no_quota'],
+                )
+        except (OSError, ValidationError) as e:
+            raise CommandError(str(e.message if isinstance(e, ValidationError) else e))
+
+        for line, message in result.errors:
+            self.stderr.write(f'  line {line}: {message}')
+        if result.skipped > len(result.errors):
+            self.stderr.write(f'  ... and {result.skipped - len(result.errors)} more invalid row(s)')
+        if result.quota_exceeded:
+            self.stderr.write(self.style.ERROR(
+                f'Import quota reached; stopped early. It resets at {timezone.localtime(result.resets_at):%Y-%m-%d %H:%M}.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} task(s) for {user.username}, skipped {result.skipped} invalid row(s)'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.reminders import ReminderScheduler, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Long-running worker that sends deadline reminders (see tasks/reminders.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', help='Reminder backend import path (default: settings.REMINDER_BACKEND)')
+        parser.add_argument('--once', action='store_true', help='Send what is due now and exit (cron / tests)')
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(get_backend(options['backend']))
+        self.stdout.write(self.style.SUCCESS('Reminder worker started'))
+        try:
+            while True:
+                sent = scheduler.tick()
+                if sent:
+                    self.stdout.write(f'Sent {sent} reminder(s); {len(scheduler)} scheduled')
+                if options['once']:
+                    break
+                # Don't hold a connection open while sleeping between ticks
+                close_old_connections()
+                time.sleep(scheduler.seconds_until_next())
+        except KeyboardInterrupt:
+            self.stdout.write('Reminder worker stopped')
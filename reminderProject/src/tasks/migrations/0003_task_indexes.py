@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_taskquotacounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', 'deadline', 'id'], name='task_user_status_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'Completed'), _negated=True), fields=['user', 'deadline'], name='task_pending_deadline_idx'),
+        ),
+    ]
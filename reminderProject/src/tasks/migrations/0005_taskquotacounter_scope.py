@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_reminder_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='taskquotacounter',
+            name='unique_task_quota_window',
+        ),
+        migrations.AddField(
+            model_name='taskquotacounter',
+            name='scope',
+            field=models.CharField(choices=[('create', 'Create'), ('import', 'Import')], default='create', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='taskquotacounter',
+            constraint=models.UniqueConstraint(fields=('user', 'scope', 'window_start'), name='unique_task_quota_scope_window'),
+        ),
+    ]
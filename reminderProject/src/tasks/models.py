@@ -26,6 +26,70 @@ class Task(models.Model):
     class Meta:
         # Order by deadline ascending so tasks appear earliest-first
         ordering = ['deadline', 'priority']
+        indexes = [
+            # Per-status counts (task_list, tokens_view) and the completed-task keyset pages
+            models.Index(fields=['user', 'status', 'deadline', 'id'], name='task_user_status_deadline_idx'),
+            # Pending list ordered by deadline; completed history stays out of this index
+            models.Index(
+                fields=['user', 'deadline'],
+                condition=~models.Q(status='Completed'),
+                name='task_pending_deadline_idx',
+            ),
+            # Reminder worker: pending deadlines entering the window, across all users
+            models.Index(
+                fields=['deadline'],
+                condition=~models.Q(status='Completed'),
+                name='task_pending_due_idx',
+            ),
+            # Reminder worker: incremental sync of tasks changed since the last pass
+            models.Index(fields=['updated_at'], name='task_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.priority} priority (Due: {self.deadline})"
+
+
+class ArchivedTask(models.Model):
+    """A completed Task moved out of the hot table by `manage.py archive_tasks` (see tasks.archive)"""
+    # Same id as the Task it came from
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_tasks')
+    name = models.CharField(max_length=200)
+    deadline = models.DateTimeField()
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='Medium')
+    category = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField()
+    # The task's updated_at when it was archived, i.e. roughly when it was completed
+    completed_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-deadline', '-id']
+        indexes = [
+            # History pages (keyset on deadline, id) and per-user counts
+            models.Index(fields=['user', 'deadline', 'id'], name='archived_user_deadline_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} (archived, due {self.deadline})"
+
+
+class TaskQuotaCounter(models.Model):
+    """Number of tasks a user has created (or imported) in one quota window (see tasks.quota)"""
+    SCOPE_CHOICES = [
+        ('create', 'Create'),
+        ('import', 'Import'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_quota_counters')
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, default='create')
+    window_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'window_start'], name='unique_task_quota_scope_window'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.count} task(s) ({self.scope}) since {self.window_start}"
@@ -0,0 +1,163 @@
+"""
+Task creation quota.
+
+Each user gets a counter row per quota window (TaskQuotaCounter). Creating a
+task bumps the counter with a single conditional UPDATE, so two concurrent
+requests can never both squeeze past the limit and no Task rows are counted.
+
+Limits are configured in settings.TASK_QUOTAS:
+
+    TASK_QUOTAS = {
+        'DEFAULT': {'LIMIT': 5, 'WINDOW_HOURS': 24},
+        'GROUPS': {'Beta testers': {'LIMIT': 10}},   # by auth group name
+        'USERS': {'demo': {'LIMIT': 50}},            # by username
+    }
+
+Windows start at local midnight. WINDOW_HOURS below 24 splits each day into
+windows of that length; multiples of 24 span several days. Anything else
+(zero, negative, or 24 and up but not a whole number of days) raises
+ImproperlyConfigured when the policy is resolved.
+
+Bulk imports (tasks.transfer) are counted in a separate 'import' scope with
+its own counters and limits, so an import never uses up the daily creation
+quota. TASK_IMPORT_QUOTAS has the same shape as TASK_QUOTAS.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TaskQuotaCounter
+
+SCOPE_CREATE = 'create'
+SCOPE_IMPORT = 'import'
+
+# (settings name, default limit, default window hours) per scope
+SCOPES = {
+    SCOPE_CREATE: ('TASK_QUOTAS', 5, 24),
+    SCOPE_IMPORT: ('TASK_IMPORT_QUOTAS', 50000, 24),
+}
+
+
+@dataclass(frozen=True)
+class QuotaPolicy:
+    limit: int
+    window_hours: int
+
+
+@dataclass(frozen=True)
+class QuotaStatus:
+    used: int
+    limit: int
+    resets_at: datetime
+
+    @property
+    def remaining(self):
+        return max(self.limit - self.used, 0)
+
+
+def _merge(policy, overrides):
+    return QuotaPolicy(
+        limit=overrides.get('LIMIT', policy.limit),
+        window_hours=overrides.get('WINDOW_HOURS', policy.window_hours),
+    )
+
+
+def _check_window(policy, setting_name):
+    hours = policy.window_hours
+    if not isinstance(hours, int) or hours <= 0 or (hours >= 24 and hours % 24):
+        raise ImproperlyConfigured(
+            f'{setting_name} WINDOW_HOURS must be a positive whole number of hours, '
+            f'and a multiple of 24 from 24 up (got {hours!r}).'
+        )
+    return policy
+
+
+def get_policy(user, scope=SCOPE_CREATE):
+    """Resolve the quota policy for a user: user override, else most generous group, else default"""
+    return _check_window(_resolve_policy(user, scope), SCOPES[scope][0])
+
+
+def _resolve_policy(user, scope):
+    setting_name, default_limit, default_window_hours = SCOPES[scope]
+    config = getattr(settings, setting_name, {})
+    policy = _merge(QuotaPolicy(default_limit, default_window_hours), config.get('DEFAULT', {}))
+
+    user_overrides = config.get('USERS', {})
+    if user.username in user_overrides:
+        return _merge(policy, user_overrides[user.username])
+
+    group_overrides = config.get('GROUPS', {})
+    if group_overrides:
+        names = user.groups.filter(name__in=group_overrides).values_list('name', flat=True)
+        candidates = [_merge(policy, group_overrides[name]) for name in names]
+        if candidates:
+            return max(candidates, key=lambda p: p.limit)
+    return policy
+
+
+def get_window(policy, now=None):
+    """Return (start, end) of the quota window containing `now`, aligned to local midnight"""
+    now = timezone.localtime(now)
+    window = timedelta(hours=policy.window_hours)
+
+    if policy.window_hours >= 24:
+        # Multi-day windows are aligned on day ordinals so they don't drift
+        days = policy.window_hours // 24
+        today = now.date()
+        start_date = today - timedelta(days=today.toordinal() % days)
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(start_date + timedelta(days=days), time.min))
+        return start, end
+
+    midnight = timezone.make_aware(datetime.combine(now.date(), time.min))
+    next_midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min))
+    start = midnight + ((now - midnight) // window) * window
+    return start, min(start + window, next_midnight)
+
+
+def get_status(user, policy=None, scope=SCOPE_CREATE):
+    """Current usage for the user's window; reads only the counter row"""
+    policy = policy or get_policy(user, scope)
+    start, end = get_window(policy)
+    used = (
+        TaskQuotaCounter.objects
+        .filter(user=user, scope=scope, window_start=start)
+        .values_list('count', flat=True)
+        .first()
+    )
+    return QuotaStatus(used=used or 0, limit=policy.limit, resets_at=end)
+
+
+def consume(user, policy=None, amount=1, scope=SCOPE_CREATE):
+    """
+    Atomically use `amount` tasks from the user's quota (all or nothing).
+
+    Returns the updated QuotaStatus, or None if that would exceed the limit.
+    Call inside the same transaction that creates the tasks so a failed
+    create gives the slots back.
+    """
+    policy = policy or get_policy(user, scope)
+    start, end = get_window(policy)
+    counters = TaskQuotaCounter.objects.filter(user=user, scope=scope, window_start=start)
+    has_room = counters.filter(count__lte=policy.limit - amount)
+
+    # Conditional increment: only succeeds while the counter has room for `amount`
+    if not has_room.update(count=F('count') + amount):
+        if policy.limit < amount:
+            return None
+        try:
+            # First task of the window; the unique constraint settles any race
+            with transaction.atomic():
+                TaskQuotaCounter.objects.create(user=user, scope=scope, window_start=start, count=amount)
+        except IntegrityError:
+            # Someone else created the row first - retry the conditional increment
+            if not has_room.update(count=F('count') + amount):
+                return None
+
+    used = counters.values_list('count', flat=True).first()
+    return QuotaStatus(used=used, limit=policy.limit, resets_at=end)
@@ -0,0 +1,217 @@
+"""
+Deadline reminders.
+
+The run_reminders worker keeps the pending tasks whose reminder falls in
+the upcoming window (REMINDER_WINDOW_MINUTES) in a min-heap ordered by
+reminder time, which is REMINDER_LEAD_MINUTES before the deadline.
+Between reminders it only runs two indexed range queries:
+
+* tasks changed since the last sync (updated_at), to pick up edits,
+  completions and new tasks, and
+* pending tasks whose deadline just entered the window (deadline).
+
+Edited tasks are pushed again and their old heap entry is skipped when it
+surfaces. Deleted or completed tasks are filtered out by one primary key
+lookup just before sending. Reminders already sent are remembered per
+(task, deadline) for as long as the worker runs, so moving a deadline
+produces a new reminder.
+
+Delivery goes through a backend chosen by REMINDER_BACKEND, like Django's
+email backends: console (default), file (JSON lines) or in-memory (tests).
+"""
+import heapq
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+REMINDER_BACKEND = getattr(settings, 'REMINDER_BACKEND', 'tasks.reminders.ConsoleBackend')
+REMINDER_LEAD_MINUTES = getattr(settings, 'REMINDER_LEAD_MINUTES', 15)
+REMINDER_WINDOW_MINUTES = getattr(settings, 'REMINDER_WINDOW_MINUTES', 60)
+REMINDER_SYNC_SECONDS = getattr(settings, 'REMINDER_SYNC_SECONDS', 30)
+
+# Re-read a little before the last sync so rows committed late (or stamped by
+# a server with a slightly slow clock) are not missed; re-scheduling is idempotent
+SYNC_OVERLAP = timedelta(seconds=30)
+
+ROW_FIELDS = ('id', 'user_id', 'user__username', 'user__email', 'name', 'deadline', 'status')
+
+
+@dataclass(frozen=True)
+class Reminder:
+    task_id: int
+    user_id: int
+    username: str
+    email: str
+    name: str
+    deadline: datetime
+    due_at: datetime
+
+    @property
+    def key(self):
+        return (self.task_id, self.deadline)
+
+    def message(self):
+        return f'Reminder for {self.username}: "{self.name}" is due at {timezone.localtime(self.deadline):%H:%M}.'
+
+
+# ---- delivery backends ------------------------------------------------------
+
+class BaseReminderBackend:
+    def send_reminders(self, reminders):
+        """Deliver the reminders and return how many were sent"""
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseReminderBackend):
+    """Writes one line per reminder to stdout"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_reminders(self, reminders):
+        for reminder in reminders:
+            self.stream.write(reminder.message() + '\n')
+        self.stream.flush()
+        return len(reminders)
+
+
+class FileBackend(BaseReminderBackend):
+    """Appends one JSON line per reminder to REMINDER_FILE_PATH"""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'REMINDER_FILE_PATH', settings.BASE_DIR / 'reminders.log')
+
+    def send_reminders(self, reminders):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for reminder in reminders:
+                f.write(json.dumps({
+                    'task_id': reminder.task_id,
+                    'user_id': reminder.user_id,
+                    'deadline': reminder.deadline.isoformat(),
+                    'message': reminder.message(),
+                }) + '\n')
+        return len(reminders)
+
+
+class InMemoryBackend(BaseReminderBackend):
+    """Keeps sent reminders in InMemoryBackend.outbox (for tests)"""
+    outbox = []
+
+    def send_reminders(self, reminders):
+        InMemoryBackend.outbox.extend(reminders)
+        return len(reminders)
+
+
+def get_backend(path=None, **kwargs):
+    """Instantiate the configured (or given) reminder backend"""
+    return import_string(path or REMINDER_BACKEND)(**kwargs)
+
+
+# ---- scheduler --------------------------------------------------------------
+
+class ReminderScheduler:
+    """In-memory min-heap of upcoming reminders, kept current by incremental syncs"""
+
+    def __init__(self, backend, lead=None, window=None):
+        self.backend = backend
+        self.lead = lead if lead is not None else timedelta(minutes=REMINDER_LEAD_MINUTES)
+        self.window = window if window is not None else timedelta(minutes=REMINDER_WINDOW_MINUTES)
+        self._heap = []          # (due_at, task id); may hold stale entries
+        self._scheduled = {}     # task id -> the Reminder its live heap entry stands for
+        self._sent = set()       # (task id, deadline) already delivered
+        self._loaded_until = None  # pending deadlines up to here are in memory
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def _reminder(self, row):
+        task_id, user_id, username, email, name, deadline, status = row
+        return Reminder(task_id, user_id, username, email, name, deadline, deadline - self.lead)
+
+    def _schedule(self, reminder):
+        if reminder.key in self._sent or self._scheduled.get(reminder.task_id) == reminder:
+            return
+        self._scheduled[reminder.task_id] = reminder
+        heapq.heappush(self._heap, (reminder.due_at, reminder.task_id))
+
+    def _load_range(self, start, end):
+        """Pending tasks with start < deadline <= end (served by task_pending_due_idx)"""
+        rows = (Task.objects.exclude(status='Completed')
+                .filter(deadline__gt=start, deadline__lte=end)
+                .values_list(*ROW_FIELDS))
+        for row in rows:
+            self._schedule(self._reminder(row))
+
+    def _sync(self, now):
+        """Apply tasks changed since the last sync (served by task_updated_at_idx)"""
+        rows = Task.objects.filter(updated_at__gt=self._synced_at - SYNC_OVERLAP).values_list(*ROW_FIELDS)
+        for row in rows:
+            reminder = self._reminder(row)
+            if row[-1] == 'Completed' or not now < reminder.deadline <= self._loaded_until:
+                self._scheduled.pop(reminder.task_id, None)
+            else:
+                self._schedule(reminder)
+        self._synced_at = now
+
+    def refresh(self, now):
+        """Bring the heap up to date: first load, or incremental sync plus window extension"""
+        horizon = now + self.window + self.lead
+        if self._loaded_until is None:
+            self._load_range(now, horizon)
+            self._synced_at = now
+        else:
+            self._sync(now)
+            if horizon > self._loaded_until:
+                self._load_range(self._loaded_until, horizon)
+        self._loaded_until = max(horizon, self._loaded_until or horizon)
+        # Sent keys only matter until their deadline has passed
+        self._sent = {key for key in self._sent if key[1] > now}
+
+    def pop_due(self, now):
+        """Remove and return every live reminder due at or before `now`"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, task_id = heapq.heappop(self._heap)
+            reminder = self._scheduled.get(task_id)
+            if reminder is None or reminder.due_at != due_at:
+                continue  # stale entry for an edited or dropped task
+            del self._scheduled[task_id]
+            due.append(reminder)
+        return due
+
+    def dispatch(self, now):
+        """Send the reminders that are due; returns how many were sent"""
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        # Tasks deleted or completed since the last sync are dropped here
+        still_pending = set(
+            Task.objects.filter(pk__in=[r.task_id for r in due]).exclude(status='Completed')
+            .values_list('pk', flat=True)
+        )
+        due = [r for r in due if r.task_id in still_pending]
+        sent = self.backend.send_reminders(due) if due else 0
+        self._sent.update(r.key for r in due)
+        return sent
+
+    def tick(self, now=None):
+        """One worker iteration: refresh, then send what is due"""
+        now = now or timezone.now()
+        self.refresh(now)
+        return self.dispatch(now)
+
+    def seconds_until_next(self, now=None):
+        """How long the worker may sleep: until the next reminder or the next sync"""
+        now = now or timezone.now()
+        wait = REMINDER_SYNC_SECONDS
+        if self._heap:
+            wait = min(wait, (self._heap[0][0] - now).total_seconds())
+        return max(wait, 0)
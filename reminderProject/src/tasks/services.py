@@ -0,0 +1,122 @@
+"""
+Task operations shared by the HTML views and the JSON API.
+
+The HTML views, the JSON API and imports validate fields and deadlines, take
+quota slots and award completion tokens through these functions, so the
+rules live in one place.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.tokens import credit_tokens
+from . import quota
+from .models import Task
+
+
+PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+
+
+class TaskLimitReached(Exception):
+    """Raised by create_task when the user's quota window is used up"""
+
+    def __init__(self, status):
+        self.status = status
+        super().__init__(
+            f'Daily limit reached! You can only create {status.limit} task(s). '
+            f'The limit will reset at {timezone.localtime(status.resets_at):%H:%M}.'
+        )
+
+
+def validate_new_deadline(deadline):
+    """New tasks must be due between now and the end of today"""
+    now = timezone.now()
+    today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+    if deadline < now:
+        raise ValidationError('Task deadline cannot be in the past! Please choose a time from now onwards.')
+    if deadline > today_end:
+        raise ValidationError('Task deadline must be within today! You can only create tasks for the current day.')
+
+
+def parse_deadline(value):
+    """ISO 8601 date and time; naive values are taken as local time"""
+    deadline = parse_datetime(value) if isinstance(value, str) else None
+    if deadline is None:
+        raise ValidationError('deadline must be an ISO 8601 date and time')
+    if timezone.is_naive(deadline):
+        deadline = timezone.make_aware(deadline)
+    return deadline
+
+
+def clean_task_fields(data, allowed):
+    """
+    Validate the task fields present in `data` (API bodies, import rows).
+
+    Returns them ready to assign to a Task; raises ValidationError.
+    """
+    unknown = set(data) - set(allowed)
+    if unknown:
+        raise ValidationError(f'Unknown field(s): {", ".join(sorted(unknown))}')
+
+    cleaned = {}
+    if 'name' in data:
+        name = data['name']
+        if not isinstance(name, str) or not name.strip() or len(name) > 200:
+            raise ValidationError('name must be a non-empty string of at most 200 characters')
+        cleaned['name'] = name
+    if 'deadline' in data:
+        cleaned['deadline'] = parse_deadline(data['deadline'])
+    if 'priority' in data:
+        if data['priority'] not in PRIORITIES:
+            raise ValidationError(f'priority must be one of {", ".join(PRIORITIES)}')
+        cleaned['priority'] = data['priority']
+    if 'category' in data:
+        category = data['category']
+        if category is not None and (not isinstance(category, str) or len(category) > 100):
+            raise ValidationError('category must be a string of at most 100 characters or null')
+        cleaned['category'] = category or None
+    if 'status' in data:
+        if data['status'] not in STATUSES:
+            raise ValidationError(f'status must be one of {", ".join(STATUSES)}')
+        cleaned['status'] = data['status']
+    return cleaned
+
+
+def create_task(user, name, deadline, priority='Medium', category=None):
+    """
+    Validate the deadline, take a quota slot and create the task.
+
+    Returns (task, quota status). The slot is rolled back if the create fails.
+    """
+    validate_new_deadline(deadline)
+    with transaction.atomic():
+        status = quota.consume(user)
+        if status is None:
+            raise TaskLimitReached(quota.get_status(user))
+        task = Task.objects.create(
+            user=user,
+            name=name,
+            deadline=deadline,
+            priority=priority,
+            category=category or None,
+        )
+    return task, status
+
+
+def complete_task(user, task_id):
+    """
+    Mark one of the user's tasks as completed, awarding 1 token the first time.
+
+    Returns (task, awarded). Raises Task.DoesNotExist for unknown tasks.
+    """
+    with transaction.atomic():
+        # Lock the task so two concurrent completions can't both award a token
+        task = Task.objects.select_for_update().get(id=task_id, user=user)
+        if task.status == 'Completed':
+            return task, False
+        task.status = 'Completed'
+        task.save(update_fields=['status', 'updated_at'])
+        credit_tokens(user, 1)
+    return task, True
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from myproject.events import publish
+from .models import Task
+from .stats import get_task_stats_for, invalidate_task_stats
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    """Drop the owner's cached stats now and again once the change is committed"""
+    # The second delete stops a reader that ran mid-transaction from caching stale counts
+    invalidate_task_stats(instance.user_id)
+    transaction.on_commit(lambda: invalidate_task_stats(instance.user_id))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_published(sender, instance, signal, **kwargs):
+    """Push the task's new status (None once deleted) and the owner's counts to their open pages"""
+    # Read now: delete() clears the instance's pk after the signal
+    task_id, user_id = instance.pk, instance.user_id
+    status = None if signal is post_delete else instance.status
+    # Runs after the invalidation above, so the counts are recomputed from the committed rows
+    publish(user_id, 'task', lambda: {'id': task_id, 'status': status, **get_task_stats_for(user_id)})
@@ -0,0 +1,82 @@
+"""
+Per-user task statistics cached with Django's cache framework.
+
+The counts are computed with one conditional aggregate on a miss and kept
+until a Task belonging to the user is saved or deleted (see tasks.signals).
+Code that changes tasks without signals (queryset.update, bulk_create,
+archiving) must call invalidate_task_stats() itself.
+
+Archived tasks (tasks.archive) count as completed. Their number comes from
+an index-only count on the archive, added on the same cache miss.
+
+Misses are computed on the primary even inside @read_replica views
+(myproject.routers): the entry is shared with every later request, and one
+filled from a lagging replica would keep stale counts after the
+invalidation that was meant to clear them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+
+from .models import ArchivedTask, Task
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 60 * 60)
+
+
+def _cache_key(user_id):
+    # v2: entries include the archived count
+    return f'stats:tasks:v2:{user_id}'
+
+
+def _counts():
+    return {
+        'total': Count('id'),
+        'pending': Count('id', filter=~Q(status='Completed')),
+        'completed': Count('id', filter=Q(status='Completed')),
+    }
+
+
+def _with_archived(stats, archived):
+    stats['archived'] = archived
+    stats['completed'] += archived
+    stats['total'] += archived
+    return stats
+
+
+def compute_task_stats(user_id):
+    """Total, pending, completed and archived counts for a user (one aggregate plus the archive count)"""
+    stats = Task.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).aggregate(**_counts())
+    return _with_archived(stats, ArchivedTask.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).count())
+
+
+def get_task_stats(user):
+    """Cached task counts: {'total', 'pending', 'completed', 'archived'}"""
+    return get_task_stats_for(user.pk)
+
+
+def get_task_stats_for(user_id):
+    """get_task_stats() by user id (signal handlers only have the id)"""
+    key = _cache_key(user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_task_stats(user_id)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+async def aget_task_stats(user):
+    """get_task_stats() for async views (async cache and ORM calls)"""
+    key = _cache_key(user.pk)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = _with_archived(
+            await Task.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).aaggregate(**_counts()),
+            await ArchivedTask.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).acount(),
+        )
+        await cache.aset(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_task_stats(user_id):
+    cache.delete(_cache_key(user_id))
@@ -1,3 +1,679 @@
-from django.test import TestCase
+import io
+import re
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.operations import CreateModel
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+
+from accounts import views as account_views
+from accounts.models import User
+from miniGame import views as game_views
+from myproject import urls as project_urls
+from . import archive, quota, transfer, views as task_views
+from .archive import archive_batch
+from .fragments import bump_card_version
+from .models import ArchivedTask, Task, TaskQuotaCounter
+from .reminders import InMemoryBackend, ReminderScheduler
+
+
+class QueryPlanMixin:
+    """
+    Run a view, EXPLAIN every query it issued and fail on full scans.
+
+    Every table must be reached by an index seek: SEARCH on SQLite (EXPLAIN
+    QUERY PLAN), an index scan with an Index Cond on PostgreSQL (EXPLAIN with
+    enable_seqscan off, so a Seq Scan in the plan means no usable index).
+    Walking a whole index (SQLite's SCAN ... USING INDEX) is a full scan too;
+    pass its index name in `full_scans` where an ordered full scan is meant.
+    `indexes` names indexes that must be seeked by at least one query.
+    """
+    EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+    def setUp(self):
+        super().setUp()
+        # Cached stats would hide the queries under test
+        cache.clear()
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'Query plan checks are not implemented for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+        super().tearDown()
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def plan_nodes(self, plan):
+        """The plan's table accesses as (text, full scan?, index name or None)"""
+        if connection.vendor == 'sqlite':
+            for line in plan:
+                line = line.strip()
+                match = re.match(r'(SEARCH|SCAN) (\S+)(?: USING (?:COVERING )?INDEX (\S+))?', line)
+                if match and match[2] != 'CONSTANT':
+                    yield line, match[1] == 'SCAN', match[3]
+            return
+        # PostgreSQL: a node starts at its line; its Index Cond (if any) follows on deeper-indented lines
+        nodes = []
+        for line in plan:
+            match = re.search(r'(Seq Scan|Index Only Scan|Bitmap Index Scan|Index Scan)(?: using| on) (\S+)', line)
+            if match:
+                nodes.append([line.strip(), match[1] == 'Seq Scan', match[2] if 'Index' in match[1] else None])
+            elif nodes and 'Index Cond:' in line:
+                nodes[-1].append(True)
+        for text, sequential, index, *condition in nodes:
+            yield text, sequential or (index is not None and not condition), index
+
+    def assertQueriesUseIndexes(self, queries, label, indexes=(), full_scans=()):
+        """Check the plan of every captured query"""
+        checked, seeked = 0, set()
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(self.EXPLAINED_STATEMENTS):
+                continue
+            plan = self.explain(sql)
+            scans = []
+            for text, full_scan, index in self.plan_nodes(plan):
+                if full_scan and index not in full_scans:
+                    scans.append(text)
+                elif not full_scan and index:
+                    seeked.add(index)
+            self.assertFalse(scans, f'Full scan for {label}:\n{sql}\n' + '\n'.join(plan))
+            checked += 1
+        self.assertTrue(checked, f'No queries were explained for {label}')
+        missing = set(indexes) - seeked
+        self.assertFalse(missing, f'{label} never searched {", ".join(sorted(missing))} (searched: {", ".join(sorted(seeked))})')
+
+    def assertViewUsesIndexes(self, url, method='get', data=None, indexes=(), full_scans=()):
+        """Request the URL and check the plan of every query it ran"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        self.assertQueriesUseIndexes(ctx.captured_queries, url, indexes, full_scans)
+        return response
+
+    def analyze(self):
+        """Refresh planner statistics after seeding"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def seed_tasks(users=5, tasks_per_user=60):
+    """Several users with a long completed history and some pending work each"""
+    now = timezone.now()
+    created = []
+    for u in range(users):
+        user = User.objects.create(username=f'planner{u}', tokens=50)
+        tasks = []
+        for i in range(tasks_per_user):
+            completed = i % 4 != 0
+            tasks.append(Task(
+                user=user,
+                name=f'Task {i}',
+                deadline=now + timedelta(hours=i) * (-1 if completed else 1),
+                priority=('High', 'Medium', 'Low')[i % 3],
+                status='Completed' if completed else 'Pending',
+            ))
+        Task.objects.bulk_create(tasks)
+        created.append(user)
+    return created
+
+
+class TaskQueryPlanTests(QueryPlanMixin, TestCase):
+    """The hot task queries must be served by indexes, never by a table scan"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = seed_tasks()[0]
+        self.analyze()
+        self.client.force_login(self.user)
+
+    def test_full_index_scan_is_not_an_index_seek(self):
+        walk = [{'sql': str(Task.objects.order_by('updated_at').values('id').query)}]
+        with self.assertRaisesRegex(AssertionError, 'Full scan'):
+            self.assertQueriesUseIndexes(walk, 'index walk')
+        # Allowed where an ordered full scan is intended, but it doesn't count as searching the index
+        self.assertQueriesUseIndexes(walk, 'index walk', full_scans=['task_updated_at_idx'])
+        with self.assertRaisesRegex(AssertionError, 'never searched task_updated_at_idx'):
+            self.assertQueriesUseIndexes(walk, 'index walk', indexes=['task_updated_at_idx'],
+                                         full_scans=['task_updated_at_idx'])
+
+    def test_task_list(self):
+        self.assertViewUsesIndexes('/tasks/', indexes=['task_user_status_deadline_idx', 'task_pending_deadline_idx'])
+
+    def test_task_list_next_completed_page(self):
+        response = self.client.get('/tasks/')
+        self.assertViewUsesIndexes('/tasks/completed/', data={'cursor': response.context['next_cursor']},
+                                   indexes=['task_user_status_deadline_idx'])
+
+    def test_task_create_form(self):
+        self.assertViewUsesIndexes('/tasks/create/')
+
+    def test_task_create_post(self):
+        deadline = timezone.localtime() + timedelta(minutes=1)
+        self.assertViewUsesIndexes('/tasks/create/', method='post', data={
+            'name': 'Plan check',
+            'deadline': deadline.strftime('%Y-%m-%dT%H:%M'),
+            'priority': 'Low',
+        })
+
+    def test_tokens_view(self):
+        self.assertViewUsesIndexes('/tokens/')
+
+
+@override_settings(TASK_QUOTAS={'DEFAULT': {'LIMIT': 3, 'WINDOW_HOURS': 24}})
+class TaskQuotaTests(TestCase):
+    """The counter row admits exactly LIMIT tasks per window"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='quota')
+
+    def test_consume_up_to_the_limit_then_refuse(self):
+        self.assertEqual([quota.consume(self.user).used for _ in range(3)], [1, 2, 3])
+        self.assertIsNone(quota.consume(self.user))
+        status = quota.get_status(self.user)
+        self.assertEqual((status.used, status.remaining), (3, 0))
+        # All or nothing: more than the limit at once is refused without touching the counter
+        other = User.objects.create(username='greedy')
+        self.assertIsNone(quota.consume(other, amount=4))
+        self.assertFalse(TaskQuotaCounter.objects.filter(user=other).exists())
+
+    def test_first_use_race_retries_the_increment(self):
+        # Another request created the window's row between our failed increment and our insert
+        start, _ = quota.get_window(quota.get_policy(self.user))
+        TaskQuotaCounter.objects.create(user=self.user, scope=quota.SCOPE_CREATE, window_start=start, count=1)
+        real_update = QuerySet.update
+        updates = []
+
+        def update(queryset, **kwargs):
+            updates.append(kwargs)
+            # The first conditional increment ran before the other request's insert
+            return 0 if len(updates) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            status = quota.consume(self.user)
+        # Our insert hit the unique constraint, so the increment was retried
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(status.used, 2)
+        self.assertEqual(TaskQuotaCounter.objects.get(user=self.user).count, 2)
+
+    def test_user_and_group_overrides(self):
+        beta = Group.objects.create(name='Beta testers')
+        staff = Group.objects.create(name='Staff')
+        self.user.groups.add(beta, staff)
+        config = {
+            'DEFAULT': {'LIMIT': 3, 'WINDOW_HOURS': 24},
+            'GROUPS': {'Beta testers': {'LIMIT': 10}, 'Staff': {'LIMIT': 20, 'WINDOW_HOURS': 12}},
+            'USERS': {'demo': {'LIMIT': 1}},
+        }
+        with self.settings(TASK_QUOTAS=config):
+            # The most generous group wins, keeping its own window
+            self.assertEqual(quota.get_policy(self.user), quota.QuotaPolicy(limit=20, window_hours=12))
+            demo = User.objects.create(username='demo')
+            demo.groups.add(staff)
+            # A user override beats every group
+            self.assertEqual(quota.get_policy(demo), quota.QuotaPolicy(limit=1, window_hours=24))
+            self.assertIsNotNone(quota.consume(demo))
+            self.assertIsNone(quota.consume(demo))
+
+    def test_window_rolls_over(self):
+        policy = quota.QuotaPolicy(limit=1, window_hours=6)
+        before = timezone.make_aware(datetime(2026, 10, 18, 5, 59))
+        after = timezone.make_aware(datetime(2026, 10, 18, 6, 1))
+        with mock.patch('django.utils.timezone.now', return_value=before):
+            status = quota.consume(self.user, policy)
+            self.assertEqual(status.resets_at, timezone.make_aware(datetime(2026, 10, 18, 6, 0)))
+            self.assertIsNone(quota.consume(self.user, policy))
+        with mock.patch('django.utils.timezone.now', return_value=after):
+            self.assertEqual(quota.get_status(self.user, policy).used, 0)
+            status = quota.consume(self.user, policy)
+            self.assertEqual((status.used, status.resets_at), (1, timezone.make_aware(datetime(2026, 10, 18, 12, 0))))
+        self.assertEqual(TaskQuotaCounter.objects.filter(user=self.user).count(), 2)
+
+    def test_window_hours_must_be_whole_hours_or_days(self):
+        for hours in (1, 5, 23, 24, 48, 168):
+            with self.settings(TASK_QUOTAS={'DEFAULT': {'WINDOW_HOURS': hours}}):
+                self.assertEqual(quota.get_policy(self.user).window_hours, hours)
+        for hours in (0, -6, 36, 47, 1.5):
+            with self.subTest(hours=hours), self.settings(TASK_QUOTAS={'DEFAULT': {'WINDOW_HOURS': hours}}):
+                with self.assertRaises(ImproperlyConfigured):
+                    quota.get_policy(self.user)
+        # Overrides are checked too
+        with self.settings(TASK_QUOTAS={'USERS': {self.user.username: {'WINDOW_HOURS': 30}}}):
+            with self.assertRaises(ImproperlyConfigured):
+                quota.get_policy(self.user)
+
+
+class InitialMigrationTests(SimpleTestCase):
+    """
+    The first migrations of apps that shipped without any create only the
+    original tables, so `migrate --fake-initial` can adopt existing databases
+    """
+
+    def test_initial_migrations_create_only_the_original_tables(self):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        for app, models in (('tasks', ['Task']), ('accounts', ['User'])):
+            migration = loader.get_migration(app, '0001_initial')
+            self.assertEqual([op.name for op in migration.operations if isinstance(op, CreateModel)], models, app)
+            self.assertTrue(all(isinstance(op, CreateModel) for op in migration.operations), app)
+
+
+class TaskApiTests(TestCase):
+    """JSON API: conditional list polling and the write endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = seed_tasks(users=1, tasks_per_user=8)[0]
+        self.client.force_login(self.user)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 401)
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get('/api/tasks/')
+        self.assertEqual(len(first.json()['tasks']), 8)
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        # Only the fingerprint aggregate touches the task table; no rows are fetched
+        task_queries = [q['sql'] for q in ctx.captured_queries if 'tasks_task' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertIn('MAX(', task_queries[0])
+        self.assertEqual(again.content, b'')
+
+    def test_etag_changes_on_update_and_delete(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        task = Task.objects.filter(user=self.user).first()
+        self.client.patch(f'/api/tasks/{task.id}/', {'priority': 'Low'}, content_type='application/json')
+        changed = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+
+        self.client.delete(f'/api/tasks/{task.id}/')
+        deleted = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(deleted.status_code, 200)
+        self.assertEqual(len(deleted.json()['tasks']), 7)
+
+    def test_if_modified_since_never_hides_a_change(self):
+        second = timezone.now().replace(microsecond=0)
+        Task.objects.filter(user=self.user).update(updated_at=second)
+        first = self.client.get('/api/tasks/')
+        self.assertIn('Last-Modified', first)
+        # A change later in the same second has the same HTTP date
+        task = Task.objects.filter(user=self.user).first()
+        Task.objects.filter(pk=task.pk).update(priority='Low', updated_at=second + timedelta(milliseconds=500))
+        changed = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed['Last-Modified'], first['Last-Modified'])
+
+        # Deleting an older task doesn't move the date either
+        Task.objects.filter(user=self.user).order_by('updated_at').first().delete()
+        deleted = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=changed['Last-Modified'])
+        self.assertEqual(deleted.status_code, 200)
+        self.assertEqual(len(deleted.json()['tasks']), 7)
+
+    def test_create_and_complete(self):
+        deadline = timezone.localtime() + timedelta(minutes=1)
+        response = self.client.post('/api/tasks/', {'name': 'From the widget', 'deadline': deadline.isoformat()},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        task_id = response.json()['id']
+
+        response = self.client.post(f'/api/tasks/{task_id}/complete/')
+        self.assertEqual(response.json()['awarded'], True)
+        self.assertEqual(response.json()['task']['status'], 'Completed')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tokens, 51)
+
+    def test_create_rejects_past_deadline(self):
+        deadline = timezone.localtime() - timedelta(hours=1)
+        response = self.client.post('/api/tasks/', {'name': 'Late', 'deadline': deadline.isoformat()},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+# The site's URLs with the async page views placed in front (what ASGI deployments serve)
+urlpatterns = [
+    path('tasks/', task_views.atask_list),
+    path('tokens/', account_views.atokens_view),
+    path('game/', game_views.agame_home),
+    path('game/stats/', game_views.agame_stats),
+    *project_urls.urlpatterns,
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    """The async page views render the same context as their sync versions"""
+    PAGES = ('/tasks/', '/tokens/', '/game/', '/game/stats/')
+    COMPARED = ('pending_count', 'completed_count', 'total_tasks', 'next_cursor', 'completed_tasks',
+                'pending_tasks', 'available_drops', 'total_drops_bought')
+
+    def setUp(self):
+        cache.clear()
+        self.user = seed_tasks(users=1, tasks_per_user=40)[0]
+
+    def _context(self, response):
+        context = {key: response.context[key] for key in self.COMPARED if key in response.context}
+        for key in ('pending_tasks', 'completed_tasks'):
+            # Querysets (sync) and lists (async) are compared by their rows
+            if not isinstance(context.get(key, 0), int):
+                context[key] = [task.pk for task in context[key]]
+        return context
+
+    async def test_async_pages_match_sync_pages(self):
+        await self.async_client.aforce_login(self.user)
+        for page in self.PAGES:
+            async_response = await self.async_client.get(page)
+            self.assertEqual(async_response.status_code, 200, page)
+            with override_settings(ROOT_URLCONF=project_urls):
+                sync_response = await self.async_client.get(page)
+            self.assertEqual(self._context(async_response), self._context(sync_response), page)
+
+    async def test_async_pages_require_login(self):
+        response = await self.async_client.get('/tasks/')
+        self.assertEqual(response.status_code, 302)
+
+
+class TaskActionFragmentTests(TestCase):
+    """Complete/delete answer async requests with the changed parts of the page, others with a redirect"""
+    FRAGMENT = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fragments', password='pw')
+        self.task = Task.objects.create(user=self.user, name='Hang bats', deadline=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.user)
+
+    def test_plain_requests_keep_the_redirect(self):
+        self.assertRedirects(self.client.get(f'/tasks/{self.task.pk}/complete/'), '/tasks/')
+
+    def test_complete_returns_card_counters_and_badge(self):
+        response = self.client.get(f'/tasks/{self.task.pk}/complete/', **self.FRAGMENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'<div class="task-card completed" id="task-{self.task.pk}">')
+        self.assertContains(response, '<h3 data-live="task.completed">1</h3>', html=True)
+        self.assertContains(response, '<span id="tokenBalance" data-live="tokens.tokens">1</span>', html=True)
+        self.assertContains(response, 'You earned 1 token.')
+        # The message was shown in the fragment, not again on the next page
+        self.assertNotContains(self.client.get('/tasks/'), 'You earned 1 token.')
+
+    def test_delete_marks_the_card_for_removal(self):
+        response = self.client.get(f'/tasks/{self.task.pk}/delete/', **self.FRAGMENT)
+        self.assertContains(response, f'<div id="task-{self.task.pk}" data-remove></div>', html=True)
+        self.assertContains(response, '<h3 data-live="task.total">0</h3>', html=True)
+
+    def test_json_patch(self):
+        response = self.client.get(f'/tasks/{self.task.pk}/complete/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {
+            'task': {'id': self.task.pk, 'status': 'Completed', 'total': 1, 'pending': 0, 'completed': 1, 'archived': 0},
+            'tokens': {'tokens': 1},
+            'messages': [{'level': 'success', 'text': 'Task "Hang bats" marked as completed! You earned 1 token.'}],
+        })
+
+
+class CompletedPaginationTests(TestCase):
+    """Keyset pages of completed tasks cover every task once, also across tasks sharing a deadline"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pages', password='pw')
+        now = timezone.now().replace(microsecond=0)
+        # Three deadlines shared by many tasks each, so page boundaries fall inside a tie
+        Task.objects.bulk_create([
+            Task(user=self.user, name=f'Done {i}', deadline=now - timedelta(days=i % 3), status='Completed')
+            for i in range(2 * task_views.COMPLETED_PAGE_SIZE + 7)
+        ])
+        self.expected = list(Task.objects.filter(user=self.user).order_by('-deadline', '-id').values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+    def _page(self, cursor=None):
+        response = self.client.get('/tasks/completed/', {'cursor': cursor} if cursor else {})
+        return [task.id for task in response.context['completed_tasks']], response.context['next_cursor']
+
+    def test_walk_every_page(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            ids, cursor = self._page(cursor)
+            seen += ids
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        # No duplicates, no gaps, in (-deadline, -id) order
+        self.assertEqual(seen, self.expected)
+
+    def test_malformed_cursor_falls_back_to_the_first_page(self):
+        first_page = self._page()
+        for cursor in ('garbage', 'not-a-date_12', '2025-10-31T00:00:00+00:00_x', '_'):
+            self.assertEqual(self._page(cursor), first_page, cursor)
+
+
+class TaskCardCacheTests(TestCase):
+    """Cards come from the fragment cache until the task's updated_at or the owner's card version changes"""
+    BODY = 'tasks/_task_card_body.html'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cards', password='pw')
+        self.task = Task.objects.create(user=self.user, name='Light candles', deadline=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.user)
+
+    def _card_rendered(self):
+        response = self.client.get('/tasks/')
+        return self.BODY in [template.name for template in response.templates], response
+
+    def test_second_render_is_served_from_the_cache(self):
+        rendered, response = self._card_rendered()
+        self.assertTrue(rendered)
+        rendered, cached = self._card_rendered()
+        self.assertFalse(rendered)
+        self.assertContains(cached, 'Light candles')
+
+    def test_save_re_renders_the_card(self):
+        self._card_rendered()
+        self.task.name = 'Light more candles'
+        self.task.save()
+        rendered, response = self._card_rendered()
+        self.assertTrue(rendered)
+        self.assertContains(response, 'Light more candles')
+
+    def test_version_bump_re_renders_cards_changed_without_save(self):
+        self._card_rendered()
+        Task.objects.filter(pk=self.task.pk).update(name='Snuff candles')
+        # updated_at didn't move, so the old card is still served...
+        rendered, response = self._card_rendered()
+        self.assertFalse(rendered)
+        self.assertNotContains(response, 'Snuff candles')
+        # ...until the owner's card version is bumped
+        bump_card_version(self.user.pk)
+        rendered, response = self._card_rendered()
+        self.assertTrue(rendered)
+        self.assertContains(response, 'Snuff candles')
+
+
+class ReminderSchedulerTests(QueryPlanMixin, TestCase):
+    """The reminder heap follows task edits and sends each reminder once"""
+
+    def setUp(self):
+        super().setUp()
+        InMemoryBackend.outbox = []
+        self.user = User.objects.create(username='reminded')
+        self.now = timezone.now()
+        self.scheduler = ReminderScheduler(InMemoryBackend(), lead=timedelta(minutes=15), window=timedelta(minutes=60))
+
+    def add_task(self, name, minutes, status='Pending'):
+        return Task.objects.create(user=self.user, name=name, deadline=self.now + timedelta(minutes=minutes), status=status)
+
+    def sent(self):
+        return [r.name for r in InMemoryBackend.outbox]
+
+    def test_sends_due_reminders_once(self):
+        self.add_task('Soon', 10)
+        self.add_task('Later', 50)
+        self.add_task('Done', 10, status='Completed')
+        self.add_task('Far away', 500)
+
+        self.scheduler.tick(self.now)
+        self.assertEqual(self.sent(), ['Soon'])
+        self.scheduler.tick(self.now + timedelta(minutes=1))
+        self.assertEqual(self.sent(), ['Soon'])
+        self.scheduler.tick(self.now + timedelta(minutes=36))
+        self.assertEqual(self.sent(), ['Soon', 'Later'])
+
+    def test_follows_edits_completions_and_deletes(self):
+        moved = self.add_task('Moved', 30)
+        completed = self.add_task('Completed later', 30)
+        deleted = self.add_task('Deleted', 30)
+        self.scheduler.tick(self.now)
+
+        moved.deadline = self.now + timedelta(minutes=40)
+        moved.save()
+        completed.status = 'Completed'
+        completed.save()
+        # Deletes leave no updated_at trace; the pre-send check drops them
+        deleted.delete()
+        self.add_task('Created', 20)
+
+        self.scheduler.tick(self.now + timedelta(minutes=16))
+        self.assertEqual(self.sent(), ['Created'])
+        self.scheduler.tick(self.now + timedelta(minutes=26))
+        self.assertEqual(self.sent(), ['Created', 'Moved'])
+
+    def test_window_extends_as_time_passes(self):
+        self.add_task('Tomorrow-ish', 200)
+        self.scheduler.tick(self.now)
+        self.assertEqual(len(self.scheduler), 0)
+        self.scheduler.tick(self.now + timedelta(minutes=130))
+        self.assertEqual(len(self.scheduler), 1)
+        self.scheduler.tick(self.now + timedelta(minutes=186))
+        self.assertEqual(self.sent(), ['Tomorrow-ish'])
+
+    def test_queries_use_indexes(self):
+        seed_tasks()
+        self.add_task('Soon', 10)
+        self.analyze()
+        with CaptureQueriesContext(connection) as ctx:
+            self.scheduler.tick(self.now)
+            self.scheduler.tick(self.now + timedelta(minutes=1))
+        self.assertQueriesUseIndexes(ctx.captured_queries, 'reminder scheduler',
+                                     indexes=['task_pending_due_idx', 'task_updated_at_idx'])
+
+
+class TaskTransferTests(TestCase):
+    """Export streams every task; import validates rows and has its own quota"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = seed_tasks(users=1, tasks_per_user=30)[0]
+        self.client.force_login(self.user)
+
+    def upload(self, name, content):
+        return self.client.post('/tasks/import/', {'file': SimpleUploadedFile(name, content.encode())})
+
+    def test_export_round_trip(self):
+        for fmt in ('csv', 'ndjson'):
+            response = self.client.get('/tasks/export/', {'format': fmt})
+            self.assertTrue(response.streaming)
+            content = b''.join(response.streaming_content).decode()
+
+            other = User.objects.create(username=f'importer-{fmt}')
+            self.client.force_login(other)
+            self.upload(f'tasks.{fmt}', content)
+            self.assertEqual(Task.objects.filter(user=other).count(), 30)
+            self.client.force_login(self.user)
+
+    def test_import_skips_invalid_rows_and_keeps_daily_quota(self):
+        content = (
+            'name,deadline,priority\n'
+            'Valid one,2025-10-31T18:00,High\n'
+            ',2025-10-31T18:00,High\n'
+            'Bad date,tomorrow,Low\n'
+            'Bad priority,2025-10-31T18:00,Urgent\n'
+            'Valid two,2025-10-31T19:00,\n'
+        )
+        response = self.upload('tasks.csv', content)
+        self.assertRedirects(response, '/tasks/')
+        imported = Task.objects.filter(user=self.user, name__startswith='Valid')
+        self.assertEqual(sorted(imported.values_list('priority', flat=True)), ['High', 'Medium'])
+
+        # The creation quota is untouched; the import quota counted the two rows
+        self.assertEqual(quota.get_status(self.user).used, 0)
+        self.assertEqual(quota.get_status(self.user, scope=quota.SCOPE_IMPORT).used, 2)
+        # Cached counts were invalidated despite bulk_create skipping signals
+        self.assertEqual(self.client.get('/tasks/').context['total_tasks'], 32)
+
+    @override_settings(TASK_IMPORT_QUOTAS={'DEFAULT': {'LIMIT': 3}})
+    def test_import_stops_at_import_quota(self):
+        rows = ''.join(f'{{"name":"Row {i}","deadline":"2025-10-31T18:00"}}\n' for i in range(10))
+        result = transfer.import_tasks(self.user, io.BytesIO(rows.encode()), 'ndjson', chunk_size=2)
+        self.assertEqual(result.created, 2)
+        self.assertTrue(result.quota_exceeded)
+
+
+class TaskArchiveTests(QueryPlanMixin, TestCase):
+    """Old completed tasks move to the archive in batches; counts and exports still include them"""
+
+    def setUp(self):
+        super().setUp()
+        self.users = seed_tasks(users=2, tasks_per_user=40)
+        self.user = self.users[0]
+        # Tasks due more than 10 hours ago were completed two months ago
+        now = timezone.now()
+        Task.objects.filter(status='Completed', deadline__lt=now - timedelta(hours=10)).update(
+            updated_at=now - timedelta(days=60)
+        )
+        self.old_per_user = Task.objects.filter(user=self.user, updated_at__lt=now - timedelta(days=30)).count()
+        self.client.force_login(self.user)
+
+    def test_archive_moves_old_completed_tasks(self):
+        before = self.client.get('/tasks/').context
+        call_command('archive_tasks', days=30, batch_size=7, stdout=io.StringIO())
+
+        self.assertEqual(ArchivedTask.objects.count(), 2 * self.old_per_user)
+        self.assertFalse(Task.objects.filter(updated_at__lt=timezone.now() - timedelta(days=30)).exists())
+        # Counts are unchanged (the cached ones were invalidated) and the page links to the history
+        after = self.client.get('/tasks/').context
+        self.assertEqual((after['total_tasks'], after['completed_count']), (before['total_tasks'], before['completed_count']))
+        self.assertEqual(after['archived_count'], self.old_per_user)
+        # Running again finds nothing left to move
+        out = io.StringIO()
+        call_command('archive_tasks', days=30, stdout=out)
+        self.assertIn('Archived 0 task(s)', out.getvalue())
+
+    def test_history_pages_and_export(self):
+        archive_batch(archive.archive_cutoff(30))
+        seen, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/tasks/history/', {'cursor': cursor} if cursor else {})
+            self.assertQueriesUseIndexes(
+                [q for q in ctx.captured_queries if 'tasks_archivedtask' in q['sql']], 'task history',
+                indexes=['archived_user_deadline_idx'])
+            seen += [task.id for task in response.context['archived_tasks']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(ArchivedTask.objects.filter(user=self.user).values_list('id', flat=True)))
+
+        rows = list(transfer.export_rows(self.user))
+        self.assertEqual(len(rows), 40)
+        self.assertEqual(sum(row['status'] == 'Completed' for row in rows), 30)
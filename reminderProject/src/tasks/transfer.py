@@ -0,0 +1,196 @@
+"""
+Streaming task export and batched import (CSV and NDJSON).
+
+Exports read rows with values_list().iterator(chunk_size=...) and write them
+out as they arrive, so memory stays flat however many tasks a user has.
+Archived tasks (tasks.archive) are exported after the active ones.
+Imports parse the file lazily, validate each row with the same rules as
+the JSON API, and insert TASK_TRANSFER_CHUNK_SIZE rows at a time with
+bulk_create, one transaction per chunk. Each chunk is taken from the
+'import' quota scope (tasks.quota), never from the daily creation quota.
+
+bulk_create skips model signals, so an import drops the user's cached
+stats and task cards itself.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Value
+
+from . import quota
+from .fragments import bump_card_version
+from .models import ArchivedTask, Task
+from .services import clean_task_fields
+from .stats import invalidate_task_stats
+
+TASK_TRANSFER_CHUNK_SIZE = getattr(settings, 'TASK_TRANSFER_CHUNK_SIZE', 2000)
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+EXPORT_FIELDS = ('name', 'deadline', 'priority', 'category', 'status', 'created_at')
+IMPORT_FIELDS = ('name', 'deadline', 'priority', 'category', 'status')
+REQUIRED_FIELDS = ('name', 'deadline')
+
+# Lines written per chunk of the export stream
+LINES_PER_WRITE = 500
+
+# Only the first few bad rows are reported back
+MAX_REPORTED_ERRORS = 20
+
+
+def detect_format(filename, requested=None):
+    """Explicit format if given, else NDJSON for .ndjson/.jsonl files and CSV otherwise"""
+    if requested:
+        if requested not in FORMATS:
+            raise ValidationError(f'Unknown format "{requested}"; use csv or ndjson.')
+        return requested
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+# ---- export -----------------------------------------------------------------
+
+class _Echo:
+    """File-like object for csv.writer that hands each formatted line back"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(user, chunk_size=None):
+    """Yield the user's tasks, then their archived tasks, as dicts, fetching chunk_size rows at a time"""
+    active = Task.objects.filter(user=user).order_by('id').values_list(*EXPORT_FIELDS)
+    archived = (
+        ArchivedTask.objects.filter(user=user).order_by('id')
+        .annotate(status=Value('Completed')).values_list(*EXPORT_FIELDS)
+    )
+    for rows in (active, archived):
+        for row in rows.iterator(chunk_size=chunk_size or TASK_TRANSFER_CHUNK_SIZE):
+            yield {name: _plain(value) for name, value in zip(EXPORT_FIELDS, row)}
+
+
+def _lines(user, fmt, chunk_size):
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in export_rows(user, chunk_size):
+            yield writer.writerow(['' if row[name] is None else row[name] for name in EXPORT_FIELDS])
+    else:
+        for row in export_rows(user, chunk_size):
+            yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+def stream_export(user, fmt, chunk_size=None):
+    """Yield the export as text chunks of LINES_PER_WRITE lines (for StreamingHttpResponse or a file)"""
+    buffer = []
+    for line in _lines(user, fmt, chunk_size):
+        buffer.append(line)
+        if len(buffer) >= LINES_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+# ---- import -----------------------------------------------------------------
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)  # (line number, message), first MAX_REPORTED_ERRORS only
+    quota_exceeded: bool = False
+    resets_at: datetime = None
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def read_rows(file, fmt):
+    """Yield (line number, row) from a binary file; NDJSON lines that aren't JSON yield None"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        missing = [name for name in REQUIRED_FIELDS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValidationError(f'The CSV header must include {", ".join(REQUIRED_FIELDS)}.')
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                yield line_num, None
+
+
+def clean_import_row(row):
+    """Task field values for one import row; extra columns (e.g. created_at) are ignored"""
+    if not isinstance(row, dict):
+        raise ValidationError('not a JSON object')
+    # Empty cells fall back to the model defaults
+    data = {name: row[name] for name in IMPORT_FIELDS if row.get(name) not in (None, '')}
+    missing = [name for name in REQUIRED_FIELDS if name not in data]
+    if missing:
+        raise ValidationError(f'missing {", ".join(missing)}')
+    return clean_task_fields(data, IMPORT_FIELDS)
+
+
+def _save_chunk(user, tasks, result, use_quota):
+    """Insert one chunk in its own transaction; returns False when the import quota ran out"""
+    with transaction.atomic():
+        if use_quota and quota.consume(user, amount=len(tasks), scope=quota.SCOPE_IMPORT) is None:
+            result.quota_exceeded = True
+            result.resets_at = quota.get_status(user, scope=quota.SCOPE_IMPORT).resets_at
+            return False
+        Task.objects.bulk_create(tasks)
+    result.created += len(tasks)
+    return True
+
+
+def import_tasks(user, file, fmt, chunk_size=None, use_quota=True):
+    """
+    Import tasks for `user` from a binary CSV/NDJSON file.
+
+    Invalid rows are skipped and reported. Chunks already committed stay when
+    the import quota runs out part way. Raises ValidationError for an
+    unusable file (e.g. a CSV without the required columns).
+    """
+    chunk_size = chunk_size or TASK_TRANSFER_CHUNK_SIZE
+    result = ImportResult()
+    chunk = []
+    try:
+        for line, row in read_rows(file, fmt):
+            try:
+                chunk.append(Task(user=user, **clean_import_row(row)))
+            except ValidationError as e:
+                result.add_error(line, e.message)
+            if len(chunk) >= chunk_size:
+                if not _save_chunk(user, chunk, result, use_quota):
+                    return result
+                chunk = []
+        if chunk:
+            _save_chunk(user, chunk, result, use_quota)
+        return result
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValidationError(f'Could not read the file: {e}')
+    finally:
+        if result.created:
+            invalidate_task_stats(user.pk)
+            bump_card_version(user.pk)
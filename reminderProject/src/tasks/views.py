@@ -1,52 +1,177 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Task
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from .models import ArchivedTask, Task
+from . import quota, transfer
+from .services import TaskLimitReached, complete_task, create_task
+from .fragments import acard_context, card_context
+from .stats import aget_task_stats, get_task_stats
 from datetime import datetime
 from django.utils import timezone
+from myproject.partials import partial_response, response_mode
+from myproject.routers import read_replica
+
+# Completed tasks are shown a page at a time (keyset pagination on deadline, id)
+COMPLETED_PAGE_SIZE = 20
+
+# Archived history pages (tasks.archive) use the same keyset pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_FIELDS = ('id', 'name', 'deadline', 'priority', 'category', 'completed_at')
+
+# Only the columns the task cards display (updated_at keys the card fragment cache)
+CARD_FIELDS = ('id', 'name', 'deadline', 'priority', 'category', 'status', 'updated_at')
 
 # Create your views here.
 
+def _encode_cursor(task):
+    """Cursor pointing just past the given task in (-deadline, -id) order"""
+    return f'{task.deadline.isoformat()}_{task.id}'
+
+
+def _decode_cursor(cursor):
+    """Parse a cursor back into (deadline, id); returns None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        deadline_str, task_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(deadline_str), int(task_id)
+    except ValueError:
+        return None
+
+
+def _keyset_page_query(queryset, cursor, page_size):
+    """Rows after the cursor, newest deadline first, sliced to one page plus one row"""
+    queryset = queryset.order_by('-deadline', '-id')
+    position = _decode_cursor(cursor)
+    if position:
+        deadline, task_id = position
+        queryset = queryset.filter(Q(deadline__lt=deadline) | Q(deadline=deadline, id__lt=task_id))
+    
+    # Fetch one extra row to know whether another page exists
+    return queryset[:page_size + 1]
+
+
+def _completed_page_query(user, cursor=None):
+    """Completed tasks after the cursor, newest deadline first, sliced to one page plus one row"""
+    completed = Task.objects.filter(user=user, status='Completed').only(*CARD_FIELDS)
+    return _keyset_page_query(completed, cursor, COMPLETED_PAGE_SIZE)
+
+
+def _split_page(tasks, page_size=COMPLETED_PAGE_SIZE):
+    """Trim the extra row off a fetched page; returns (tasks, next_cursor)"""
+    next_cursor = None
+    if len(tasks) > page_size:
+        tasks = tasks[:page_size]
+        next_cursor = _encode_cursor(tasks[-1])
+    return tasks, next_cursor
+
+
+def _completed_page(user, cursor=None):
+    """Fetch one page of completed tasks after the cursor, newest deadline first"""
+    return _split_page(list(_completed_page_query(user, cursor)))
+
+
+def _pending_tasks(user):
+    """Pending work is always shown in full, earliest deadline first"""
+    return Task.objects.filter(user=user).exclude(status='Completed').order_by('deadline').only(*CARD_FIELDS)
+
+
 @login_required
+@read_replica
 def task_list(request):
     """Display all tasks for the logged-in user"""
-    # Separate completed and pending tasks
-    pending_tasks = Task.objects.filter(user=request.user).exclude(status='Completed').order_by('deadline')
-    completed_tasks = Task.objects.filter(user=request.user, status='Completed').order_by('-deadline')
+    counts = get_task_stats(request.user)
+    
+    # Pending work is always shown in full; completed history is paginated
+    pending_tasks = _pending_tasks(request.user)
+    completed_tasks, next_cursor = _completed_page(request.user, request.GET.get('cursor'))
     
-    completed_count = completed_tasks.count()
-    pending_count = pending_tasks.count()
+    context = {
+        'pending_tasks': pending_tasks,
+        'completed_tasks': completed_tasks,
+        'next_cursor': next_cursor,
+        **card_context(request.user),
+        'completed_count': counts['completed'],
+        'pending_count': counts['pending'],
+        'total_tasks': counts['total'],
+        'archived_count': counts['archived'],
+    }
+    return render(request, 'tasks/task_list.html', context)
+
+
+@login_required
+@read_replica
+async def atask_list(request):
+    """task_list for ASGI: the same page, with every query made through the async ORM"""
+    # Templates read request.user, so hand them the already loaded user
+    request.user = user = await request.auser()
+    counts = await aget_task_stats(user)
+    
+    pending_tasks = [task async for task in _pending_tasks(user)]
+    completed_tasks, next_cursor = _split_page(
+        [task async for task in _completed_page_query(user, request.GET.get('cursor'))]
+    )
     
     context = {
         'pending_tasks': pending_tasks,
         'completed_tasks': completed_tasks,
-        'completed_count': completed_count,
-        'pending_count': pending_count,
-        'total_tasks': pending_count + completed_count,
+        'next_cursor': next_cursor,
+        **await acard_context(user),
+        'completed_count': counts['completed'],
+        'pending_count': counts['pending'],
+        'total_tasks': counts['total'],
+        'archived_count': counts['archived'],
     }
     return render(request, 'tasks/task_list.html', context)
 
 
+@login_required
+@read_replica
+def task_completed_more(request):
+    """Return the next page of completed task cards as an HTML fragment ("load more")"""
+    completed_tasks, next_cursor = _completed_page(request.user, request.GET.get('cursor'))
+    context = {
+        'completed_tasks': completed_tasks,
+        'next_cursor': next_cursor,
+        **card_context(request.user),
+    }
+    return render(request, 'tasks/_completed_tasks.html', context)
+
+
+@login_required
+@read_replica
+def task_history(request):
+    """Archived (long completed) tasks, one page at a time; only read when the user opens it"""
+    archived = ArchivedTask.objects.filter(user=request.user).only(*HISTORY_FIELDS)
+    tasks, next_cursor = _split_page(
+        list(_keyset_page_query(archived, request.GET.get('cursor'), HISTORY_PAGE_SIZE)), HISTORY_PAGE_SIZE
+    )
+    context = {
+        'archived_tasks': tasks,
+        'next_cursor': next_cursor,
+        'first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'tasks/task_history.html', context)
+
+
+def _quota_context(user):
+    """Template context describing the user's remaining task quota"""
+    status = quota.get_status(user)
+    return {
+        'tasks_created_today': status.used,
+        'remaining_tasks': status.remaining,
+        'task_limit': status.limit,
+        'quota_resets_at': status.resets_at,
+    }
+
+
 @login_required
 def task_create(request):
     """Create a new task"""
     if request.method == 'POST':
-        # Get today's date range (from 00:00:00 to 23:59:59)
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = timezone.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Count tasks created today (based on created_at timestamp)
-        tasks_created_today = Task.objects.filter(
-            user=request.user,
-            created_at__gte=today_start,
-            created_at__lte=today_end
-        ).count()
-        
-        # Enforce maximum of 5 tasks created per day
-        if tasks_created_today >= 5:
-            messages.error(request, 'Daily limit reached! You can only create 5 tasks per day. The limit will reset at midnight.')
-            return redirect('task_list')
-
         name = request.POST.get('name')
         deadline_str = request.POST.get('deadline')
         priority = request.POST.get('priority', 'Medium')
@@ -59,58 +184,26 @@ def task_create(request):
             # Make deadline timezone-aware
             deadline_aware = timezone.make_aware(deadline)
             
-            # Get current time and end of today
-            now = timezone.now()
-            today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            # Validate deadline is between now and end of today
-            if deadline_aware < now:
-                messages.error(request, 'Task deadline cannot be in the past! Please choose a time from now onwards.')
-                return render(request, 'tasks/task_form.html', {
-                    'tasks_created_today': tasks_created_today,
-                    'remaining_tasks': 5 - tasks_created_today
-                })
-            
-            if deadline_aware > today_end:
-                messages.error(request, 'Task deadline must be within today! You can only create tasks for the current day.')
-                return render(request, 'tasks/task_form.html', {
-                    'tasks_created_today': tasks_created_today,
-                    'remaining_tasks': 5 - tasks_created_today
-                })
+            # Validates the deadline and takes a slot from the quota counter
+            task, status = create_task(request.user, name, deadline_aware, priority, category)
             
-            # Create task
-            task = Task.objects.create(
-                user=request.user,
-                name=name,
-                deadline=deadline_aware,
-                priority=priority,
-                category=category if category else None
-            )
+            messages.success(request, f'Task "{name}" created successfully! You can create {status.remaining} more task(s) before the limit resets.')
+            return redirect('task_list')
             
-            # Calculate remaining tasks for today
-            remaining_tasks = 5 - (tasks_created_today + 1)
-            messages.success(request, f'Task "{name}" created successfully! You can create {remaining_tasks} more task(s) today.')
+        except ValidationError as e:
+            messages.error(request, e.message)
+            return render(request, 'tasks/task_form.html', _quota_context(request.user))
+        
+        except TaskLimitReached as e:
+            messages.error(request, str(e))
             return redirect('task_list')
             
         except ValueError as e:
             messages.error(request, f'Invalid input: {str(e)}')
-            return render(request, 'tasks/task_form.html')
-    
-    # For GET request, show how many tasks can still be created today
-    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = timezone.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-    tasks_created_today = Task.objects.filter(
-        user=request.user,
-        created_at__gte=today_start,
-        created_at__lte=today_end
-    ).count()
-    remaining_tasks = 5 - tasks_created_today
+            return render(request, 'tasks/task_form.html', _quota_context(request.user))
     
-    context = {
-        'tasks_created_today': tasks_created_today,
-        'remaining_tasks': remaining_tasks
-    }
-    return render(request, 'tasks/task_form.html', context)
+    # For GET request, show how many tasks can still be created (reads the quota counter only)
+    return render(request, 'tasks/task_form.html', _quota_context(request.user))
 
 
 @login_required
@@ -147,24 +240,95 @@ def task_delete(request, task_id):
     task_name = task.name
     task.delete()
     messages.success(request, f'Task "{task_name}" deleted successfully!')
-    return redirect('task_list')
+    return _task_action_response(request, task_id)
 
 
 @login_required
 def task_complete(request, task_id):
     """Mark a task as completed"""
-    task = get_object_or_404(Task, id=task_id, user=request.user)
+    try:
+        task, awarded = complete_task(request.user, task_id)
+    except Task.DoesNotExist:
+        raise Http404('No Task matches the given query.')
     # Only award token if task was not already completed
-    if task.status != 'Completed':
-        task.status = 'Completed'
-        task.save()
-
-        # Add 1 token to the user
-        user = request.user
-        user.tokens = (user.tokens or 0) + 1
-        user.save()
-
+    if awarded:
         messages.success(request, f'Task "{task.name}" marked as completed! You earned 1 token.')
     else:
         messages.info(request, f'Task "{task.name}" is already completed.')
-    return redirect('task_list')
+    return _task_action_response(request, task_id, task)
+
+
+def _task_action_response(request, task_id, task=None):
+    """
+    Back to the task list, or for async requests (myproject.partials) the
+    changed card (None: deleted), counters and token badge
+    """
+    mode = response_mode(request)
+    if mode is None:
+        return redirect('task_list')
+    # The counts were invalidated when the task changed, so this reads the committed rows
+    counts = get_task_stats(request.user)
+    context = {
+        'task': task,
+        'task_id': task_id,
+        **card_context(request.user),
+        'completed_count': counts['completed'],
+        'pending_count': counts['pending'],
+        'total_tasks': counts['total'],
+    }
+    patch = {
+        'task': {'id': task_id, 'status': task.status if task else None, **counts},
+        'tokens': {'tokens': request.user.tokens},
+    }
+    return partial_response(request, mode, 'tasks/_task_action.html', context, patch)
+
+
+@login_required
+def task_export(request):
+    """Download all of the user's tasks as CSV (default) or NDJSON, streamed in chunks"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in transfer.FORMATS:
+        messages.error(request, f'Unknown export format "{fmt}".')
+        return redirect('task_list')
+    
+    response = StreamingHttpResponse(transfer.stream_export(request.user, fmt), content_type=transfer.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="spookaminder-tasks.{fmt}"'
+    return response
+
+
+def _import_quota_context(user):
+    """Template context describing the user's remaining import quota"""
+    status = quota.get_status(user, scope=quota.SCOPE_IMPORT)
+    return {
+        'remaining_imports': status.remaining,
+        'import_limit': status.limit,
+        'import_resets_at': status.resets_at,
+    }
+
+
+@login_required
+def task_import(request):
+    """Import tasks from an uploaded CSV or NDJSON file (uses the import quota, not the daily one)"""
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a file to import.')
+            return render(request, 'tasks/task_import.html', _import_quota_context(request.user))
+        
+        try:
+            fmt = transfer.detect_format(upload.name, request.POST.get('format'))
+            result = transfer.import_tasks(request.user, upload.file, fmt)
+        except ValidationError as e:
+            messages.error(request, e.message)
+            return render(request, 'tasks/task_import.html', _import_quota_context(request.user))
+        
+        if result.created:
+            messages.success(request, f'Imported {result.created} task(s)!')
+        if result.skipped:
+            details = '; '.join(f'line {line}: {message}' for line, message in result.errors[:5])
+            messages.warning(request, f'Skipped {result.skipped} invalid row(s) ({details}).')
+        if result.quota_exceeded:
+            messages.error(request, f'Import limit reached! The rest of the file was not imported. The limit will reset at {timezone.localtime(result.resets_at):%H:%M}.')
+        return redirect('task_list')
+    
+    return render(request, 'tasks/task_import.html', _import_quota_context(request.user))